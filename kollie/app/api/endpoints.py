@@ -1,14 +1,27 @@
+from dataclasses import asdict
 from typing import Annotated
-from fastapi import APIRouter, Body, HTTPException, Depends, Request
+
+import structlog
+from fastapi import APIRouter, Body, HTTPException, Depends, Query, Request
+from kubernetes import client
 from kollie.app.auth import UserInfo, authenticated_user
 
-from kollie.models import EnvironmentMetadata, KollieEnvironment
-from kollie.service import envs
-from kollie.persistence import AppTemplate, get_app_template_store
+from kollie.exceptions import KollieConfigError
+from kollie.jobs import get_job_runner
+from kollie.models import EnvironmentMetadata, EnvironmentSnapshot, KollieEnvironment
+from kollie.service import envs, image_tags, pool
+from kollie.persistence import get_app_template_store
+from kollie.persistence.app_bundle import get_app_bundle_report, get_app_bundle_store
+from kollie.persistence.app_template_search import DEFAULT_PAGE_SIZE
+from kollie.persistence.validation import ValidationReport
+
 
+logger = structlog.get_logger(__name__)
 
 router = APIRouter(prefix="/api")
 
+MAX_PAGE_SIZE = 200
+
 
 @router.get("/")
 async def main():
@@ -16,9 +29,87 @@ async def main():
 
 
 @router.get("/apps", response_model=None)
-async def apps() -> list[AppTemplate]:
+async def apps() -> list[dict]:
     templates = get_app_template_store()
-    return templates.get_all()
+    return [template.to_dict() for template in templates.get_all()]
+
+
+@router.get("/apps/search")
+async def search_apps(
+    q: str = "",
+    env: str | None = None,
+    offset: Annotated[int, Query(ge=0)] = 0,
+    limit: Annotated[int, Query(ge=1, le=MAX_PAGE_SIZE)] = DEFAULT_PAGE_SIZE,
+) -> dict:
+    """
+    Searches the app catalog by app name and label, best matches first.
+    With `env`, apps already installed in that env are left out.
+    """
+    if env is None:
+        page = get_app_template_store().search(q, offset=offset, limit=limit)
+    else:
+        environment = envs.get_env(env)
+
+        if not environment:
+            raise HTTPException(status_code=404, detail="Environment not found")
+
+        page = envs.search_available_apps(environment, q, offset=offset, limit=limit)
+
+    return {
+        "items": [template.to_dict() for template in page.items],
+        "total": page.total,
+        "offset": page.offset,
+        "limit": page.limit,
+    }
+
+
+@router.get("/catalog/validation")
+async def catalog_validation() -> dict[str, dict | None]:
+    """
+    Returns the validation reports of the last load of the app templates
+    and app bundles. Invalid catalogs are rejected at load and the previous
+    catalog is kept, so this is where load errors can be found.
+    """
+    template_store = get_app_template_store()
+
+    try:
+        template_store.get_names()
+        get_app_bundle_store()
+    except ValueError:
+        # described by the reports
+        pass
+
+    return {
+        "app_templates": _report_to_dict(template_store.report),
+        "app_bundles": _report_to_dict(get_app_bundle_report()),
+    }
+
+
+def _report_to_dict(report: ValidationReport | None) -> dict | None:
+    if report is None:
+        return None
+
+    return {
+        "source": report.source,
+        "valid": report.valid,
+        "item_count": report.item_count,
+        "errors": list(report.errors),
+    }
+
+
+@router.get("/apps/{app_name}/image-tag-prefixes")
+async def image_tag_prefixes(app_name: str, q: str = "", limit: int = 20) -> list[str]:
+    try:
+        return image_tags.suggest_image_tag_prefixes(app_name, query=q, limit=limit)
+    except KollieConfigError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except client.ApiException as e:
+        logger.warning(
+            "image_tags.suggestions_unavailable", app_name=app_name, status=e.status
+        )
+        raise HTTPException(
+            status_code=503, detail="Image tag prefixes are unavailable"
+        )
 
 
 @router.get("/env")
@@ -36,26 +127,205 @@ async def environment_details(environment_name: str) -> KollieEnvironment:
     return environment
 
 
-@router.post("/env", status_code=201)
+@router.post("/env", status_code=202)
 async def create_environment(
     user: Annotated[UserInfo, Depends(authenticated_user)],
     env_name: Annotated[str, Body()],
     flux_repo_branch: Annotated[str | None, Body()] = None,
-) -> KollieEnvironment | None:
-    envs.create_env(
+) -> dict:
+    """
+    Queues the creation of an environment. Returns the job, whose progress
+    can be followed at /api/jobs/{job_id}.
+    """
+    job = get_job_runner().submit(
+        "create_env",
+        envs.create_env,
         env_name=env_name,
         owner_email=user.email,
-        flux_repo_branch=flux_repo_branch
+        flux_repo_branch=flux_repo_branch,
     )
 
-    return envs.get_env(env_name)
+    return job.to_dict()
+
+
+@router.post("/env/claim")
+async def claim_environment(
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    bundle_name: Annotated[str, Body()],
+    image_tag_prefixes: Annotated[dict[str, str] | None, Body()] = None,
+) -> dict:
+    """
+    Hands an environment of a bundle's warm pool over to the current user,
+    pointing the apps in `image_tag_prefixes` at other image tag prefixes.
+    The environment keeps the name it was given in the pool.
+    """
+    try:
+        claimed = pool.claim_env(
+            bundle_name=bundle_name,
+            owner_email=user.email,
+            image_tag_prefixes=image_tag_prefixes,
+        )
+    except KollieConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if claimed is None:
+        raise HTTPException(
+            status_code=404, detail=f"No warm environment available for {bundle_name}"
+        )
+
+    return asdict(claimed)
 
 
-@router.delete("/env/{environment_name}", status_code=204)
+@router.delete("/env/{environment_name}", status_code=202)
 async def delete_environment(
     environment_name: str, user: Annotated[UserInfo, Depends(authenticated_user)]
-):
-    envs.delete_env(environment_name)
+) -> dict:
+    """Queues the deletion of an environment. Returns the job."""
+    job = get_job_runner().submit("delete_env", envs.delete_env, environment_name)
+
+    return job.to_dict()
+
+
+@router.post("/env/{environment_name}/bundles", status_code=202)
+async def install_bundle(
+    environment_name: str,
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    bundle_name: Annotated[str, Body(embed=True)],
+) -> dict:
+    """
+    Queues the installation of a bundle in an environment. Returns the job,
+    with a step for each app once it is created.
+    """
+    if not get_app_bundle_store().get_bundle(name=bundle_name):
+        raise HTTPException(status_code=404, detail="Bundle not found")
+
+    job = get_job_runner().submit(
+        "install_bundle",
+        envs.install_bundle,
+        env_name=environment_name,
+        bundle_name=bundle_name,
+        owner_email=user.email,
+    )
+
+    return job.to_dict()
+
+
+@router.post("/env/{environment_name}/clone", status_code=202)
+async def clone_environment(
+    environment_name: str,
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    target_env_name: Annotated[str, Body(embed=True)],
+) -> dict:
+    """
+    Queues the creation of a copy of an environment, owned by the current
+    user. Returns the job, with a step for each app once it is created.
+    """
+    job = get_job_runner().submit(
+        "clone_env",
+        envs.clone_env,
+        source_env_name=environment_name,
+        target_env_name=target_env_name,
+        owner_email=user.email,
+    )
+
+    return job.to_dict()
+
+
+@router.get("/env/{environment_name}/snapshot")
+async def export_environment(environment_name: str) -> dict:
+    """
+    Returns a snapshot of an environment, which /api/env/import recreates.
+    """
+    try:
+        return envs.export_env(environment_name).to_dict()
+    except KollieConfigError:
+        raise HTTPException(status_code=404, detail="Environment not found")
+
+
+@router.post("/env/import", status_code=202)
+async def import_environment(
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    snapshot: Annotated[dict, Body()],
+    env_name: Annotated[str | None, Body()] = None,
+) -> dict:
+    """
+    Queues the recreation of an environment from a snapshot, owned by the
+    current user and named after the snapshot unless `env_name` is given.
+    Returns the job, with a step for each app once it is created.
+    """
+    try:
+        env_snapshot = EnvironmentSnapshot.from_dict(snapshot)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = get_job_runner().submit(
+        "import_env",
+        envs.import_env,
+        env_snapshot,
+        owner_email=user.email,
+        env_name=env_name,
+    )
+
+    return job.to_dict()
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str) -> dict:
+    """
+    Returns the status of a job. Jobs are kept in memory by the replica that
+    runs them, for a limited number of finished jobs.
+    """
+    job = get_job_runner().get(job_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return job.to_dict()
+
+
+@router.post("/env/bulk/delete", status_code=202)
+async def bulk_delete_environments(
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    selector: Annotated[envs.EnvSelector, Body(embed=True)],
+) -> dict:
+    """
+    Queues the deletion of every env matching the selector. The job's result
+    is the error by env name, null for the envs that were deleted.
+    """
+    job = get_job_runner().submit(
+        "delete_envs", envs.delete_envs, _select_envs(selector)
+    )
+
+    return job.to_dict()
+
+
+@router.post("/env/bulk/extend-lease", status_code=202)
+async def bulk_extend_leases(
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+    selector: Annotated[envs.EnvSelector, Body()],
+    hour: Annotated[int, Body(ge=0, le=23)],
+    days: Annotated[int, Body(ge=0, le=5)] = 0,
+) -> dict:
+    """
+    Queues the lease extension of every env matching the selector. The job's
+    result is the error by env name, null for the envs that were extended.
+    """
+    job = get_job_runner().submit(
+        "extend_leases",
+        envs.extend_leases,
+        _select_envs(selector),
+        hour=hour,
+        days=days,
+    )
+
+    return job.to_dict()
+
+
+def _select_envs(selector: envs.EnvSelector) -> list[str]:
+    try:
+        return envs.select_envs(selector)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/debug")
@@ -1,13 +1,24 @@
+import datetime
+import json
+from pathlib import Path
+from typing import Optional
+
+import structlog
 import typer
 
 from kollie.cluster.authentication import connect_to_cluster
 from kollie.logging_config import configure_logger
 from kollie.heartbeat import start_heartbeat
+from kollie.models import EnvironmentSnapshot
 from kollie.cluster.image_update_automation import watch_for_image_updates
 from kollie.service import envs
+from kollie.service.env_summary import start_env_summary_refresher
+from kollie.service.pool import start_pool_refresher
 
 app = typer.Typer()
 
+logger = structlog.get_logger(__name__)
+
 
 @app.command()
 def reconcile(
@@ -18,6 +29,14 @@ def reconcile(
     if heartbeat:
         start_heartbeat()
 
+    try:
+        envs.backfill_owner_labels()
+    except Exception:
+        # list_envs still finds unlabelled envs, so the daemon carries on
+        logger.exception("envs.owner_label_backfill_failed")
+
+    start_env_summary_refresher()
+    start_pool_refresher()
     watch_for_image_updates()
 
 
@@ -28,8 +47,170 @@ def active_envs():
 
 
 @app.command()
-def rebuild_env_configs():
-    envs.rebuild_configs()
+def backfill_owner_labels():
+    for env_name in envs.backfill_owner_labels():
+        typer.echo(env_name)
+
+
+def _env_selector(
+    names: list[str] | None,
+    owner: str | None,
+    prefix: str | None,
+    created_before: datetime.datetime | None,
+    lease_expired: bool | None,
+) -> envs.EnvSelector:
+    return envs.EnvSelector(
+        names=names or None,
+        owner_email=owner,
+        name_prefix=prefix,
+        created_before=created_before,
+        lease_expired=lease_expired,
+    )
+
+
+def _echo_results(results: dict[str, str | None]) -> None:
+    for env_name, error in results.items():
+        if error:
+            typer.echo(f"{env_name}: {error}", err=True)
+        else:
+            typer.echo(f"{env_name}: ok")
+
+    if any(results.values()):
+        raise typer.Exit(code=1)
+
+
+NAMES_ARGUMENT = typer.Argument(None, help="Names of the envs")
+OWNER_OPTION = typer.Option(None, "--owner", help="Email of the envs' owner")
+PREFIX_OPTION = typer.Option(None, "--prefix", help="Prefix of the env names")
+CREATED_BEFORE_OPTION = typer.Option(
+    None, "--created-before", help="Only envs created before this time"
+)
+LEASE_EXPIRED_OPTION = typer.Option(
+    None, "--lease-expired/--lease-active", help="Only envs whose lease expired, or not"
+)
+CONCURRENCY_OPTION = typer.Option(
+    envs.BULK_OPERATION_CONCURRENCY,
+    "--concurrency",
+    help="Maximum number of envs handled at once",
+)
+DRY_RUN_OPTION = typer.Option(
+    False, "--dry-run", help="List the selected envs without changing them"
+)
+
+
+@app.command()
+def delete_envs(
+    names: Optional[list[str]] = NAMES_ARGUMENT,
+    owner: Optional[str] = OWNER_OPTION,
+    prefix: Optional[str] = PREFIX_OPTION,
+    created_before: Optional[datetime.datetime] = CREATED_BEFORE_OPTION,
+    lease_expired: Optional[bool] = LEASE_EXPIRED_OPTION,
+    concurrency: int = CONCURRENCY_OPTION,
+    dry_run: bool = DRY_RUN_OPTION,
+):
+    env_names = envs.select_envs(
+        _env_selector(names, owner, prefix, created_before, lease_expired)
+    )
+
+    if dry_run:
+        for env_name in env_names:
+            typer.echo(env_name)
+        return
+
+    _echo_results(envs.delete_envs(env_names, max_workers=concurrency))
+
+
+@app.command()
+def extend_leases(
+    hour: int = typer.Option(..., "--hour", min=0, max=23, help="Hour the leases end at"),
+    days: int = typer.Option(0, "--days", min=0, max=5, help="Number of days to extend by"),
+    names: Optional[list[str]] = NAMES_ARGUMENT,
+    owner: Optional[str] = OWNER_OPTION,
+    prefix: Optional[str] = PREFIX_OPTION,
+    created_before: Optional[datetime.datetime] = CREATED_BEFORE_OPTION,
+    lease_expired: Optional[bool] = LEASE_EXPIRED_OPTION,
+    concurrency: int = CONCURRENCY_OPTION,
+    dry_run: bool = DRY_RUN_OPTION,
+):
+    env_names = envs.select_envs(
+        _env_selector(names, owner, prefix, created_before, lease_expired)
+    )
+
+    if dry_run:
+        for env_name in env_names:
+            typer.echo(env_name)
+        return
+
+    _echo_results(
+        envs.extend_leases(env_names, hour=hour, days=days, max_workers=concurrency)
+    )
+
+
+@app.command()
+def export_env(
+    name: str = typer.Argument(..., help="Name of the env"),
+    output: Optional[Path] = typer.Option(
+        None, "--output", help="File to write the snapshot to, stdout by default"
+    ),
+):
+    snapshot = json.dumps(envs.export_env(name).to_dict(), separators=(",", ":"))
+
+    if output:
+        output.write_text(snapshot)
+    else:
+        typer.echo(snapshot)
+
+
+@app.command()
+def import_env(
+    snapshot_file: Path = typer.Argument(..., help="Snapshot made by export-env"),
+    name: Optional[str] = typer.Option(
+        None, "--name", help="Name of the new env, the snapshot's by default"
+    ),
+    owner: Optional[str] = typer.Option(
+        None, "--owner", help="Email of the new env's owner, the snapshot's by default"
+    ),
+):
+    snapshot = EnvironmentSnapshot.from_dict(json.loads(snapshot_file.read_text()))
+    owner_email = owner or snapshot.owner_email
+
+    if not owner_email:
+        raise typer.BadParameter("The snapshot has no owner, use --owner")
+
+    creation = envs.import_env(snapshot, owner_email=owner_email, env_name=name)
+
+    typer.echo(
+        f"Created {name or snapshot.name} with {len(creation.created)} apps "
+        f"({len(creation.existing)} already existed)"
+    )
+
+
+@app.command()
+def rebuild_env_configs(
+    concurrency: int = typer.Option(
+        envs.REBUILD_CONFIGS_CONCURRENCY,
+        "--concurrency",
+        help="Maximum number of envs rebuilt at once",
+    ),
+    page_size: int = typer.Option(
+        envs.REBUILD_CONFIGS_PAGE_SIZE,
+        "--page-size",
+        help="Number of env configmaps listed at once",
+    ),
+):
+    rebuild = envs.rebuild_configs(max_workers=concurrency, page_size=page_size)
+
+    typer.echo(
+        f"Scanned {rebuild.scanned} envs in {rebuild.elapsed_seconds:.1f}s "
+        f"({rebuild.envs_per_second:.1f}/s): {len(rebuild.updated)} updated, "
+        f"{len(rebuild.failed)} failed"
+    )
+
+    for env_name, error in rebuild.failed.items():
+        typer.echo(f"{env_name}: {error}", err=True)
+
+    if rebuild.failed:
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
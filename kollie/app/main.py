@@ -1,11 +1,15 @@
 import pathlib
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from kollie.logging_config import configure_logger
 from kollie.cluster.authentication import connect_to_cluster
+from kollie.config_watcher import start_config_watcher
 
 from .api import endpoints
+from .preload import start_preload
+from .readiness import check_readiness
 from .ui import views
 
 
@@ -26,7 +30,33 @@ def create_app():
     async def ping():
         return {"message": "Pong..."}
 
+    @app.get("/readyz")
+    def readyz():
+        """
+        Readiness probe. Kollie is ready once it can reach the cluster, the
+        catalog is loaded and the start up warm-up finished, so that the first
+        request routed to it is fast.
+        """
+        results = check_readiness()
+        ready = all(result.ready for result in results.values())
+
+        return JSONResponse(
+            status_code=200 if ready else 503,
+            content={
+                "ready": ready,
+                "checks": {
+                    name: {"ready": result.ready, "detail": result.detail}
+                    for name, result in results.items()
+                },
+            },
+        )
+
+    # config files and UI templates are loaded on first use, preloading
+    # them once the server is starting keeps that off the startup path
+    app.add_event_handler("startup", start_preload)
+
     configure_logger()
     connect_to_cluster()
+    start_config_watcher()
 
     return app
@@ -0,0 +1,91 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import structlog
+
+from kollie.cluster.authentication import check_cluster_connection
+from kollie.cluster.constants import get_common_substitutions
+from kollie.persistence import get_app_template_store
+from kollie.persistence.app_bundle import get_app_bundle_store
+from kollie.service.image_tags import load_image_tag_index
+
+from .ui.views import preload_templates
+
+
+logger = structlog.get_logger(__name__)
+
+
+def _preload_app_templates() -> None:
+    get_app_template_store().get_names()
+
+
+def _preload_app_bundles() -> None:
+    get_app_bundle_store()
+
+
+# Everything that is otherwise loaded on first use. Preloads run in
+# parallel as most of them wait on the filesystem or the Kubernetes API.
+PRELOADS: dict[str, Callable[[], object]] = {
+    "cluster": check_cluster_connection,
+    "common_substitutions": get_common_substitutions,
+    "app_templates": _preload_app_templates,
+    "app_bundles": _preload_app_bundles,
+    "image_tag_index": load_image_tag_index,
+    "ui_templates": preload_templates,
+}
+
+_preloaded = threading.Event()
+_preloader: threading.Thread | None = None
+
+
+def preload() -> None:
+    """
+    Loads the config files, primes the caches and compiles the UI templates
+    ahead of the first request that needs them.
+
+    Failures are only logged, whatever failed is loaded again (and fails
+    loudly) on first use.
+    """
+    with ThreadPoolExecutor(
+        max_workers=len(PRELOADS) or 1, thread_name_prefix="preload"
+    ) as executor:
+        for name, load in PRELOADS.items():
+            executor.submit(_preload, name, load)
+
+    _preloaded.set()
+
+
+def _preload(name: str, load: Callable[[], object]) -> None:
+    started = time.perf_counter()
+
+    try:
+        load()
+    except Exception:
+        logger.exception("preload.failed", preload=name)
+    else:
+        logger.debug(
+            "preload.loaded",
+            preload=name,
+            duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        )
+
+
+def is_preloaded() -> bool:
+    """Whether the background preload has finished."""
+    return _preloaded.is_set()
+
+
+def start_preload() -> None:
+    """
+    Start the preload function in a daemon thread, once per process, so the
+    server can start accepting connections straight away.
+    """
+    global _preloader
+
+    if _preloader is not None:
+        return
+
+    _preloader = threading.Thread(target=preload, daemon=True)
+    _preloader.start()
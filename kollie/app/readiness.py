@@ -0,0 +1,118 @@
+from dataclasses import dataclass
+from typing import Callable
+
+import structlog
+
+from kollie.cache import TTLCache
+from kollie.cluster.authentication import check_cluster_connection
+from kollie.persistence import get_app_template_store
+from kollie.persistence.app_bundle import get_app_bundle_store
+from kollie.persistence.configmap_source import (
+    CATALOG_CONFIGMAP_SELECTOR,
+    get_configmap_catalog,
+)
+
+from .preload import is_preloaded
+
+
+logger = structlog.get_logger(__name__)
+
+# Readiness probes run every few seconds, the API server is only asked
+# this often.
+CLUSTER_CHECK_CACHE_SECONDS = 10
+
+
+@dataclass(frozen=True, slots=True)
+class CheckResult:
+    """The outcome of a readiness check."""
+
+    ready: bool
+    detail: str = ""
+
+
+_cluster_checks: TTLCache[str, CheckResult] = TTLCache(
+    ttl_seconds=CLUSTER_CHECK_CACHE_SECONDS
+)
+
+
+def check_warm_up() -> CheckResult:
+    if is_preloaded():
+        return CheckResult(ready=True)
+
+    return CheckResult(ready=False, detail="warming up")
+
+
+def check_cluster() -> CheckResult:
+    return _cluster_checks.get_or_load("cluster", _check_cluster)
+
+
+def _check_cluster() -> CheckResult:
+    try:
+        return CheckResult(ready=True, detail=check_cluster_connection())
+    except Exception as exc:
+        logger.warning("readiness.cluster_unreachable", exc_info=True)
+        return CheckResult(ready=False, detail=f"API server unreachable: {exc}")
+
+
+def check_app_templates() -> CheckResult:
+    store = get_app_template_store()
+
+    try:
+        app_names = store.get_names()
+    except Exception as exc:
+        return CheckResult(ready=False, detail=str(exc))
+
+    return CheckResult(ready=True, detail=f"{len(app_names)} app templates")
+
+
+def check_app_bundles() -> CheckResult:
+    try:
+        store = get_app_bundle_store()
+    except Exception as exc:
+        return CheckResult(ready=False, detail=str(exc))
+
+    return CheckResult(ready=True, detail=f"{len(store.get_all_bundles())} app bundles")
+
+
+def check_configmap_catalog() -> CheckResult:
+    if not CATALOG_CONFIGMAP_SELECTOR:
+        return CheckResult(ready=True, detail="not used")
+
+    try:
+        catalog = get_configmap_catalog()
+    except Exception as exc:
+        return CheckResult(ready=False, detail=str(exc))
+
+    if not catalog.synced:
+        return CheckResult(ready=False, detail="not synced")
+
+    return CheckResult(ready=True, detail=f"version {catalog.version}")
+
+
+# Everything that must be ready before the pod receives traffic
+READINESS_CHECKS: dict[str, Callable[[], CheckResult]] = {
+    "warm_up": check_warm_up,
+    "cluster": check_cluster,
+    "configmap_catalog": check_configmap_catalog,
+    "app_templates": check_app_templates,
+    "app_bundles": check_app_bundles,
+}
+
+
+def check_readiness() -> dict[str, CheckResult]:
+    """
+    Runs every readiness check.
+
+    Returns:
+        dict[str, CheckResult]: The result of each check by name.
+    """
+    results = {}
+
+    for name, check in READINESS_CHECKS.items():
+        try:
+            results[name] = check()
+        except Exception as exc:
+            logger.exception("readiness.check_failed", check=name)
+            results[name] = CheckResult(ready=False, detail=str(exc))
+
+    return results
@@ -0,0 +1,61 @@
+// Searches the app catalog using /api/apps/search as the user types and
+// replaces the options of the app <select> named by `data-app-select`.
+// `data-env-name` leaves out the apps already installed in that env.
+(function () {
+    const input = document.getElementById("app_search");
+
+    if (!input) {
+        return;
+    }
+
+    const select = document.getElementById(input.dataset.appSelect);
+    const help = document.getElementById("app_search_help");
+    let timer = null;
+    let latest = 0;
+
+    function search() {
+        const request = ++latest;
+        const params = new URLSearchParams({ q: input.value, limit: input.dataset.pageSize || "50" });
+
+        if (input.dataset.envName) {
+            params.set("env", input.dataset.envName);
+        }
+
+        fetch("/api/apps/search?" + params.toString())
+            .then(function (response) { return response.ok ? response.json() : null; })
+            .then(function (page) {
+                // ignore responses to searches that have been superseded
+                if (!page || request !== latest) {
+                    return;
+                }
+
+                const placeholder = document.createElement("option");
+                placeholder.value = "";
+                placeholder.textContent = page.total ? "Select an app" : "No matching apps";
+
+                select.replaceChildren(placeholder, ...page.items.map(function (app) {
+                    const option = document.createElement("option");
+                    option.value = app.app_name;
+                    option.textContent = app.app_name === app.label ? app.app_name : app.app_name + " (" + app.label + ")";
+                    return option;
+                }));
+
+                if (page.items.length === 1) {
+                    select.value = page.items[0].app_name;
+                }
+                select.dispatchEvent(new Event("change"));
+
+                if (help) {
+                    help.textContent = page.total > page.items.length
+                        ? "Showing " + page.items.length + " of " + page.total + " apps, refine the search to find more."
+                        : "";
+                }
+            })
+            .catch(function () { });
+    }
+
+    input.addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(search, 150);
+    });
+})();
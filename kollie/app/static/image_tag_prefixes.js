@@ -0,0 +1,46 @@
+// Autocompletes image tag prefix inputs using /api/apps/{app_name}/image-tag-prefixes.
+// Inputs name their app with `data-app-name`, or point at the app <select>
+// with `data-app-select`, and their <datalist> with `list`.
+(function () {
+    function appNameFor(input) {
+        if (input.dataset.appName) {
+            return input.dataset.appName;
+        }
+        const select = document.getElementById(input.dataset.appSelect);
+        return select ? select.value : "";
+    }
+
+    document.querySelectorAll("input[list][data-app-name], input[list][data-app-select]").forEach(function (input) {
+        const datalist = document.getElementById(input.getAttribute("list"));
+        let timer = null;
+
+        function refresh() {
+            const appName = appNameFor(input);
+
+            if (!appName) {
+                datalist.replaceChildren();
+                return;
+            }
+
+            const url = "/api/apps/" + encodeURIComponent(appName)
+                + "/image-tag-prefixes?q=" + encodeURIComponent(input.value);
+
+            fetch(url)
+                .then(function (response) { return response.ok ? response.json() : []; })
+                .then(function (prefixes) {
+                    datalist.replaceChildren(...prefixes.map(function (prefix) {
+                        const option = document.createElement("option");
+                        option.value = prefix;
+                        return option;
+                    }));
+                })
+                .catch(function () { });
+        }
+
+        input.addEventListener("input", function () {
+            clearTimeout(timer);
+            timer = setTimeout(refresh, 150);
+        });
+        input.addEventListener("focus", refresh);
+    });
+})();
@@ -0,0 +1,77 @@
+// Follows a background job through /api/jobs/{id} and shows its progress in
+// the element with id `job_status`. The page is reloaded (without the job)
+// once the job succeeds so that it shows the result.
+(function () {
+    const panel = document.getElementById("job_status");
+
+    if (!panel) {
+        return;
+    }
+
+    const label = document.getElementById("job_status_label");
+    const error = document.getElementById("job_status_error");
+    const steps = document.getElementById("job_status_steps");
+
+    function render(job) {
+        label.textContent = job.status;
+        error.textContent = job.error || "";
+
+        steps.replaceChildren(...job.steps.map(function (step) {
+            const item = document.createElement("li");
+            item.textContent = step.name + ": " + step.status + (step.detail ? " (" + step.detail + ")" : "");
+            return item;
+        }));
+    }
+
+    // A job's status can only be read from the replica that runs it, so a
+    // failed read is retried a few times before giving up on the job.
+    const MAX_FAILED_POLLS = 5;
+    let failedPolls = 0;
+
+    function retry(message) {
+        failedPolls += 1;
+
+        if (failedPolls >= MAX_FAILED_POLLS) {
+            label.textContent = "unknown";
+            error.textContent = message + ". Reload the page to see the environment's current state.";
+            panel.classList.replace("alert-info", "alert-warning");
+            return;
+        }
+
+        error.textContent = message + ", retrying...";
+        setTimeout(poll, 2000 * Math.pow(2, failedPolls));
+    }
+
+    function poll() {
+        fetch("/api/jobs/" + encodeURIComponent(panel.dataset.jobId))
+            .then(function (response) {
+                if (!response.ok) {
+                    retry(response.status === 404 ? "Job status not found" : "Could not read the job status");
+                    return null;
+                }
+
+                return response.json();
+            })
+            .then(function (job) {
+                if (!job) {
+                    return;
+                }
+
+                failedPolls = 0;
+                render(job);
+
+                if (job.status === "succeeded") {
+                    window.location.replace(panel.dataset.envUrl);
+                } else if (job.status === "failed") {
+                    panel.classList.replace("alert-info", "alert-danger");
+                } else {
+                    setTimeout(poll, 2000);
+                }
+            })
+            .catch(function () {
+                retry("Could not reach Kollie");
+            });
+    }
+
+    poll();
+})();
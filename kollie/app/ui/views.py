@@ -8,9 +8,12 @@ from kollie.app.auth import UserInfo, authenticated_user, userinfo
 
 from kollie.app.ui.templatefilters import humanise_date_filter
 from kollie.app.ui.viewmodels import render_resources
-from kollie.exceptions import KollieException
+from kollie.exceptions import (
+    KollieException,
+    KollieUnknownImageTagPrefixError,
+)
+from kollie.jobs import get_job_runner
 from kollie.service import envs
-from kollie.persistence import get_app_template_store
 from kollie.service import applications
 
 
@@ -63,6 +66,15 @@ def _init_templates() -> Jinja2Templates:
 templates = _init_templates()
 
 
+def preload_templates() -> None:
+    """
+    Compiles every template up front. Jinja otherwise compiles templates on
+    first render and caches them.
+    """
+    for name in templates.env.list_templates(extensions=["jinja2"]):
+        templates.env.get_template(name)
+
+
 @router.get("/")
 async def environment_index(request: Request, owner: str | None = None):
     running_environments = envs.list_envs(owner_email=owner)
@@ -76,13 +88,7 @@ async def create_environment(
     request: Request,
     user: Annotated[UserInfo, Depends(authenticated_user)],
 ):
-    app_templates = get_app_template_store()
-
-    return templates.TemplateResponse(
-        request,
-        "/create.jinja2",
-        {"available_apps": app_templates.get_all()},
-    )
+    return templates.TemplateResponse(request, "/create.jinja2")
 
 
 @router.post("/delete/{testenv_name}")
@@ -91,7 +97,7 @@ async def delete_environment(
     testenv_name: str,
     user: Annotated[UserInfo, Depends(authenticated_user)],
 ):
-    envs.delete_env(testenv_name)
+    get_job_runner().submit("delete_env", envs.delete_env, testenv_name)
     return RedirectResponse(
         url=router.url_path_for("environment_index"), status_code=302
     )
@@ -117,10 +123,11 @@ async def handle_create_env(
 
 
 @router.get("/env/{testenv_name}")
-async def env_detail(request: Request, testenv_name: str):
+async def env_detail(request: Request, testenv_name: str, job: str | None = None):
     environment = envs.get_env(testenv_name)
     ctx = {
         "environment": environment,
+        "job": get_job_runner().get(job) if job else None,
         "allow_extended_lease": any(candidate in testenv_name for candidate in envs.EXTENDED_LEASE_TEST_ENV_NAMES) if envs.EXTENDED_LEASE_TEST_ENV_NAMES else False,
     }
     return templates.TemplateResponse(
@@ -136,7 +143,14 @@ async def extend_lease(
     user: Annotated[UserInfo, Depends(authenticated_user)],
     days: Annotated[int, Form()] = 0,
 ):
-    envs.extend_lease(env_name, hour, days)
+    results = envs.extend_lease(env_name, hour, days)
+    failed = [app_name for app_name, error in results.items() if error]
+
+    if failed:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to extend the lease of {', '.join(failed)}",
+        )
 
     return RedirectResponse(
         url=router.url_path_for("env_detail", testenv_name=env_name),
@@ -151,8 +165,13 @@ async def add_app_to_env(
 ):
     environment = envs.get_env(env_name)
 
-    if environment:
-        available_apps = envs.get_available_apps(environment)
+    if not environment:
+        raise HTTPException(
+            status_code=404, detail=f"Environment `{env_name}` not found"
+        )
+
+    # only the first page is rendered, the rest is searched from the page
+    available_apps = envs.search_available_apps(environment)
 
     return templates.TemplateResponse(
         request,
@@ -211,29 +230,68 @@ async def deploy_bundle(
             status_code=404, detail=f"Environment `{env_name}` not found"
         )
 
-    envs.install_bundle(
-        env_name=env_name, bundle_name=bundle_name, owner_email=user.email
+    job = get_job_runner().submit(
+        "install_bundle",
+        envs.install_bundle,
+        env_name=env_name,
+        bundle_name=bundle_name,
+        owner_email=user.email,
     )
 
+    # the env page follows the installation's progress
     return RedirectResponse(
-        url=router.url_path_for("env_detail", testenv_name=env_name),
+        url=router.url_path_for("env_detail", testenv_name=env_name)
+        + f"?job={job.id}",
         status_code=302,
     )
 
 
+@router.post("/env/{env_name}/clone")
+async def clone_environment(
+    env_name: str,
+    target_env_name: Annotated[str, Form()],
+    user: Annotated[UserInfo, Depends(authenticated_user)],
+):
+    environment = envs.get_env(env_name)
+    if not environment:
+        raise HTTPException(
+            status_code=404, detail=f"Environment `{env_name}` not found"
+        )
+
+    job = get_job_runner().submit(
+        "clone_env",
+        envs.clone_env,
+        source_env_name=env_name,
+        target_env_name=target_env_name,
+        owner_email=user.email,
+    )
+
+    # the source env page follows the clone's progress
+    return RedirectResponse(
+        url=router.url_path_for("env_detail", testenv_name=env_name)
+        + f"?job={job.id}",
+        status_code=302,
+    )
+
+
+# Not async: creating an app can wait for the env's GitRepository, so it runs
+# in the threadpool rather than on the event loop
 @router.post("/env/{env_name}/add-app")
-async def save_app_to_env(
+def save_app_to_env(
     env_name: str,
     app_name: Annotated[str, Form()],
     user: Annotated[UserInfo, Depends(authenticated_user)],
     image_tag_prefix: Annotated[str | None, Form()] = None,
 ):
-    applications.create_app(
-        app_name=app_name,
-        env_name=env_name,
-        owner_email=user.email,
-        image_tag_prefix=image_tag_prefix,
-    )
+    try:
+        applications.create_app(
+            app_name=app_name,
+            env_name=env_name,
+            owner_email=user.email,
+            image_tag_prefix=image_tag_prefix,
+        )
+    except KollieUnknownImageTagPrefixError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return RedirectResponse(
         url=router.url_path_for("env_detail", testenv_name=env_name),
@@ -301,11 +359,14 @@ async def app_save(
     """
     Edit configuration of an app in a specified environment.
     """
-    applications.update_app(
-        env_name=env_name,
-        app_name=app_name,
-        attributes=dict(image_tag_prefix=image_tag_prefix),
-    )
+    try:
+        applications.update_app(
+            env_name=env_name,
+            app_name=app_name,
+            attributes=dict(image_tag_prefix=image_tag_prefix),
+        )
+    except KollieUnknownImageTagPrefixError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     return RedirectResponse(
         url=router.url_path_for("app_detail", env_name=env_name, app_name=app_name),
@@ -0,0 +1,70 @@
+import threading
+import time
+from typing import Callable, Generic, Hashable, TypeVar
+
+KeyType = TypeVar("KeyType", bound=Hashable)
+ValueType = TypeVar("ValueType")
+
+_MISSING = object()
+
+
+class TTLCache(Generic[KeyType, ValueType]):
+    """
+    Small thread-safe in-memory cache whose entries expire after a fixed time.
+
+    Args:
+        ttl_seconds (float): How long entries are kept.
+    """
+
+    def __init__(self, ttl_seconds: float) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._entries: dict[KeyType, tuple[float, ValueType]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: KeyType) -> ValueType | None:
+        """Returns the cached value or None if it is missing or expired."""
+        value = self._lookup(key)
+        return None if value is _MISSING else value  # type: ignore[return-value]
+
+    def set(self, key: KeyType, value: ValueType) -> None:
+        """Caches a value."""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+
+    def get_or_load(self, key: KeyType, loader: Callable[[], ValueType]) -> ValueType:
+        """
+        Returns the cached value, calling `loader` to populate the cache when
+        the value is missing or expired. None results are cached too.
+        """
+        value = self._lookup(key)
+
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)  # type: ignore[arg-type]
+
+        return value  # type: ignore[return-value]
+
+    def invalidate(self, key: KeyType) -> None:
+        """Removes a value from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes all values from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def _lookup(self, key: KeyType) -> object:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return _MISSING
+
+            expires_at, value = entry
+
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return _MISSING
+
+            return value
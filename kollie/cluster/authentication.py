@@ -1,13 +1,16 @@
 import os
 
 import structlog
-from kubernetes import config
+from kubernetes import client, config
 
 from kollie.constants import LOCAL_STAGE, TEST_STAGE
 
 
 logger = structlog.get_logger(__name__)
 
+# Seconds to wait for the API server when checking the connection
+CLUSTER_CHECK_TIMEOUT = 2
+
 
 def connect_to_cluster():
     logger.debug("Connecting to Kubernetes Cluster")
@@ -27,6 +30,24 @@ def connect_to_cluster():
         raise
 
 
+def check_cluster_connection(timeout: float = CLUSTER_CHECK_TIMEOUT) -> str:
+    """
+    Checks that the Kubernetes API server can be reached.
+
+    Args:
+        timeout (float): Request timeout in seconds.
+
+    Raises:
+        ApiException, urllib3.exceptions.HTTPError: If the API server
+            can't be reached.
+
+    Returns:
+        str: The version of the API server.
+    """
+    version = client.VersionApi().get_code(_request_timeout=timeout)
+    return version.git_version
+
+
 def _connect_in_cluster_mode(logger):
     logger.info("Connecting to Kubernetes Cluster in cluster mode")
     config.load_incluster_config()
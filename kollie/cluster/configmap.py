@@ -1,12 +1,34 @@
 import datetime
+import hashlib
 import json
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
+from kollie.cluster.constants import OWNER_HASH_LABEL
 from kollie.cluster.kustomization import KOLLIE_NAMESPACE
 
 from kubernetes.client.models.v1_config_map import V1ConfigMap
+from kubernetes.client.models.v1_config_map_list import V1ConfigMapList
 
 
-from kubernetes import client
+from kubernetes import client, watch
+
+# Number of times a read-modify-write of an env configmap is retried when it
+# loses a race against another writer.
+MAX_UPDATE_ATTEMPTS = 5
+
+
+def owner_label_value(owner_email: str) -> str:
+    """
+    Returns the value of the owner hash label for an owner's email: the
+    first 40 hex characters of the SHA-256 of the lowercased email.
+
+    Args:
+        owner_email (str): Email of the owner
+
+    Returns:
+        str: A valid label value identifying the owner
+    """
+    normalised = owner_email.strip().lower().encode()
+    return hashlib.sha256(normalised).hexdigest()[:40]
 
 
 def get_configmap(name: str, namespace: str = ""):
@@ -29,31 +51,108 @@ def get_configmap(name: str, namespace: str = ""):
         raise exc
 
 
-def get_configmaps(label_filters: Dict[str, str] | None = None) -> List[V1ConfigMap]:
+def get_configmaps(
+    label_filters: Dict[str, str | None] | None = None,
+) -> List[V1ConfigMap]:
     """
     Get a list of configmaps from the cluster.
 
     Args:
-        label_filters (dict[str, str]): Label filters to apply
+        label_filters (dict[str, str | None]): Label filters to apply, None
+            to select the configmaps without the label
 
     Returns:
         List[V1ConfigMap]: A list of configmaps
     """
     v1 = client.CoreV1Api()
 
-    label_filters = label_filters or {}
-    labels = ["tails-app-stage=testing"]
-
-    for key, value in label_filters.items():
-        labels.append(f"{key}={value}")
-
     configmaps = v1.list_namespaced_config_map(
-        KOLLIE_NAMESPACE, label_selector=",".join(labels)
+        KOLLIE_NAMESPACE, label_selector=_label_selector(label_filters)
     )
 
     return configmaps.items
 
 
+def iter_configmap_pages(
+    label_filters: Dict[str, str | None] | None = None, page_size: int = 250
+) -> Iterator[List[V1ConfigMap]]:
+    """
+    Lists configmaps from the cluster a page at a time, so that callers
+    going through every env don't hold all of them in memory at once.
+
+    Args:
+        label_filters (dict[str, str]): Label filters to apply
+        page_size (int): Maximum number of configmaps per page
+
+    Returns:
+        Iterator[List[V1ConfigMap]]: The pages of configmaps
+    """
+    v1 = client.CoreV1Api()
+
+    label_selector = _label_selector(label_filters)
+    continue_token = None
+
+    while True:
+        kwargs = {"label_selector": label_selector, "limit": page_size}
+        if continue_token:
+            kwargs["_continue"] = continue_token
+
+        configmaps = v1.list_namespaced_config_map(KOLLIE_NAMESPACE, **kwargs)
+
+        yield configmaps.items
+
+        continue_token = configmaps.metadata._continue
+        if not continue_token:
+            return
+
+
+def _label_selector(label_filters: Dict[str, str | None] | None) -> str:
+    labels = ["tails-app-stage=testing"]
+
+    for key, value in (label_filters or {}).items():
+        labels.append(f"!{key}" if value is None else f"{key}={value}")
+
+    return ",".join(labels)
+
+
+def list_configmaps_by_selector(label_selector: str) -> V1ConfigMapList:
+    """
+    List the configmaps matching a label selector, without Kollie's default
+    labels, e.g. to read the configmaps holding the app catalog.
+
+    Args:
+        label_selector (str): Kubernetes label selector
+
+    Returns:
+        V1ConfigMapList: The configmaps and the list's resource version
+    """
+    v1 = client.CoreV1Api()
+
+    return v1.list_namespaced_config_map(KOLLIE_NAMESPACE, label_selector=label_selector)
+
+
+def watch_configmaps(label_selector: str, resource_version: str) -> Iterator[dict]:
+    """
+    Stream changes to the configmaps matching a label selector, starting
+    after `resource_version`.
+
+    Args:
+        label_selector (str): Kubernetes label selector
+        resource_version (str): Resource version to resume from
+
+    Returns:
+        Iterator[dict]: Watch events with `type` and `object` (V1ConfigMap)
+    """
+    v1 = client.CoreV1Api()
+
+    return watch.Watch().stream(
+        v1.list_namespaced_config_map,
+        KOLLIE_NAMESPACE,
+        label_selector=label_selector,
+        resource_version=resource_version,
+    )
+
+
 def create_env_configmap(
     env_name: str,
     owner_email: str,
@@ -86,6 +185,7 @@ def create_env_configmap(
             "tails-app-stage": "testing",
             "tails-app-environment": env_name,
             "kollie.tails.com/managed-by": "kollie",
+            OWNER_HASH_LABEL: owner_label_value(owner_email),
         },
     )
 
@@ -108,6 +208,103 @@ def create_env_configmap(
     return v1.create_namespaced_config_map(KOLLIE_NAMESPACE, body)
 
 
+def set_configmap_labels(name: str, labels: Dict[str, str]) -> V1ConfigMap:
+    """
+    Adds labels to a configmap, replacing existing values.
+
+    Args:
+        name (str): Name of the configmap
+        labels (dict[str, str]): Labels to set
+
+    Returns:
+        V1ConfigMap: The patched configmap
+    """
+    v1 = client.CoreV1Api()
+
+    return v1.patch_namespaced_config_map(
+        name, KOLLIE_NAMESPACE, {"metadata": {"labels": labels}}
+    )
+
+
+def set_configmap_owner(
+    configmap: V1ConfigMap, owner_email: str, labels: Dict[str, str | None]
+) -> V1ConfigMap:
+    """
+    Hands an env configmap over to a new owner. The resourceVersion of the
+    configmap is sent with the patch, so the API server rejects it with a
+    409 if the configmap changed since it was read, e.g. because somebody
+    else took it over first.
+
+    Args:
+        configmap (V1ConfigMap): The configmap as last read
+        owner_email (str): Email of the new owner
+        labels (dict[str, str | None]): Other labels to set, None removes
+            the label
+
+    Returns:
+        V1ConfigMap: The patched configmap
+    """
+    v1 = client.CoreV1Api()
+
+    return v1.patch_namespaced_config_map(
+        configmap.metadata.name,
+        KOLLIE_NAMESPACE,
+        {
+            "metadata": {
+                "resourceVersion": configmap.metadata.resource_version,
+                "annotations": {"tails.com/owner": owner_email},
+                "labels": {OWNER_HASH_LABEL: owner_label_value(owner_email), **labels},
+            }
+        },
+    )
+
+
+def update_env_configmap_data(env_name: str, data: dict) -> V1ConfigMap | None:
+    """
+    Merges `data` into the JSON stored in an env configmap.
+
+    The resourceVersion read is sent with the patch so that the API server
+    rejects it if somebody else changed the configmap in the meantime, in
+    which case the update is retried.
+
+    Args:
+        env_name (str): Name of the environment
+        data (dict): Top level keys to set in the JSON
+
+    Returns:
+        V1ConfigMap: The configmap or None if the env doesn't exist
+    """
+    v1 = client.CoreV1Api()
+
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        configmap = get_configmap(name=env_name)
+
+        if configmap is None:
+            return None
+
+        body = json.loads((configmap.data or {}).get("json", "{}"))
+        body.update(data)
+
+        try:
+            return v1.patch_namespaced_config_map(
+                env_name,
+                KOLLIE_NAMESPACE,
+                {
+                    "metadata": {"resourceVersion": configmap.metadata.resource_version},
+                    "data": {"json": json.dumps(body)},
+                },
+            )
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return None
+            if exc.status != 409:
+                raise
+
+    raise client.ApiException(
+        status=409, reason=f"Conflict updating configmap {env_name}"
+    )
+
+
 def delete_configmap(name, namespace=None):
     """
     Delete a configmap from the cluster.
@@ -1,10 +1,116 @@
 import os
 import json
+import threading
+from types import MappingProxyType
+from typing import Hashable, Mapping
+
+from kollie.files import file_fingerprint
 
 KOLLIE_NAMESPACE = os.environ.get("KOLLIE_NAMESPACE", "kollie")
 
 common_substitutions_path = os.getenv("KOLLIE_COMMON_SUBSTITUTIONS_JSON_PATH", "common_substitutions.json")
-with open(common_substitutions_path, "r") as common_substitutions_file:
-    KOLLIE_COMMON_SUBSTITUTIONS = json.loads(common_substitutions_file.read())
+
+
+def _load_common_substitutions(path: str) -> Mapping[str, str]:
+    with open(path, "r") as common_substitutions_file:
+        substitutions = json.loads(common_substitutions_file.read())
+
+    if not isinstance(substitutions, dict):
+        raise ValueError(f"File {path} must contain a JSON object")
+
+    return MappingProxyType(substitutions)
+
+
+# Substitutions added to every Kustomization, with the fingerprint of the file
+# they were loaded from. Loaded on first use so that importing Kollie doesn't
+# need the file, and replaced as a whole by refresh_common_substitutions.
+_common_substitutions: tuple[Hashable | None, Mapping[str, str]] | None = None
+_common_substitutions_lock = threading.Lock()
+
+
+def get_common_substitutions() -> Mapping[str, str]:
+    """
+    Returns the substitutions added to every Kustomization, loading them
+    from KOLLIE_COMMON_SUBSTITUTIONS_JSON_PATH on first use.
+    """
+    global _common_substitutions
+
+    current = _common_substitutions
+
+    if current is None:
+        with _common_substitutions_lock:
+            if _common_substitutions is None:
+                _common_substitutions = (
+                    file_fingerprint(common_substitutions_path),
+                    _load_common_substitutions(common_substitutions_path),
+                )
+            current = _common_substitutions
+
+    return current[1]
+
+
+def refresh_common_substitutions() -> bool:
+    """
+    Reloads the common substitutions if KOLLIE_COMMON_SUBSTITUTIONS_JSON_PATH
+    changed, or loads them if they haven't been used yet. A file that can't be
+    parsed is only retried once it changes again.
+
+    Raises:
+        ValueError: If the changed file is invalid. The previous substitutions
+            are kept.
+
+    Returns:
+        bool: Whether the substitutions were reloaded.
+    """
+    global _common_substitutions
+
+    if _common_substitutions is None:
+        get_common_substitutions()
+        return True
+
+    fingerprint = file_fingerprint(common_substitutions_path)
+
+    with _common_substitutions_lock:
+        previous_fingerprint, substitutions = _common_substitutions
+
+        if fingerprint is None or fingerprint == previous_fingerprint:
+            return False
+
+        # record the new fingerprint first so a broken file isn't reparsed
+        _common_substitutions = (fingerprint, substitutions)
+        _common_substitutions = (
+            fingerprint,
+            _load_common_substitutions(common_substitutions_path),
+        )
+
+        return True
 
 DEFAULT_FLUX_REPOSITORY = os.environ.get("KOLLIE_DEFAULT_FLUX_REPOSITORY")
+
+# Restrict the artifact of per-env GitRepositories to the directories used by
+# the env's apps. Off by default, since overlays that refer to anything other
+# than a sibling of the app directory (e.g. `../../base`) stop building.
+GIT_REPOSITORY_NARROW_PATHS = (
+    os.environ.get("KOLLIE_GIT_REPOSITORY_NARROW_PATHS", "false").lower() == "true"
+)
+
+# Paths of the flux repository that per-env GitRepositories always include on
+# top of the paths used by the env's apps, e.g. shared kustomize components.
+GIT_REPOSITORY_INCLUDE_PATHS = [
+    path
+    for path in os.environ.get("KOLLIE_GIT_REPOSITORY_INCLUDE_PATHS", "").split(",")
+    if path.strip()
+]
+
+# Label linking ImagePolicies shared between envs and the Kustomizations that
+# subscribe to them. See kollie.cluster.image_policy_spec.image_policy_key
+IMAGE_POLICY_KEY_LABEL = "kollie.tails.com/image-policy-key"
+
+# Label holding a hash of the owner's email on env ConfigMaps, so envs can be
+# selected by owner (label values can't hold the @ of an email address).
+# See kollie.cluster.configmap.owner_label_value
+OWNER_HASH_LABEL = "kollie.tails.com/owner-hash"
+
+# Label marking the env ConfigMaps of the warm pool of a bundle, removed when
+# the env is claimed. See kollie.service.pool
+WARM_POOL_LABEL = "kollie.tails.com/warm-pool"
@@ -1,11 +1,21 @@
+import time
+from typing import Callable, Sequence
+
 from kubernetes import client
 from kubernetes.client.exceptions import ApiException
 import structlog
 
-from .git_repository_request import CreateGitRepositoryRequest
+from .git_repository_request import (
+    CreateGitRepositoryRequest,
+    build_ignore_rules,
+    included_paths,
+    includes_all,
+)
 from .constants import DEFAULT_FLUX_REPOSITORY, KOLLIE_NAMESPACE
 from kollie.exceptions import (
-    CreateCustomObjectsApiException, GetCustomObjectsApiException
+    CreateCustomObjectsApiException,
+    GetCustomObjectsApiException,
+    GitRepositorySyncTimeoutException,
 )
 
 logger = structlog.get_logger(__name__)
@@ -14,6 +24,12 @@ GROUP = "source.toolkit.fluxcd.io"
 VERSION = "v1"
 OBJECT_PLURAL = "gitrepositories"
 
+# How long to wait for source-controller to package an artifact with updated
+# ignore rules before creating Kustomizations that need the new paths.
+IGNORE_SYNC_TIMEOUT_SECONDS = 30
+IGNORE_SYNC_POLL_SECONDS = 1
+MAX_UPDATE_ATTEMPTS = 5
+
 
 def git_repository_name(env_name: str) -> str:
     """Render the name of the flux git repository."""
@@ -25,14 +41,21 @@ def create_git_repository(
     branch: str,
     owner_email: str,
     owner_uid: str,
+    include_paths: Sequence[str] = (),
 ) -> dict:
-    """Create a flux git repository in the kollie namespace."""
+    """
+    Create a flux git repository in the kollie namespace.
+
+    Only the directories used by `include_paths` are packaged by
+    source-controller, see build_ignore_rules.
+    """
     request = CreateGitRepositoryRequest(
         env_name=env_name,
         branch=branch,
         owner_email=owner_email,
         owner_uid=owner_uid,
-        git_repository_name=git_repository_name(env_name)
+        git_repository_name=git_repository_name(env_name),
+        include_paths=include_paths,
     )
 
     custom_object_api = client.CustomObjectsApi()
@@ -79,3 +102,117 @@ def get_git_repository(env_name: str) -> dict | None:
             raise GetCustomObjectsApiException(
                 name=name, custom_object=OBJECT_PLURAL
             ) from api_exc
+
+
+def update_git_repository_include_paths(
+    git_repository: dict,
+    include_paths: Sequence[str] | Callable[[], Sequence[str]],
+    wait: bool = False,
+    keep_included: bool = False,
+) -> dict:
+    """
+    Updates the ignore rules of a git repository so that its artifact only
+    contains the directories used by `include_paths`.
+
+    The git repository is only patched when the rules change. The
+    resourceVersion read is sent with the patch so that concurrent updates
+    in the same env can't drop each other's paths: on a conflict the git
+    repository is read again and the rules are recomputed.
+
+    Args:
+        git_repository (dict): The current git repository object.
+        include_paths (Sequence[str] | Callable[[], Sequence[str]]):
+            Kustomization paths of the env's apps, or a function returning
+            them, called again on every attempt.
+        wait (bool): Wait until source-controller has observed the new rules
+            when they include directories the current rules don't. This
+            should be used before creating Kustomizations for new paths, and
+            blocks for up to IGNORE_SYNC_TIMEOUT_SECONDS, so only from worker
+            threads.
+        keep_included (bool): Add the paths to the directories the current
+            rules include instead of replacing them.
+
+    Raises:
+        ApiException: If the git repository keeps changing under us.
+        GitRepositorySyncTimeoutException: If `wait` is set and the new rules
+            aren't observed in time. The rules are updated nonetheless.
+
+    Returns:
+        dict: The updated git repository object.
+    """
+    name = git_repository["metadata"]["name"]
+    custom_object_api = client.CustomObjectsApi()
+
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        current_ignore = git_repository["spec"].get("ignore")
+        current_dirs = included_paths(current_ignore)
+
+        if keep_included and current_dirs is None:
+            # the whole repository is already included
+            return git_repository
+
+        ignore = build_ignore_rules(
+            include_paths() if callable(include_paths) else include_paths,
+            include_dirs=current_dirs if keep_included and current_dirs else (),
+        )
+
+        if current_ignore == ignore:
+            return git_repository
+
+        try:
+            updated = custom_object_api.patch_namespaced_custom_object(
+                group=GROUP,
+                version=VERSION,
+                namespace=KOLLIE_NAMESPACE,
+                plural=OBJECT_PLURAL,
+                name=name,
+                body={
+                    "metadata": {
+                        "resourceVersion": git_repository["metadata"]["resourceVersion"]
+                    },
+                    "spec": {"ignore": ignore},
+                },
+            )
+        except ApiException as exc:
+            if exc.status != 409:
+                raise
+
+            git_repository = custom_object_api.get_namespaced_custom_object(
+                group=GROUP,
+                version=VERSION,
+                namespace=KOLLIE_NAMESPACE,
+                plural=OBJECT_PLURAL,
+                name=name,
+            )
+            continue
+
+        logger.info("git_repository.ignore_updated", name=name)
+
+        if wait and not includes_all(current_ignore, ignore):
+            _wait_for_observed_ignore(name=name, ignore=ignore)
+
+        return updated
+
+    raise ApiException(status=409, reason=f"Conflict updating git repository {name}")
+
+
+def _wait_for_observed_ignore(name: str, ignore: str | None) -> None:
+    custom_object_api = client.CustomObjectsApi()
+    deadline = time.monotonic() + IGNORE_SYNC_TIMEOUT_SECONDS
+
+    while time.monotonic() < deadline:
+        git_repository = custom_object_api.get_namespaced_custom_object(
+            group=GROUP,
+            version=VERSION,
+            namespace=KOLLIE_NAMESPACE,
+            plural=OBJECT_PLURAL,
+            name=name,
+        )
+
+        if git_repository.get("status", {}).get("observedIgnore") == ignore:
+            return
+
+        time.sleep(IGNORE_SYNC_POLL_SECONDS)
+
+    logger.warning("git_repository.ignore_sync_timeout", name=name)
+    raise GitRepositorySyncTimeoutException(name=name)
@@ -1,8 +1,15 @@
-from dataclasses import dataclass
+import posixpath
+from dataclasses import dataclass, field
+from typing import Iterable, Sequence
 
 from kubernetes.client import V1ObjectMeta, V1OwnerReference
 
-from .constants import KOLLIE_NAMESPACE, DEFAULT_FLUX_REPOSITORY
+from .constants import (
+    DEFAULT_FLUX_REPOSITORY,
+    GIT_REPOSITORY_INCLUDE_PATHS,
+    GIT_REPOSITORY_NARROW_PATHS,
+    KOLLIE_NAMESPACE,
+)
 
 
 @dataclass
@@ -14,10 +21,22 @@ class CreateGitRepositoryRequest:
     owner_email: str
     owner_uid: str
     git_repository_name: str
+    include_paths: Sequence[str] = field(default_factory=list)
 
     @property
     def body(self) -> dict:
         """Render the body of the request."""
+        spec = {
+            "interval": "5m",
+            "ref": {"branch": self.branch},
+            "secretRef": {"name": DEFAULT_FLUX_REPOSITORY},
+            "url": f"ssh://git@github.com/tailsdotcom/{DEFAULT_FLUX_REPOSITORY}",
+        }
+
+        ignore = build_ignore_rules(self.include_paths)
+        if ignore is not None:
+            spec["ignore"] = ignore
+
         return {
             "apiVersion": "source.toolkit.fluxcd.io/v1",
             "kind": "GitRepository",
@@ -42,10 +61,123 @@ class CreateGitRepositoryRequest:
                     ),
                 ],
             ),
-            "spec": {
-                "interval": "5m",
-                "ref": {"branch": self.branch},
-                "secretRef": {"name": DEFAULT_FLUX_REPOSITORY},
-                "url": f"ssh://git@github.com/tailsdotcom/{DEFAULT_FLUX_REPOSITORY}",
-            },
+            "spec": spec,
         }
+
+
+def build_ignore_rules(
+    app_paths: Iterable[str], include_dirs: Iterable[str] = ()
+) -> str | None:
+    """
+    Renders GitRepository.spec.ignore rules (.gitignore format) that exclude
+    everything in the flux repository except the directories used by the
+    given app paths and the paths in KOLLIE_GIT_REPOSITORY_INCLUDE_PATHS.
+    Only used when KOLLIE_GIT_REPOSITORY_NARROW_PATHS is set.
+
+    The directory containing each app path is included rather than the path
+    itself so that kustomize overlays can still refer to sibling bases
+    (e.g. `../base`).
+
+    See https://fluxcd.io/flux/components/source/gitrepositories/#ignore
+
+    Args:
+        app_paths (Iterable[str]): Kustomization paths of the env's apps.
+        include_dirs (Iterable[str]): Directories to include as they are,
+            e.g. the ones included by the current rules.
+
+    Returns:
+        str | None: The ignore rules, or None when the whole repository is used.
+    """
+    if not GIT_REPOSITORY_NARROW_PATHS:
+        return None
+
+    included: set[str] = set()
+
+    for app_path in app_paths:
+        path = _normalise_path(app_path)
+        if not path:
+            return None
+        included.add(posixpath.dirname(path) or path)
+
+    for include_path in [*GIT_REPOSITORY_INCLUDE_PATHS, *include_dirs]:
+        path = _normalise_path(include_path)
+        if not path:
+            return None
+        included.add(path)
+
+    # Drop paths that are already included through one of their parents
+    included = {
+        path
+        for path in included
+        if not any(path.startswith(f"{other}/") for other in included)
+    }
+
+    rules = ["/*"]
+    excluded_dirs = {"."}
+
+    for path in sorted(included):
+        parts = path.split("/")
+
+        for depth in range(1, len(parts)):
+            parent = "/".join(parts[:depth])
+            if parent not in excluded_dirs:
+                # re-include the parent directory but none of its contents
+                rules.extend([f"!/{parent}/", f"/{parent}/*"])
+                excluded_dirs.add(parent)
+
+        rules.append(f"!/{path}/")
+
+    return "\n".join(rules)
+
+
+def included_paths(ignore: str | None) -> set[str] | None:
+    """
+    Returns the directories included by ignore rules rendered by
+    build_ignore_rules.
+
+    Args:
+        ignore (str | None): The ignore rules.
+
+    Returns:
+        set[str] | None: The included directories, or None when the whole
+            repository is used.
+    """
+    if ignore is None:
+        return None
+
+    rules = ignore.splitlines()
+    # parents are re-included but have their contents excluded again
+    emptied = {rule[1:-2] for rule in rules if rule.endswith("/*") and rule != "/*"}
+
+    return {
+        path
+        for path in (rule[2:-1] for rule in rules if rule.startswith("!/"))
+        if path not in emptied
+    }
+
+
+def includes_all(ignore: str | None, other_ignore: str | None) -> bool:
+    """
+    Whether ignore rules include every directory that other ignore rules
+    include, so switching to the other rules doesn't add anything to the
+    artifact.
+    """
+    included = included_paths(ignore)
+    other_included = included_paths(other_ignore)
+
+    if included is None:
+        return True
+
+    if other_included is None:
+        return False
+
+    return all(
+        any(path == parent or path.startswith(f"{parent}/") for parent in included)
+        for path in other_included
+    )
+
+
+def _normalise_path(path: str) -> str:
+    """Normalises a repository path to the form `some/dir` (root is `""`)."""
+    path = posixpath.normpath(path.strip().lstrip("/"))
+    return "" if path == "." else path
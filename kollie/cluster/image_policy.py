@@ -1,97 +1,443 @@
 from dataclasses import asdict
+import re
 
 from kubernetes import client
 import structlog
 
+from kollie.cache import TTLCache
 from kollie.exceptions import KollieImagePolicyException
 
-from .constants import KOLLIE_NAMESPACE
+from .constants import IMAGE_POLICY_KEY_LABEL, KOLLIE_NAMESPACE
 from .interfaces import AppTemplate
-from .image_policy_spec import LatestTimestampImagePolicySpec
+from .image_policy_spec import LatestTimestampImagePolicySpec, image_policy_key
+from .image_repository import get_image_repository, get_latest_tags
 
 
 logger = structlog.get_logger(__name__)
 
+GROUP = "image.toolkit.fluxcd.io"
+VERSION = "v1"
+OBJECT_PLURAL = "imagepolicies"
 
-def create_owned_image_policy(
+# Number of times a read-modify-write of a shared ImagePolicy is retried
+# when it loses a race against another writer.
+MAX_SUBSCRIPTION_ATTEMPTS = 5
+
+# Latest image tags resolved for new apps, by image policy key
+LATEST_IMAGE_TAG_CACHE_SECONDS = 30
+_latest_image_tags: TTLCache[str, str | None] = TTLCache(
+    ttl_seconds=LATEST_IMAGE_TAG_CACHE_SECONDS
+)
+
+
+def subscribe_to_image_policy(
     env_name: str,
     image_tag_prefix: str,
     app_template: AppTemplate,
     owner_uid: str,
     owner_kind: str = "Kustomization",
-):
+) -> dict:
     """
-    Creates an ImagePolicy in the kollie namespace with OwnerReferences
-    so that the ImagePolicy is automatically removed when the owner is removed
+    Subscribes a Kustomization to the ImagePolicy tracking the app's
+    ImageRepository and image tag prefix, creating the ImagePolicy if needed.
+
+    ImagePolicies are shared by every env tracking the same image and prefix.
+    Each subscriber is recorded as an OwnerReference so that the ImagePolicy
+    is garbage collected once the last subscribed Kustomization is removed.
 
-    See https://kubernetes.io/docs/tasks/administer-cluster/use-cascading-deletion/
+    See https://kubernetes.io/docs/concepts/architecture/garbage-collection/
 
     Args:
-        env_name (str): Used for labelling the ImagePolicy
-        app_name (str): Used for labelling the ImagePolicy
-        image_policy_spec (ImagePolicySpec): Contents of the ImagePolicy.spec
-        owner_uid (str): The UID of the owner of the ImagePolicy.
-            This should be the UID of the Kustomization that we need to update
-            when the ImagePolicy updates.
+        env_name (str): The name of the environment the subscriber belongs to.
+        image_tag_prefix (str): The image tag prefix to track.
+        app_template (AppTemplate): The app template of the subscriber.
+        owner_uid (str): The UID of the subscribed Kustomization.
         owner_kind (str): This should be almost always "Kustomization".
 
+    Returns:
+        dict: The ImagePolicy the Kustomization is subscribed to.
+    """
+    key = image_policy_key(app_template.image_repository_ref, image_tag_prefix)
+
+    owner_reference = {
+        "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
+        "kind": owner_kind,
+        "name": f"{env_name}-{app_template.app_name}",
+        "uid": owner_uid,
+        "blockOwnerDeletion": True,
+    }
+
+    for _ in range(MAX_SUBSCRIPTION_ATTEMPTS):
+        image_policy = get_shared_image_policy(key)
+
+        try:
+            if image_policy is None:
+                return _create_shared_image_policy(
+                    key=key,
+                    image_tag_prefix=image_tag_prefix,
+                    app_template=app_template,
+                    owner_reference=owner_reference,
+                )
+
+            owner_references = image_policy["metadata"].get("ownerReferences", [])
+
+            if any(ref["uid"] == owner_uid for ref in owner_references):
+                return image_policy
+
+            return _patch_owner_references(
+                image_policy, owner_references + [owner_reference]
+            )
+        except client.ApiException as exc:
+            if exc.status != 409:
+                logger.error(
+                    f"Failed to subscribe {app_template.app_name} in {env_name} to ImagePolicy",
+                    app_name=app_template.app_name,
+                    env_name=env_name,
+                    image_policy_key=key,
+                )
+                raise KollieImagePolicyException(
+                    app_name=app_template.app_name, env_name=env_name
+                )
+
+            logger.debug("image_policy.subscription_conflict", image_policy_key=key)
+
+    raise KollieImagePolicyException(app_name=app_template.app_name, env_name=env_name)
+
+
+def unsubscribe_from_image_policy(image_policy_key: str, owner_uid: str) -> None:
+    """
+    Removes a Kustomization from the subscribers of a shared ImagePolicy.
+    The ImagePolicy is deleted when it has no subscribers left.
+
+    Args:
+        image_policy_key (str): The key of the shared ImagePolicy.
+        owner_uid (str): The UID of the subscribed Kustomization.
     """
     api = client.CustomObjectsApi()
 
-    # compose common metadata for ImageRegistry and ImagePolicy resources
-    # with the same owner references and labels
-    owner_reference = client.V1OwnerReference(
-        api_version="kustomize.toolkit.fluxcd.io/v1",
-        name=f"{env_name}-{app_template.app_name}",
-        block_owner_deletion=True,
-        uid=owner_uid,
-        kind=owner_kind,
+    for _ in range(MAX_SUBSCRIPTION_ATTEMPTS):
+        image_policy = get_shared_image_policy(image_policy_key)
+
+        if image_policy is None:
+            return
+
+        owner_references = image_policy["metadata"].get("ownerReferences", [])
+        remaining = [ref for ref in owner_references if ref["uid"] != owner_uid]
+
+        if len(remaining) == len(owner_references):
+            return
+
+        try:
+            if remaining:
+                _patch_owner_references(image_policy, remaining)
+            else:
+                api.delete_namespaced_custom_object(
+                    group=GROUP,
+                    version=VERSION,
+                    namespace=KOLLIE_NAMESPACE,
+                    plural=OBJECT_PLURAL,
+                    name=image_policy["metadata"]["name"],
+                    body=client.V1DeleteOptions(
+                        preconditions=client.V1Preconditions(
+                            resource_version=image_policy["metadata"]["resourceVersion"]
+                        )
+                    ),
+                )
+            return
+        except client.ApiException as exc:
+            if exc.status == 404:
+                return
+            if exc.status != 409:
+                raise
+
+    logger.warning(
+        "image_policy.unsubscribe_failed",
+        image_policy_key=image_policy_key,
+        owner_uid=owner_uid,
     )
 
-    metadata = client.V1ObjectMeta(
-        name=f"{env_name}-{app_template.app_name}",
-        labels={
-            "tails-app-stage": "testing",
-            "tails-app-environment": env_name,
-            "tails-app-name": app_template.app_name,
-        },
-        owner_references=[owner_reference],
+
+def retarget_image_policy(
+    previous_image_policy_key: str,
+    image_tag_prefix: str,
+    app_template: AppTemplate,
+    owner_uid: str,
+) -> dict | None:
+    """
+    Points the shared ImagePolicy a Kustomization is the only subscriber of
+    at another image tag prefix, patching its filterTags in place rather
+    than deleting it and creating a new one. The ImagePolicy keeps its name,
+    so the change is a single MODIFIED event.
+
+    Nothing is changed when the ImagePolicy is missing or has other
+    subscribers, or when an ImagePolicy already tracks the new prefix: the
+    subscription must then be moved with subscribe_to_image_policy and
+    unsubscribe_from_image_policy.
+
+    Args:
+        previous_image_policy_key (str): The key of the ImagePolicy currently
+            tracked.
+        image_tag_prefix (str): The image tag prefix to track instead.
+        app_template (AppTemplate): The app template of the subscriber.
+        owner_uid (str): The UID of the subscribed Kustomization.
+
+    Returns:
+        dict | None: The patched ImagePolicy, None if it wasn't patched.
+    """
+    api = client.CustomObjectsApi()
+
+    key = image_policy_key(app_template.image_repository_ref, image_tag_prefix)
+    image_policy_spec = LatestTimestampImagePolicySpec.for_image_tag_prefix(
+        app_template=app_template, image_tag_prefix=image_tag_prefix
     )
 
+    for _ in range(MAX_SUBSCRIPTION_ATTEMPTS):
+        image_policy = get_shared_image_policy(previous_image_policy_key)
+
+        if image_policy is None:
+            return None
+
+        owner_references = image_policy["metadata"].get("ownerReferences", [])
+
+        if [ref["uid"] for ref in owner_references] != [owner_uid]:
+            return None
+
+        if get_shared_image_policy(key) is not None:
+            return None
+
+        try:
+            return api.patch_namespaced_custom_object(
+                group=GROUP,
+                version=VERSION,
+                namespace=KOLLIE_NAMESPACE,
+                plural=OBJECT_PLURAL,
+                name=image_policy["metadata"]["name"],
+                body={
+                    "metadata": {
+                        "resourceVersion": image_policy["metadata"]["resourceVersion"],
+                        "labels": {IMAGE_POLICY_KEY_LABEL: key},
+                        "annotations": {
+                            "tails.com/tracking-image-tag-prefix": image_tag_prefix
+                        },
+                    },
+                    "spec": {"filterTags": asdict(image_policy_spec.filterTags)},
+                },
+            )
+        except client.ApiException as exc:
+            if exc.status != 409:
+                raise
+
+            logger.debug(
+                "image_policy.retarget_conflict",
+                image_policy_key=previous_image_policy_key,
+            )
+
+    return None
+
+
+def get_shared_image_policy(image_policy_key: str) -> dict | None:
+    """
+    Returns the shared ImagePolicy with the given key if it exists.
+
+    Args:
+        image_policy_key (str): The key of the shared ImagePolicy.
+    """
+    api = client.CustomObjectsApi()
+
+    image_policies = api.list_namespaced_custom_object(
+        group=GROUP,
+        version=VERSION,
+        namespace=KOLLIE_NAMESPACE,
+        plural=OBJECT_PLURAL,
+        label_selector=f"{IMAGE_POLICY_KEY_LABEL}={image_policy_key}",
+    )
+
+    if not image_policies["items"]:
+        return None
+
+    return image_policies["items"][0]
+
+
+def _create_shared_image_policy(
+    key: str,
+    image_tag_prefix: str,
+    app_template: AppTemplate,
+    owner_reference: dict,
+) -> dict:
+    api = client.CustomObjectsApi()
+
+    image_repository_ref = app_template.image_repository_ref
+
     image_policy_spec = LatestTimestampImagePolicySpec.for_image_tag_prefix(
         app_template=app_template, image_tag_prefix=image_tag_prefix
     )
 
-    # create the ImagePolicy resource
-    image_policy = {
+    image_policy: dict = {
         "apiVersion": "image.toolkit.fluxcd.io/v1",
         "kind": "ImagePolicy",
-        "metadata": metadata,
+        "metadata": {
+            "name": f"{image_repository_ref.name}-{key[:12]}",
+            "labels": {
+                "tails-app-stage": "testing",
+                "kollie.tails.com/managed-by": "kollie",
+                IMAGE_POLICY_KEY_LABEL: key,
+            },
+            "annotations": {
+                "kollie.tails.com/image-repository": (
+                    f"{image_repository_ref.namespace}/{image_repository_ref.name}"
+                ),
+                "tails.com/tracking-image-tag-prefix": image_tag_prefix,
+            },
+            "ownerReferences": [owner_reference],
+        },
         "spec": asdict(image_policy_spec),
     }
 
     try:
-        api.create_namespaced_custom_object(
-            group="image.toolkit.fluxcd.io",
-            version="v1",
+        return api.create_namespaced_custom_object(
+            group=GROUP,
+            version=VERSION,
             namespace=KOLLIE_NAMESPACE,
-            plural="imagepolicies",
+            plural=OBJECT_PLURAL,
             body=image_policy,
         )
+    except client.ApiException as exc:
+        if exc.status != 409 or get_shared_image_policy(key) is not None:
+            raise
+
+    # The name is held by an ImagePolicy that was retargeted to another image
+    # tag prefix, so let the API server pick a free one.
+    name = image_policy["metadata"].pop("name")
+    image_policy["metadata"]["generateName"] = f"{name}-"
+
+    return api.create_namespaced_custom_object(
+        group=GROUP,
+        version=VERSION,
+        namespace=KOLLIE_NAMESPACE,
+        plural=OBJECT_PLURAL,
+        body=image_policy,
+    )
+
+
+def _patch_owner_references(image_policy: dict, owner_references: list[dict]) -> dict:
+    """
+    Replaces the OwnerReferences of an ImagePolicy. The resourceVersion is
+    included so that the API server rejects the patch if somebody else changed
+    the ImagePolicy since we read it.
+    """
+    api = client.CustomObjectsApi()
+
+    return api.patch_namespaced_custom_object(
+        group=GROUP,
+        version=VERSION,
+        namespace=KOLLIE_NAMESPACE,
+        plural=OBJECT_PLURAL,
+        name=image_policy["metadata"]["name"],
+        body={
+            "metadata": {
+                "resourceVersion": image_policy["metadata"]["resourceVersion"],
+                "ownerReferences": owner_references,
+            }
+        },
+    )
+
+
+def resolve_latest_image_tag(
+    app_template: AppTemplate, image_tag_prefix: str
+) -> str | None:
+    """
+    Returns the latest image tag matching an app template's ImageRepository
+    and image tag prefix, so that new apps can be deployed straight away
+    instead of waiting for their ImagePolicy to be reconciled.
+
+    The tag is taken from the shared ImagePolicy when another env already
+    tracks the same image and prefix, otherwise from the most recent tags
+    reported by the ImageRepository. Results are cached briefly.
+
+    Args:
+        app_template (AppTemplate): The app template.
+        image_tag_prefix (str): The image tag prefix to track.
+
+    Returns:
+        str | None: The latest image tag or None if it can't be resolved yet.
+    """
+    key = image_policy_key(app_template.image_repository_ref, image_tag_prefix)
+
+    return _latest_image_tags.get_or_load(
+        key,
+        lambda: _resolve_latest_image_tag(key, app_template, image_tag_prefix),
+    )
+
+
+def _resolve_latest_image_tag(
+    key: str, app_template: AppTemplate, image_tag_prefix: str
+) -> str | None:
+    try:
+        image_policy = get_shared_image_policy(key)
+
+        if image_policy:
+            tag = image_policy.get("status", {}).get("latestRef", {}).get("tag")
+            if tag:
+                return tag
+
+        image_repository = get_image_repository(app_template.image_repository_ref)
     except client.ApiException:
-        logger.error(
-            f"Failed to create ImagePolicy for {app_template.app_name} in {env_name}",
+        logger.warning(
+            "image_policy.latest_image_tag_unresolved",
             app_name=app_template.app_name,
-            env_name=env_name,
-            image_policy=image_policy,
+            image_tag_prefix=image_tag_prefix,
+            exc_info=True,
         )
+        return None
 
-        raise KollieImagePolicyException(
-            app_name=app_template.app_name, env_name=env_name
-        )
+    if not image_repository:
+        return None
+
+    image_policy_spec = LatestTimestampImagePolicySpec.for_image_tag_prefix(
+        app_template=app_template, image_tag_prefix=image_tag_prefix
+    )
+    pattern = re.compile(image_policy_spec.filterTags.pattern)
+
+    candidates = []
+
+    for tag in get_latest_tags(image_repository):
+        match = pattern.match(tag)
+        if not match:
+            continue
+
+        try:
+            candidates.append((float(match.group("ts")), tag))
+        except ValueError:
+            continue
+
+    if not candidates:
+        return None
+
+    return max(candidates)[1]
+
+
+def get_image_policies() -> list[dict]:
+    """
+    Returns every ImagePolicy managed by Kollie, shared and per-app.
+    """
+    api = client.CustomObjectsApi()
+
+    image_policies = api.list_namespaced_custom_object(
+        group=GROUP,
+        version=VERSION,
+        namespace=KOLLIE_NAMESPACE,
+        plural=OBJECT_PLURAL,
+        label_selector="tails-app-stage=testing",
+    )
+
+    return image_policies["items"]
 
 
 def find_image_policies(env_name: str, app_name: str | None = None):
+    """
+    Finds the per-app ImagePolicies created before ImagePolicies were shared
+    between environments.
+    """
     api = client.CustomObjectsApi()
 
     labels = ["tails-app-stage=testing"]
@@ -101,17 +447,17 @@ def find_image_policies(env_name: str, app_name: str | None = None):
         labels.append(f"tails-app-name={app_name}")
 
     return api.list_namespaced_custom_object(
-        group="image.toolkit.fluxcd.io",
-        version="v1",
+        group=GROUP,
+        version=VERSION,
         namespace=KOLLIE_NAMESPACE,
-        plural="imagepolicies",
+        plural=OBJECT_PLURAL,
         label_selector=",".join(labels),
     )
 
 
 def delete_image_policies(env_name: str, app_name: str | None = None):
     """
-    Deletes image policies related to an environment.
+    Deletes per-app image policies related to an environment.
 
     """
     api = client.CustomObjectsApi()
@@ -120,9 +466,9 @@ def delete_image_policies(env_name: str, app_name: str | None = None):
 
     for policy in image_policies["items"]:
         api.delete_namespaced_custom_object(
-            group="image.toolkit.fluxcd.io",
-            version="v1",
+            group=GROUP,
+            version=VERSION,
             namespace=KOLLIE_NAMESPACE,
-            plural="imagepolicies",
+            plural=OBJECT_PLURAL,
             name=policy["metadata"]["name"],
         )
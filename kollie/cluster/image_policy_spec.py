@@ -1,5 +1,7 @@
+import hashlib
 import re
 from dataclasses import dataclass
+from functools import lru_cache
 from .interfaces import AppTemplate, ClusterObjectReference
 
 
@@ -44,7 +46,7 @@ class LatestTimestampImagePolicySpec(ImagePolicySpec):
         of a branch into the container image tag prefix in the same way as the Docker metadata action:
         https://github.com/docker/metadata-action#image-name-and-tag-sanitization
         """
-        image_prefix = re.sub(r"[^a-zA-Z0-9._-]+", "-", image_tag_prefix)
+        image_prefix = sanitise_image_tag_prefix(image_tag_prefix)
 
         return cls(
             imageRepositoryRef=app_template.image_repository_ref,
@@ -53,3 +55,32 @@ class LatestTimestampImagePolicySpec(ImagePolicySpec):
             ),
             policy={"numerical": {"order": "asc"}},
         )
+
+
+@lru_cache(maxsize=4096)
+def sanitise_image_tag_prefix(image_tag_prefix: str) -> str:
+    """
+    Transforms a branch name into the container image tag prefix in the same
+    way as the Docker metadata action.
+    """
+    return re.sub(r"[^a-zA-Z0-9._-]+", "-", image_tag_prefix)
+
+
+def image_policy_key(
+    image_repository_ref: ClusterObjectReference, image_tag_prefix: str
+) -> str:
+    """
+    Returns the key identifying the ImagePolicy shared by every app that tracks
+    the same ImageRepository and (sanitised) image tag prefix.
+
+    The key is a hash so that it is always a valid label value.
+    """
+    return _image_policy_key(
+        image_repository_ref.namespace, image_repository_ref.name, image_tag_prefix
+    )
+
+
+@lru_cache(maxsize=4096)
+def _image_policy_key(namespace: str, name: str, image_tag_prefix: str) -> str:
+    identity = "/".join([namespace, name, sanitise_image_tag_prefix(image_tag_prefix)])
+    return hashlib.sha256(identity.encode()).hexdigest()[:40]
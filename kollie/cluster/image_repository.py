@@ -0,0 +1,50 @@
+from kubernetes import client
+import structlog
+
+from .interfaces import ClusterObjectReference
+
+
+logger = structlog.get_logger(__name__)
+
+GROUP = "image.toolkit.fluxcd.io"
+VERSION = "v1"
+OBJECT_PLURAL = "imagerepositories"
+
+
+def get_image_repository(image_repository_ref: ClusterObjectReference) -> dict | None:
+    """
+    Returns the ImageRepository referenced by an app template if it exists.
+
+    Args:
+        image_repository_ref (ClusterObjectReference): Reference to the
+            ImageRepository.
+    """
+    api = client.CustomObjectsApi()
+
+    try:
+        return api.get_namespaced_custom_object(
+            group=GROUP,
+            version=VERSION,
+            namespace=image_repository_ref.namespace,
+            plural=OBJECT_PLURAL,
+            name=image_repository_ref.name,
+        )
+    except client.ApiException as exc:
+        if exc.status == 404:
+            return None
+        raise
+
+
+def get_latest_tags(image_repository: dict) -> list[str]:
+    """
+    Returns the most recent tags found by the last scan of an ImageRepository.
+    image-reflector-controller only reports a handful of tags here.
+
+    Args:
+        image_repository (dict): The ImageRepository object.
+    """
+    return (
+        image_repository.get("status", {})
+        .get("lastScanResult", {})
+        .get("latestTags", [])
+    )
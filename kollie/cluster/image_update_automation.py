@@ -10,10 +10,15 @@ Design:
   - We update the Kustomization with the latest image tag when the corresponding
     ImagePolicy updates
 
+  - ImagePolicies are shared between every env tracking the same ImageRepository
+    and image tag prefix. They are labelled with an image policy key and each
+    subscribed Kustomization carries the same label, so a single latestRef
+    change is fanned out to every subscribed Kustomization.
+
 """
 
 # Path: kollie/cluster/image_update_automation.py
-from kollie.cluster.constants import KOLLIE_NAMESPACE
+from kollie.cluster.constants import IMAGE_POLICY_KEY_LABEL, KOLLIE_NAMESPACE
 from kubernetes import client, watch
 import structlog
 from kollie.cluster.image_policy import find_image_policies
@@ -126,6 +131,62 @@ def _get_latest_image(image_policies) -> str | None:
         return None
 
 
+def _extract_image_policy_key(event) -> str | None:
+    """
+    Extracts the shared image policy key from the event labels.
+
+    Args:
+        event (dict): The event to extract labels from.
+
+    Returns:
+        str: The image policy key or None for per-app image policies.
+    """
+    labels = event.get("object", {}).get("metadata", {}).get("labels") or {}
+    return labels.get(IMAGE_POLICY_KEY_LABEL)
+
+
+def handle_shared_image_policy_event(event, image_policy_key: str) -> None:
+    """
+    Fans out the latest image tag of a shared image policy to every
+    kustomization subscribed to it.
+
+    Args:
+        event (dict): The event to be handled.
+        image_policy_key (str): The key of the shared image policy.
+
+    Returns:
+        None
+    """
+    if event.get("type") == "DELETED":
+        return
+
+    generation = event["object"].get("metadata", {}).get("generation")
+    observed_generation = event["object"].get("status", {}).get("observedGeneration")
+
+    # A retargeted image policy still reports the latest tag of its previous
+    # image tag prefix until it has been reconciled
+    if generation and observed_generation and observed_generation < generation:
+        logger.debug("skip.latestRef_outdated", image_policy_key=image_policy_key)
+        return
+
+    try:
+        latest_image_tag = event["object"]["status"]["latestRef"]["tag"]
+    except KeyError:
+        logger.debug("skip.latestRef_not_found", image_policy_key=image_policy_key)
+        return
+
+    updated = applications.update_image_policy_subscribers(
+        image_policy_key=image_policy_key, image_tag=latest_image_tag
+    )
+
+    logger.info(
+        "image_update_automation.complete",
+        image_policy_key=image_policy_key,
+        image_tag=latest_image_tag,
+        kustomizations=updated,
+    )
+
+
 def handle_image_policy_event(event) -> None:
     """
     This method is responsible for handling image policy events.
@@ -138,6 +199,12 @@ def handle_image_policy_event(event) -> None:
     Returns:
         None
     """
+    image_policy_key = _extract_image_policy_key(event)
+
+    if image_policy_key is not None:
+        handle_shared_image_policy_event(event, image_policy_key)
+        return
+
     env_name = _extract_env_name(event)
     app_name = _extract_app_name(event)
 
@@ -2,10 +2,13 @@ from typing import Optional
 from kubernetes import client
 import structlog
 
-from kollie.exceptions import KollieKustomizationException
+from kollie.exceptions import (
+    KollieKustomizationException,
+    KollieKustomizationExistsException,
+)
 
 from .interfaces import AppTemplate
-from .constants import KOLLIE_NAMESPACE
+from .constants import IMAGE_POLICY_KEY_LABEL, KOLLIE_NAMESPACE
 from .kustomization_request import CreateKustomizationRequest, PatchKustomizationRequest
 
 
@@ -20,6 +23,7 @@ def create_kustomization(
     owner_uid: str,
     lease_exclusion_window: Optional[str],
     git_repository_name: str | None = None,
+    image_tag: str | None = None,
 ) -> dict:
     """Create a kustomization in the kollie namespace.
 
@@ -31,11 +35,13 @@ def create_kustomization(
         owner_uid (str): The uid of the owner.
         lease_exclusion_window (Optional[str]): The time window where this app is immune from scale downs.
         git_repository_name (str): Optional name of non-default flux git repository.
+        image_tag (str): Optional image tag to deploy straight away.
 
     Returns:
         dict: The response from the API.
 
     Raises:
+        KollieKustomizationExistsException: If the kustomization already exists.
         KollieKustomizationException: If there is an error from the API.
     """
     v1 = client.CustomObjectsApi()
@@ -47,7 +53,8 @@ def create_kustomization(
         owner_email=owner_email,
         owner_uid=owner_uid,
         lease_exclusion_window=lease_exclusion_window,
-        git_repository_name=git_repository_name
+        git_repository_name=git_repository_name,
+        image_tag=image_tag,
     )
 
     try:
@@ -60,7 +67,12 @@ def create_kustomization(
         )
 
         return response
-    except client.ApiException:
+    except client.ApiException as exc:
+        if exc.status == 409:
+            raise KollieKustomizationExistsException(
+                env_name=env_name, app_name=app_template.app_name
+            )
+
         logger.error(
             f"Failed to create Kustomization for {app_template.app_name} in {env_name}",
             app_name=app_template.app_name,
@@ -126,15 +138,19 @@ def delete_kustomizations(env_name: str, app_name: Optional[str] = None) -> None
 
 
 def get_kustomizations(
-    env_name: Optional[str] = None, app_name: Optional[str] = None
+    env_name: Optional[str] = None,
+    app_name: Optional[str] = None,
+    image_policy_key: Optional[str] = None,
 ) -> list:
     """
     Returns a list of kustomizations in the "kollie" namespace,
-    optionally filtered by testenv_name and app_name labels.
+    optionally filtered by testenv_name, app_name and image policy key labels.
 
     Args:
         env_name (Optional[str]): The name of the test environment to filter by.
         app_name (Optional[str]): The name of the app to filter by.
+        image_policy_key (Optional[str]): The key of the shared ImagePolicy
+            the kustomizations subscribe to.
 
     Returns:
         list: A list of kustomizations that match the given label selectors.
@@ -149,6 +165,9 @@ def get_kustomizations(
     if app_name:
         labels.append(f"tails-app-name={app_name}")
 
+    if image_policy_key:
+        labels.append(f"{IMAGE_POLICY_KEY_LABEL}={image_policy_key}")
+
     kustomizations = v1.list_namespaced_custom_object(
         group="kustomize.toolkit.fluxcd.io",
         version="v1",
@@ -1,17 +1,156 @@
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Final, Optional
-
-from kubernetes.client import V1ObjectMeta, V1OwnerReference
+from typing import Dict, Final, Mapping, Optional
 
 from kollie.cluster.interfaces import AppTemplate
-from .constants import KOLLIE_NAMESPACE, KOLLIE_COMMON_SUBSTITUTIONS
+from .constants import (
+    IMAGE_POLICY_KEY_LABEL,
+    KOLLIE_NAMESPACE,
+    get_common_substitutions,
+)
+from .image_policy_spec import image_policy_key
 
 
 DEFAULT_LEASE_DAYS_EXTEND: Final[int] = 0
 DEFAULT_LEASE_HOUR_EXTEND: Final[int] = 19
 
 
+class CompiledKustomizationTemplate:
+    """
+    The parts of a Kustomization body that only depend on the app template,
+    prepared once so that creating a Kustomization only fills in the
+    env-specific fields.
+
+    Bodies are plain JSON-ready dicts (camelCase keys) so the kubernetes
+    client doesn't need to serialise models.
+
+    Args:
+        app_template (AppTemplate): The app template.
+        git_repository_name (str): Optional name of a non-default flux git repository.
+        common_substitutions (Mapping[str, str]): Substitutions added to every Kustomization.
+    """
+
+    def __init__(
+        self,
+        app_template: AppTemplate,
+        git_repository_name: str | None,
+        common_substitutions: Mapping[str, str],
+    ) -> None:
+        self.app_template = app_template
+        self.git_repository_name = git_repository_name
+        self.common_substitutions = common_substitutions
+
+        if git_repository_name is None:
+            source_ref = {
+                "kind": "GitRepository",
+                "name": app_template.git_repository_name,
+                "namespace": "flux-system",
+            }
+        else:
+            source_ref = {
+                "kind": "GitRepository",
+                "name": git_repository_name,
+                "namespace": KOLLIE_NAMESPACE,
+            }
+
+        self._source_ref = source_ref
+        self._spec = {
+            "path": app_template.git_repository_path,
+            "interval": "5m",
+            "prune": True,
+        }
+
+        self._substitutions = dict(common_substitutions)
+
+    def build(
+        self,
+        env_name: str,
+        image_tag_prefix: str,
+        owner_email: str,
+        owner_uid: str,
+        downscaler_uptime: str,
+        image_tag: str | None = None,
+    ) -> dict:
+        """Render the body of a Kustomization for an env."""
+        app_name = self.app_template.app_name
+
+        substitutions = {
+            "environment": env_name,
+            "downscaler_uptime": downscaler_uptime,
+            **self._substitutions,
+        }
+
+        if image_tag:
+            substitutions["image_tag"] = image_tag
+
+        return {
+            "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
+            "kind": "Kustomization",
+            "metadata": {
+                "name": f"{env_name}-{app_name}",
+                "labels": {
+                    "tails-app-stage": "testing",
+                    "tails-app-environment": env_name,
+                    "tails-app-name": app_name,
+                    IMAGE_POLICY_KEY_LABEL: image_policy_key(
+                        self.app_template.image_repository_ref, image_tag_prefix
+                    ),
+                },
+                "annotations": {
+                    "tails.com/owner": owner_email,
+                    "tails.com/tracking-image-tag-prefix": image_tag_prefix,
+                },
+                "ownerReferences": [
+                    {
+                        "apiVersion": "v1",
+                        "kind": "ConfigMap",
+                        "name": env_name,
+                        "uid": owner_uid,
+                        "blockOwnerDeletion": True,
+                    }
+                ],
+            },
+            "spec": {
+                **self._spec,
+                "sourceRef": dict(self._source_ref),
+                "postBuild": {"substitute": substitutions},
+            },
+        }
+
+
+# Compiled templates by app template and git repository. Bounded so that
+# templates replaced by catalog reloads don't accumulate forever.
+MAX_COMPILED_TEMPLATES = 1024
+_compiled_templates: dict[tuple[AppTemplate, str | None], CompiledKustomizationTemplate] = {}
+
+
+def compile_kustomization_template(
+    app_template: AppTemplate, git_repository_name: str | None = None
+) -> CompiledKustomizationTemplate:
+    """
+    Returns the compiled Kustomization template of an app template,
+    compiling it on first use or when the common substitutions change.
+
+    Args:
+        app_template (AppTemplate): The app template.
+        git_repository_name (str): Optional name of a non-default flux git repository.
+    """
+    common_substitutions = get_common_substitutions()
+    key = (app_template, git_repository_name)
+    compiled = _compiled_templates.get(key)
+
+    if compiled is None or compiled.common_substitutions is not common_substitutions:
+        if len(_compiled_templates) >= MAX_COMPILED_TEMPLATES:
+            _compiled_templates.clear()
+
+        compiled = CompiledKustomizationTemplate(
+            app_template, git_repository_name, common_substitutions
+        )
+        _compiled_templates[key] = compiled
+
+    return compiled
+
+
 @dataclass
 class CreateKustomizationRequest:
     """A request to create a kustomization."""
@@ -23,6 +162,7 @@ class CreateKustomizationRequest:
     owner_uid: str
     lease_exclusion_window: Optional[str]
     git_repository_name: str | None = None
+    image_tag: str | None = None
 
     @property
     def kustomization_name(self) -> str:
@@ -37,54 +177,18 @@ class CreateKustomizationRequest:
     @property
     def body(self) -> dict:
         """Render the body of the request."""
-        if self.git_repository_name is None:
-            git_repo_source_name =  self.app_template.git_repository_name
-            git_repo_source_namespace =  "flux-system"
-        else:
-            git_repo_source_name = self.git_repository_name
-            git_repo_source_namespace = KOLLIE_NAMESPACE
+        compiled = compile_kustomization_template(
+            self.app_template, self.git_repository_name
+        )
 
-        return {
-            "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
-            "kind": "Kustomization",
-            "metadata": V1ObjectMeta(
-                name=self.kustomization_name,
-                labels={
-                    "tails-app-stage": "testing",
-                    "tails-app-environment": self.env_name,
-                    "tails-app-name": self.app_template.app_name,
-                },
-                annotations={
-                    "tails.com/owner": self.owner_email,
-                    "tails.com/tracking-image-tag-prefix": self.image_tag_prefix,
-                },
-                owner_references=[
-                    V1OwnerReference(
-                        api_version="v1",
-                        name=self.env_name,
-                        block_owner_deletion=True,
-                        uid=self.owner_uid,
-                        kind="ConfigMap",
-                    ),
-                ],
-            ),
-            "spec": {
-                "path": self.app_template.git_repository_path,
-                "interval": "5m",
-                "sourceRef": {
-                    "kind": "GitRepository",
-                    "name": git_repo_source_name,
-                    "namespace": git_repo_source_namespace,
-                },
-                "prune": True,
-                "postBuild": {
-                    "substitute": {
-                        "environment": self.env_name,
-                        "downscaler_uptime": self.lease_exclusion_window if self.lease_exclusion_window else self.uptime_window,
-                    } | KOLLIE_COMMON_SUBSTITUTIONS
-                },
-            },
-        }
+        return compiled.build(
+            env_name=self.env_name,
+            image_tag_prefix=self.image_tag_prefix,
+            owner_email=self.owner_email,
+            owner_uid=self.owner_uid,
+            downscaler_uptime=self.lease_exclusion_window or self.uptime_window,
+            image_tag=self.image_tag,
+        )
 
 
 @dataclass
@@ -129,6 +233,34 @@ class PatchKustomizationRequest:
         ] = image_tag_prefix
         return self
 
+    def set_image_policy_key(self, image_policy_key: str):
+        """Set the key of the ImagePolicy the kustomization subscribes to.
+
+        Args:
+            image_policy_key (str): The key of the shared ImagePolicy.
+
+        Returns:
+            PatchKustomizationRequest: The current instance.
+        """
+        self.body.setdefault("metadata", {}).setdefault("labels", {})[
+            IMAGE_POLICY_KEY_LABEL
+        ] = image_policy_key
+        return self
+
+    def set_owner_email(self, owner_email: str):
+        """Set the email of the owner of the app in the patch.
+
+        Args:
+            owner_email (str): The email of the new owner.
+
+        Returns:
+            PatchKustomizationRequest: The current instance.
+        """
+        self.body.setdefault("metadata", {}).setdefault("annotations", {})[
+            "tails.com/owner"
+        ] = owner_email
+        return self
+
     def set_owner(self, owner_uid: str, owner_kind: str = "ConfigMap"):
         """Set the owner in the patch.
 
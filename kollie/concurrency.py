@@ -0,0 +1,60 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Generic, Iterable, TypeVar
+
+ItemType = TypeVar("ItemType")
+ResultType = TypeVar("ResultType")
+
+
+@dataclass(frozen=True, slots=True)
+class Outcome(Generic[ItemType, ResultType]):
+    """The result of calling a function for one item, or the error it raised."""
+
+    item: ItemType
+    result: ResultType | None = None
+    error: Exception | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def map_concurrently(
+    func: Callable[[ItemType], ResultType],
+    items: Iterable[ItemType],
+    max_workers: int,
+) -> list[Outcome[ItemType, ResultType]]:
+    """
+    Calls `func` for every item, running at most `max_workers` calls at once
+    in a thread pool. Meant for calls that mostly wait on the Kubernetes API.
+
+    Errors don't stop the other calls, they are returned in the outcome of
+    their item. Calls run with a copy of the caller's context, so structlog
+    context variables are kept.
+
+    Args:
+        func (Callable): The function to call.
+        items (Iterable): The items to call it for.
+        max_workers (int): Maximum number of concurrent calls. With 1 the
+            calls run one after the other in the calling thread.
+
+    Returns:
+        list[Outcome]: The outcome for each item, in the order of `items`.
+    """
+    items = list(items)
+
+    def call(item: ItemType) -> Outcome[ItemType, ResultType]:
+        try:
+            return Outcome(item=item, result=func(item))
+        except Exception as exc:
+            return Outcome(item=item, error=exc)
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, call, item) for item in items
+        ]
+        return [future.result() for future in futures]
@@ -0,0 +1,75 @@
+import os
+import threading
+import time
+from typing import Callable
+
+import structlog
+
+from kollie.cluster.constants import refresh_common_substitutions
+from kollie.persistence import get_app_template_store
+from kollie.persistence.app_bundle import get_app_bundle_store
+
+
+logger = structlog.get_logger(__name__)
+
+# How often the mounted config files are checked for changes, 0 disables
+# the watcher.
+WATCH_INTERVAL = float(os.environ.get("KOLLIE_CONFIG_WATCH_INTERVAL_SECONDS", 5))
+
+_watcher: threading.Thread | None = None
+
+
+def _refresh_app_templates() -> None:
+    get_app_template_store().refresh()
+
+
+def _refresh_app_bundles() -> None:
+    get_app_bundle_store()
+
+
+CONFIGS: dict[str, Callable[[], object]] = {
+    "app_templates": _refresh_app_templates,
+    "app_bundles": _refresh_app_bundles,
+    "common_substitutions": refresh_common_substitutions,
+}
+
+
+def refresh_config() -> None:
+    """
+    Reloads every config file that changed since it was last loaded.
+
+    Each config keeps its previous contents when the new file can't be
+    loaded, so a broken ConfigMap never takes Kollie down.
+    """
+    for name, refresh in CONFIGS.items():
+        try:
+            refresh()
+        except Exception:
+            logger.exception("config_watcher.refresh_failed", config=name)
+
+
+def watch_config():
+    """
+    Continuously reload the config files mounted from the Kollie ConfigMap.
+
+    kubelet updates ConfigMap volumes by atomically swapping a `..data`
+    symlink, which changes the inode of every file and therefore their
+    fingerprints (see `kollie.files.file_fingerprint`). Requests only ever
+    compare fingerprints, the parsing happens here in the background.
+    """
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        refresh_config()
+
+
+def start_config_watcher():
+    """
+    Start the watch_config function in a daemon thread, once per process.
+    """
+    global _watcher
+
+    if WATCH_INTERVAL <= 0 or _watcher is not None:
+        return
+
+    _watcher = threading.Thread(target=watch_config, daemon=True)
+    _watcher.start()
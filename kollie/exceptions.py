@@ -34,6 +34,22 @@ class KollieImagePolicyException(KollieException):
         return f"Failed to create ImagePolicy for {self.app_name} in {self.env_name}"
 
 
+class KollieUnknownImageTagPrefixError(KollieException):
+    """
+    Raised when an image tag prefix does not match any known image tag
+    """
+
+    def __init__(self, image_tag_prefix, app_name, env_name):
+        super().__init__("KollieUnknownImageTagPrefixError", app_name, env_name)
+        self.image_tag_prefix = image_tag_prefix
+
+    def __str__(self):
+        return (
+            f"No images found for {self.app_name} "
+            f"with image tag prefix `{self.image_tag_prefix}`"
+        )
+
+
 class KollieKustomizationException(KollieException):
     """
     Raised when there is a problem with the kustomization
@@ -50,6 +66,38 @@ class KollieKustomizationException(KollieException):
         )
 
 
+class KollieKustomizationExistsException(KollieKustomizationException):
+    """
+    Raised when creating a kustomization that already exists
+    """
+
+    def __init__(self, app_name, env_name):
+        super().__init__("create", app_name, env_name)
+
+    def __str__(self):
+        return f"Kustomization for {self.app_name} in {self.env_name} already exists"
+
+
+class KollieAppsCreationError(KollieException):
+    """
+    Raised when some apps of a batch (e.g. a bundle) could not be created
+    """
+
+    def __init__(self, env_name, failed, rolled_back):
+        super().__init__("KollieAppsCreationError", None, env_name)
+        self.failed = failed
+        self.rolled_back = rolled_back
+
+    def __str__(self):
+        failures = "; ".join(f"{app}: {error}" for app, error in self.failed.items())
+        message = f"Failed to create apps in {self.env_name} ({failures})"
+
+        if self.rolled_back:
+            message += f", removed {', '.join(self.rolled_back)} again"
+
+        return message
+
+
 class CreateCustomObjectsApiException(Exception):
     """
     Raised when there is a problem creating a custom object
@@ -76,3 +124,16 @@ class GetCustomObjectsApiException(Exception):
         super().__init__(
             f"Failed to get {self.custom_object} custom object: {self.name}"
         )
+
+
+class GitRepositorySyncTimeoutException(Exception):
+    """
+    Raised when source-controller doesn't pick up new ignore rules in time
+    """
+
+    def __init__(self, name):
+        self.name = name
+
+        super().__init__(
+            f"Timed out waiting for git repository {self.name} to include new paths"
+        )
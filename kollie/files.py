@@ -0,0 +1,25 @@
+import os
+from typing import Hashable
+
+
+def file_fingerprint(path: str) -> Hashable | None:
+    """
+    Fingerprints a file by device, inode, mtime and size so that cached
+    contents can be reused until the file changes.
+
+    `os.stat` follows symlinks, so the atomic `..data` symlink swap kubelet
+    uses to update mounted ConfigMaps changes the fingerprint even when the
+    new file has the same mtime and size.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        Hashable | None: The fingerprint, or None if the file can't be stat'ed.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    return (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
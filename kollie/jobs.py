@@ -0,0 +1,198 @@
+import contextvars
+import datetime
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field, is_dataclass
+from typing import Any, Callable
+
+import structlog
+
+
+logger = structlog.get_logger(__name__)
+
+# Maximum number of jobs running at once, the others wait in the queue
+JOB_WORKERS = int(os.environ.get("KOLLIE_JOB_WORKERS", 4))
+# Number of finished jobs kept so their status can still be read
+MAX_FINISHED_JOBS = int(os.environ.get("KOLLIE_MAX_FINISHED_JOBS", 500))
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class JobStep:
+    """Progress reported by a job, e.g. the creation of one app."""
+
+    name: str
+    status: str
+    detail: str | None = None
+    at: datetime.datetime = field(default_factory=lambda: _now())
+
+
+@dataclass
+class Job:
+    """An operation run in the background by a JobRunner."""
+
+    id: str
+    name: str
+    status: str = PENDING
+    steps: list[JobStep] = field(default_factory=list)
+    result: Any = None
+    error: str | None = None
+    created_at: datetime.datetime = field(default_factory=lambda: _now())
+    started_at: datetime.datetime | None = None
+    finished_at: datetime.datetime | None = None
+    _done: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def wait(self, timeout: float | None = None) -> bool:
+        """Waits for the job to finish. Returns False on timeout."""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "steps": [asdict(step) for step in list(self.steps)],
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+_current_job: contextvars.ContextVar[Job | None] = contextvars.ContextVar(
+    "current_job", default=None
+)
+
+
+def report_step(name: str, status: str, detail: str | None = None) -> None:
+    """
+    Records the progress of the job running in the current context. Does
+    nothing outside of a job, so service functions can report progress
+    whether they run in a job or inline.
+
+    Args:
+        name (str): What the step is about, e.g. an app name.
+        status (str): What happened, e.g. "created".
+        detail (str): Optional details, e.g. an error message.
+    """
+    job = _current_job.get()
+
+    if job is not None:
+        job.steps.append(JobStep(name=name, status=status, detail=detail))
+
+
+class JobRunner:
+    """
+    Runs operations in a thread pool so that HTTP requests can return as soon
+    as the operation is queued, and the operation carries on if the client
+    goes away.
+
+    Jobs only live in the memory of the process that runs them: their status
+    is lost on restart and can only be read from the same replica, which the
+    Helm chart's session affinity takes care of.
+
+    Args:
+        max_workers (int): Maximum number of jobs running at once.
+        max_finished_jobs (int): Number of finished jobs kept, oldest first
+            out.
+    """
+
+    def __init__(self, max_workers: int, max_finished_jobs: int) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="kollie-job"
+        )
+        self._max_finished_jobs = max_finished_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Job:
+        """
+        Queues `func(*args, **kwargs)`. The call runs with a copy of the
+        caller's context, so structlog context variables are kept.
+
+        Args:
+            name (str): What the job does, e.g. "install_bundle".
+            func (Callable): The operation.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(id=uuid.uuid4().hex, name=name)
+
+        with self._lock:
+            self._jobs[job.id] = job
+
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._run, job, func, args, kwargs)
+
+        logger.info("job.queued", job_id=job.id, job_name=name)
+
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Returns a job by id, None if it is unknown or was forgotten."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job, func: Callable[..., Any], args, kwargs) -> None:
+        token = _current_job.set(job)
+        job.status = RUNNING
+        job.started_at = _now()
+
+        try:
+            result = func(*args, **kwargs)
+            if is_dataclass(result) and not isinstance(result, type):
+                result = asdict(result)
+            job.result = result
+            job.status = SUCCEEDED
+        except Exception as exc:
+            logger.exception("job.failed", job_id=job.id, job_name=job.name)
+            job.error = str(exc)
+            job.status = FAILED
+        finally:
+            job.finished_at = _now()
+            _current_job.reset(token)
+            self._forget_finished_jobs()
+            job._done.set()
+
+        logger.info("job.finished", job_id=job.id, job_name=job.name, status=job.status)
+
+    def _forget_finished_jobs(self) -> None:
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+
+            for job_id in finished[: max(len(finished) - self._max_finished_jobs, 0)]:
+                del self._jobs[job_id]
+
+
+_runner: JobRunner | None = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    """Returns the process-wide JobRunner, creating it on first use."""
+    global _runner
+
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(
+                max_workers=JOB_WORKERS, max_finished_jobs=MAX_FINISHED_JOBS
+            )
+
+        return _runner
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
@@ -1,5 +1,5 @@
 import datetime
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 import json
 from typing import List, Optional
 from kubernetes.client.models.v1_ingress import V1Ingress
@@ -224,16 +224,119 @@ class KollieEnvironment:
         return None
 
 
+@dataclass
+class EnvironmentSummary:
+    """
+    Lease and readiness of the apps of an environment, rolled up so that it
+    can be stored in the environment's ConfigMap and read without listing
+    the environment's Kustomizations.
+    """
+
+    apps: List[str] = field(default_factory=list)
+    not_ready_apps: List[str] = field(default_factory=list)
+    lease_window: Optional[str] = None
+    updated_at: Optional[datetime.datetime] = None
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.apps) and not self.not_ready_apps
+
+    @property
+    def ready_app_count(self) -> int:
+        return len(self.apps) - len(self.not_ready_apps)
+
+    @property
+    def lease_until(self) -> Optional[datetime.datetime]:
+        if not self.lease_window:
+            return None
+
+        try:
+            return _datetime_from_str(self.lease_window)
+        except ValueError:
+            return None
+
+    @property
+    def lease_info(self) -> Optional[LeaseInfo]:
+        if self.lease_until:
+            return LeaseInfo(lease_until=self.lease_until)
+
+        return None
+
+    @classmethod
+    def from_kustomizations(
+        cls, kustomizations: List[dict], updated_at: datetime.datetime
+    ) -> "EnvironmentSummary":
+        """
+        Summarises the apps of an environment. The lease window is the one of
+        the app whose lease ends first, like KollieEnvironment.lease_until.
+
+        Args:
+            kustomizations (List[dict]): The kustomizations of the environment.
+            updated_at (datetime.datetime): When the kustomizations were read.
+
+        Returns:
+            EnvironmentSummary: The summary.
+        """
+        apps = []
+        lease_window = None
+        lease_until = None
+
+        for kustomization in _sorted_by_app_name(kustomizations):
+            app = KollieApp.from_resources(kustomization, ingress=None)
+            apps.append(app)
+
+            if app.lease_until and (lease_until is None or app.lease_until < lease_until):
+                lease_until = app.lease_until
+                lease_window = kustomization["spec"]["postBuild"]["substitute"][
+                    "downscaler_uptime"
+                ]
+
+        return cls(
+            apps=[app.name for app in apps],
+            not_ready_apps=[app.name for app in apps if not app.status.ready],
+            lease_window=lease_window,
+            updated_at=updated_at,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EnvironmentSummary":
+        return cls(
+            apps=data.get("apps", []),
+            not_ready_apps=data.get("not_ready_apps", []),
+            lease_window=data.get("lease_window"),
+            updated_at=(
+                datetime.datetime.fromisoformat(data["summary_updated_at"])
+                if data.get("summary_updated_at")
+                else None
+            ),
+        )
+
+    def to_dict(self) -> dict:
+        """The summary as stored in the JSON of the environment's ConfigMap."""
+        return {
+            "apps": self.apps,
+            "not_ready_apps": self.not_ready_apps,
+            "lease_window": self.lease_window,
+            "summary_updated_at": (
+                self.updated_at.isoformat() if self.updated_at else None
+            ),
+        }
+
+
 @dataclass
 class EnvironmentMetadata:
     """
     Shallow object for environment metadata.
+
+    `summary` is None for environments whose ConfigMap hasn't been
+    summarised yet.
     """
 
     name: str
     owner_email: str
     created_at: datetime.datetime
     lease_exclusion_window: Optional[str]
+    summary: Optional[EnvironmentSummary] = None
 
     @staticmethod
     def from_configmap(configmap):
@@ -249,9 +352,91 @@ class EnvironmentMetadata:
                 if "lease_exclusion_window" in body
                 else None
             ),
+            summary=(
+                EnvironmentSummary.from_dict(body)
+                if "summary_updated_at" in body
+                else None
+            ),
         )
 
 
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class AppSnapshot:
+    name: str
+    image_tag_prefix: Optional[str] = None
+    image_tag: Optional[str] = None
+
+
+@dataclass
+class EnvironmentSnapshot:
+    """
+    Definition of an environment, enough to recreate it after it has been
+    deleted: its apps with the image tags they run, its lease exclusion
+    window and its flux repository branch.
+    """
+
+    name: str
+    owner_email: Optional[str]
+    flux_repository_branch: Optional[str] = None
+    lease_exclusion_window: Optional[str] = None
+    apps: List[AppSnapshot] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "EnvironmentSnapshot":
+        """
+        Reads a snapshot exported by to_dict.
+
+        Raises:
+            ValueError: If the snapshot is malformed or of another version.
+        """
+        if not isinstance(data, dict) or data.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Expected a version {SNAPSHOT_VERSION} env snapshot")
+
+        try:
+            return cls(
+                name=data["name"],
+                owner_email=data.get("owner_email"),
+                flux_repository_branch=data.get("flux_repository_branch"),
+                lease_exclusion_window=data.get("lease_exclusion_window"),
+                apps=[
+                    AppSnapshot(
+                        name=app["name"],
+                        image_tag_prefix=app.get("image_tag_prefix"),
+                        image_tag=app.get("image_tag"),
+                    )
+                    for app in data.get("apps", [])
+                ],
+            )
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f"Malformed env snapshot: {e!r}")
+
+    def to_dict(self) -> dict:
+        """The snapshot as a JSON document, leaving out unset values."""
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "name": self.name,
+            "owner_email": self.owner_email,
+            "flux_repository_branch": self.flux_repository_branch,
+            "lease_exclusion_window": self.lease_exclusion_window,
+            "apps": [
+                {key: value for key, value in asdict(app).items() if value is not None}
+                for app in self.apps
+            ],
+        }
+
+        return {key: value for key, value in data.items() if value is not None}
+
+
+def _sorted_by_app_name(kustomizations: List[dict]) -> List[dict]:
+    return sorted(
+        kustomizations,
+        key=lambda kustomization: kustomization["metadata"]["labels"]["tails-app-name"],
+    )
+
+
 def _datetime_from_str(date_str: str) -> datetime.datetime:
     """
     This function provides backwards compatibility for 4 date formats:
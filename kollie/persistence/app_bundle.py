@@ -1,16 +1,37 @@
 from dataclasses import dataclass
 import os
-from typing import Optional, Sequence
+import threading
+from typing import Callable, Hashable, Optional, Sequence
 
+import structlog
+
+from kollie.files import file_fingerprint
+from kollie.persistence.configmap_source import (
+    APP_BUNDLES_KEY,
+    CATALOG_CONFIGMAP_SELECTOR,
+    ConfigMapItemSource,
+    get_configmap_catalog,
+)
+from kollie.persistence.app_template_store import get_app_template_store
 from kollie.persistence.item_source import ItemSource, JsonItemSource
+from kollie.persistence.validation import (
+    CatalogValidationError,
+    ValidationReport,
+    validate_app_bundles,
+)
+
+logger = structlog.get_logger(__name__)
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AppBundle:
     name: str
     description: str
     apps: Sequence[str]
 
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "apps", tuple(self.apps))
+
 
 class AppBundleStore:
     def __init__(self, app_bundle_source: ItemSource[AppBundle]):
@@ -23,10 +44,103 @@ class AppBundleStore:
         return list(self._bundles.values())
 
 
+# Loaded bundle stores and the fingerprint of the source they were loaded
+# from, by source.
+_stores: dict[str, tuple[Hashable | None, AppBundleStore]] = {}
+_reports: dict[str, ValidationReport] = {}
+_stores_lock = threading.Lock()
+
+
 def get_app_bundle_store() -> AppBundleStore:
+    """
+    Returns the AppBundleStore, reading bundles from the ConfigMaps matching
+    KOLLIE_CATALOG_CONFIGMAP_SELECTOR when it is set and from
+    KOLLIE_APP_BUNDLE_JSON_PATH otherwise.
+
+    Bundles are validated as a whole, including that every bundle app has
+    an app template, and are only loaded again when the source or the app
+    templates change. If the changed source can't be loaded the previous
+    bundles are kept until it changes again.
+    """
+    template_store = get_app_template_store()
+    app_names = template_store.get_names()
+
+    def validate(raw_bundles: object, source: str) -> ValidationReport:
+        return validate_app_bundles(raw_bundles, source=source, known_app_names=app_names)
+
+    if CATALOG_CONFIGMAP_SELECTOR:
+        key = f"configmap:{CATALOG_CONFIGMAP_SELECTOR}"
+        source = ConfigMapItemSource(
+            item_type=AppBundle,
+            catalog=get_configmap_catalog(),
+            key=APP_BUNDLES_KEY,
+            validate=lambda raw_bundles: validate(raw_bundles, key),
+        )
+        return _get_cached_store(
+            key=key,
+            fingerprint=(source.fingerprint(), template_store.version),
+            build=lambda: AppBundleStore(app_bundle_source=source),
+        )
 
     json_path = os.getenv("KOLLIE_APP_BUNDLE_JSON_PATH", "app_bundles.json")
+    file_fingerprint_ = file_fingerprint(json_path)
+
+    return _get_cached_store(
+        key=json_path,
+        fingerprint=(
+            (file_fingerprint_, template_store.version)
+            if file_fingerprint_ is not None
+            else None
+        ),
+        build=lambda: AppBundleStore(
+            app_bundle_source=JsonItemSource(
+                json_path=json_path,
+                item_type=AppBundle,
+                validate=lambda raw_bundles: validate(raw_bundles, json_path),
+            )
+        ),
+    )
 
-    return AppBundleStore(
-        app_bundle_source=JsonItemSource(json_path=json_path, item_type=AppBundle)
+
+def get_app_bundle_report() -> ValidationReport | None:
+    """Returns the validation report of the last load of the app bundles."""
+    key = (
+        f"configmap:{CATALOG_CONFIGMAP_SELECTOR}"
+        if CATALOG_CONFIGMAP_SELECTOR
+        else os.getenv("KOLLIE_APP_BUNDLE_JSON_PATH", "app_bundles.json")
     )
+
+    return _reports.get(key)
+
+
+def _get_cached_store(
+    key: str, fingerprint: Hashable | None, build: Callable[[], AppBundleStore]
+) -> AppBundleStore:
+    with _stores_lock:
+        cached = _stores.get(key)
+
+        if cached is not None and fingerprint is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        try:
+            store = build()
+        except (ValueError, TypeError) as exc:
+            _reports[key] = (
+                exc.report
+                if isinstance(exc, CatalogValidationError)
+                else ValidationReport(source=key, errors=(str(exc),))
+            )
+
+            if cached is None:
+                raise
+
+            logger.exception("app_bundle_store.reload_failed", source=key)
+            _stores[key] = (fingerprint, cached[1])
+            return cached[1]
+
+        _stores[key] = (fingerprint, store)
+        _reports[key] = ValidationReport(
+            source=key, item_count=len(store.get_all_bundles())
+        )
+
+        return store
@@ -1,8 +1,9 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from kollie.cluster.constants import DEFAULT_FLUX_REPOSITORY
+from kollie.cluster.image_policy_spec import sanitise_image_tag_prefix
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ImageRepositoryRef:
     """
     Reference to a deployed ImageRepository resource in a namespace.
@@ -14,9 +15,13 @@ class ImageRepositoryRef:
     namespace: str
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AppTemplate:
-    """Describes a template for an application that Kollie can deploy."""
+    """Describes a template for an application that Kollie can deploy.
+
+    Templates are immutable so that they can be shared between requests and
+    threads. Data derived from the template is computed once on creation.
+    """
 
     app_name: str
     label: str
@@ -25,6 +30,31 @@ class AppTemplate:
     default_image_tag_prefix: str
     image_repository_ref: ImageRepositoryRef
 
+    sanitised_default_image_tag_prefix: str = field(
+        init=False, repr=False, compare=False
+    )
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self,
+            "sanitised_default_image_tag_prefix",
+            sanitise_image_tag_prefix(self.default_image_tag_prefix),
+        )
+
+    def to_dict(self) -> dict:
+        """Returns the template as it is defined in the catalog."""
+        return {
+            "app_name": self.app_name,
+            "label": self.label,
+            "git_repository_name": self.git_repository_name,
+            "git_repository_path": self.git_repository_path,
+            "image_repository_ref": {
+                "name": self.image_repository_ref.name,
+                "namespace": self.image_repository_ref.namespace,
+            },
+            "default_image_tag_prefix": self.default_image_tag_prefix,
+        }
+
     @classmethod
     def from_dict(cls, data: dict) -> "AppTemplate":
         image_repository_ref = ImageRepositoryRef(
@@ -0,0 +1,131 @@
+import re
+from dataclasses import dataclass
+from typing import Collection, Iterable
+
+from .app_template import AppTemplate
+
+DEFAULT_PAGE_SIZE = 50
+
+# Match ranks, best first
+EXACT_MATCH = 0
+PREFIX_MATCH = 1
+WORD_PREFIX_MATCH = 2
+SUBSTRING_MATCH = 3
+FUZZY_MATCH = 4
+
+_WORD_SEPARATOR = re.compile(r"[^a-z0-9]+")
+
+
+@dataclass(frozen=True, slots=True)
+class AppTemplatePage:
+    """A page of app templates matching a search."""
+
+    items: tuple[AppTemplate, ...]
+    total: int
+    offset: int
+    limit: int
+
+    @property
+    def has_more(self) -> bool:
+        return self.offset + len(self.items) < self.total
+
+
+class AppTemplateIndex:
+    """
+    Search index over the app_name and label of a set of AppTemplates.
+
+    The index is built once per catalog load: the lowercase names and labels
+    and the words they are made of are computed up front, so a search is a
+    single pass over the catalog with plain string comparisons. Matches are
+    ranked exact, prefix, word prefix, substring, then fuzzy (in order
+    subsequence).
+
+    Args:
+        templates (Iterable[AppTemplate]): The templates to index, in catalog
+            order.
+    """
+
+    def __init__(self, templates: Iterable[AppTemplate]) -> None:
+        self._templates = tuple(templates)
+        self._searchable = tuple(
+            (
+                template.app_name.lower(),
+                template.label.lower(),
+                (
+                    *_words(template.app_name.lower()),
+                    *_words(template.label.lower()),
+                ),
+            )
+            for template in self._templates
+        )
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def search(
+        self,
+        query: str = "",
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        exclude: Collection[str] = (),
+    ) -> AppTemplatePage:
+        """
+        Returns a page of the templates matching `query`, best matches first.
+        An empty query matches every template in catalog order.
+
+        Args:
+            query (str): Text to look for in the app name or label.
+            offset (int): Number of matches to skip.
+            limit (int): Maximum number of templates to return.
+            exclude (Collection[str]): Names of apps to leave out, e.g. the
+                apps already installed in an env.
+
+        Returns:
+            AppTemplatePage: The requested page of matches.
+        """
+        offset = max(offset, 0)
+        limit = max(limit, 0)
+        matches = [
+            position
+            for position in self._match(query.strip().lower())
+            if self._templates[position].app_name not in exclude
+        ]
+
+        return AppTemplatePage(
+            items=tuple(
+                self._templates[position]
+                for position in matches[offset : offset + limit]
+            ),
+            total=len(matches),
+            offset=offset,
+            limit=limit,
+        )
+
+    def _match(self, query: str) -> list[int]:
+        if not query:
+            return list(range(len(self._templates)))
+
+        ranks: dict[int, int] = {}
+
+        for position, (app_name, label, words) in enumerate(self._searchable):
+            if app_name == query or label == query:
+                ranks[position] = EXACT_MATCH
+            elif app_name.startswith(query) or label.startswith(query):
+                ranks[position] = PREFIX_MATCH
+            elif any(word.startswith(query) for word in words):
+                ranks[position] = WORD_PREFIX_MATCH
+            elif query in app_name or query in label:
+                ranks[position] = SUBSTRING_MATCH
+            elif _is_subsequence(query, app_name) or _is_subsequence(query, label):
+                ranks[position] = FUZZY_MATCH
+
+        return sorted(ranks, key=lambda position: (ranks[position], position))
+
+
+def _words(value: str) -> list[str]:
+    return [word for word in _WORD_SEPARATOR.split(value) if word]
+
+
+def _is_subsequence(query: str, value: str) -> bool:
+    remaining = iter(value)
+    return all(char in remaining for char in query)
@@ -1,7 +1,10 @@
 import json
-from typing import Protocol
+from typing import Hashable, Protocol
+
+from kollie.files import file_fingerprint
 
 from .app_template import AppTemplate
+from .validation import CatalogValidationError, validate_app_templates
 
 
 class AppTemplateSource(Protocol):
@@ -9,6 +12,14 @@ class AppTemplateSource(Protocol):
 
     def load(self) -> list[AppTemplate]: ...
 
+    def fingerprint(self) -> Hashable | None:
+        """
+        Returns a value that changes whenever the templates change, so
+        that stores only reload when needed. None means the source can't
+        tell and must be reloaded on every read.
+        """
+        ...
+
 
 class JsonFileAppTemplateSource:
     """Source for AppTemplates from a JSON file."""
@@ -21,9 +32,23 @@ class JsonFileAppTemplateSource:
         """
         self._json_path = json_path
 
+    def __str__(self) -> str:
+        return self._json_path
+
+    def fingerprint(self) -> Hashable | None:
+        """Fingerprints the JSON file, see `kollie.files.file_fingerprint`.
+
+        Returns:
+            Hashable | None: The fingerprint or None if the file can't be stat'ed.
+        """
+        return file_fingerprint(self._json_path)
+
     def load(self) -> list[AppTemplate]:
         """Loads AppTemplates from a JSON file.
 
+        Raises:
+            ValueError: If the file is malformed or fails validation
+
         Returns:
             list[AppTemplate]: List of app templates
         """
@@ -38,4 +63,9 @@ class JsonFileAppTemplateSource:
             # File is not empty, but contains malformed JSON
             raise ValueError(f"File {self._json_path} contains malformed JSON")
 
+        report = validate_app_templates(templates, source=self._json_path)
+
+        if not report.valid:
+            raise CatalogValidationError(report)
+
         return [AppTemplate.from_dict(template) for template in templates]
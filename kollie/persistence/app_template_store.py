@@ -1,7 +1,29 @@
 import os
+import threading
+from typing import Collection, Hashable, NamedTuple
+
+import structlog
 
 from .app_template import AppTemplate
+from .app_template_search import DEFAULT_PAGE_SIZE, AppTemplateIndex, AppTemplatePage
 from .app_template_source import AppTemplateSource, JsonFileAppTemplateSource
+from .validation import CatalogValidationError, ValidationReport
+from .configmap_source import (
+    CATALOG_CONFIGMAP_SELECTOR,
+    ConfigMapAppTemplateSource,
+    get_configmap_catalog,
+)
+
+logger = structlog.get_logger(__name__)
+
+
+class _Snapshot(NamedTuple):
+    templates: tuple[AppTemplate, ...]
+    templates_by_name: dict[str, AppTemplate]
+    search_index: AppTemplateIndex
+
+
+_EMPTY_SNAPSHOT = _Snapshot(templates=(), templates_by_name={}, search_index=AppTemplateIndex(()))
 
 
 class AppTemplateStore:
@@ -12,6 +34,11 @@ class AppTemplateStore:
     to deploy an application. They are used to generate Kustomizations and
     ImagePolicy resources.
 
+    Templates are loaded once and indexed by name. The source is only
+    reloaded when its fingerprint changes (or on every read for sources
+    that can't fingerprint themselves). If a changed source can't be loaded
+    the previous templates are kept until the source changes again.
+
     Args:
         source (AppTemplateSource): Source for AppTemplates
 
@@ -21,6 +48,21 @@ class AppTemplateStore:
 
     def __init__(self, source: AppTemplateSource) -> None:
         self._source = source
+        self._lock = threading.Lock()
+        self._fingerprint: Hashable | None = None
+        self._snapshot: _Snapshot | None = None
+        self._report: ValidationReport | None = None
+        self._version = 0
+
+    @property
+    def version(self) -> int:
+        """A number incremented whenever the templates are reloaded."""
+        return self._version
+
+    @property
+    def report(self) -> ValidationReport | None:
+        """The validation report of the last load of the source."""
+        return self._report
 
     def get_by_name(self, app_name: str) -> AppTemplate | None:
         """Returns an AppTemplate by name.
@@ -31,13 +73,7 @@ class AppTemplateStore:
         Returns:
             AppTemplate: The AppTemplate with the given name
         """
-        templates = self._source.load()
-
-        for template in templates:
-            if template.app_name == app_name:
-                return template
-
-        return None
+        return self._load().templates_by_name.get(app_name)
 
     def get_all(self) -> list[AppTemplate]:
         """Returns all AppTemplates.
@@ -45,11 +81,119 @@ class AppTemplateStore:
         Returns:
             list[AppTemplate]: All AppTemplates
         """
-        return self._source.load()
+        return list(self._load().templates)
 
+    def get_names(self) -> Collection[str]:
+        """Returns the names of all AppTemplates.
 
-def get_app_template_store() -> AppTemplateStore:
-    """Factory function for AppTemplateStore."""
-    json_path = os.environ.get("KOLLIE_APP_TEMPLATE_JSON_PATH", "app_templates.json")
+        Returns:
+            Collection[str]: Names of all AppTemplates
+        """
+        return self._load().templates_by_name.keys()
+
+    def search(
+        self,
+        query: str = "",
+        offset: int = 0,
+        limit: int = DEFAULT_PAGE_SIZE,
+        exclude: Collection[str] = (),
+    ) -> AppTemplatePage:
+        """Searches AppTemplates by app name and label.
+
+        Uses an index built whenever the templates are reloaded.
+
+        Args:
+            query (str): Text to look for, matched as a prefix, substring or
+                fuzzily. An empty query matches every AppTemplate.
+            offset (int): Number of matches to skip.
+            limit (int): Maximum number of AppTemplates to return.
+            exclude (Collection[str]): Names of AppTemplates to leave out.
+
+        Returns:
+            AppTemplatePage: The requested page of matches, best first.
+        """
+        return self._load().search_index.search(
+            query, offset=offset, limit=limit, exclude=exclude
+        )
 
-    return AppTemplateStore(source=JsonFileAppTemplateSource(json_path=json_path))
+    def refresh(self) -> bool:
+        """Reloads the templates if the source changed.
+
+        Raises:
+            ValueError, KeyError: If the changed source is invalid. The
+                previous templates are kept.
+
+        Returns:
+            bool: Whether the templates were reloaded.
+        """
+        fingerprint = self._source.fingerprint()
+
+        with self._lock:
+            if (
+                self._snapshot is not None
+                and fingerprint is not None
+                and fingerprint == self._fingerprint
+            ):
+                return False
+
+            # recorded before loading so a broken source is only retried
+            # once it changes again
+            self._fingerprint = fingerprint
+
+            try:
+                templates = tuple(self._source.load())
+            except CatalogValidationError as exc:
+                self._report = exc.report
+                raise
+
+            self._snapshot = _Snapshot(
+                templates=templates,
+                templates_by_name={template.app_name: template for template in templates},
+                search_index=AppTemplateIndex(templates),
+            )
+            self._report = ValidationReport(
+                source=str(self._source), item_count=len(templates)
+            )
+            self._version += 1
+
+            return True
+
+    def _load(self) -> "_Snapshot":
+        try:
+            self.refresh()
+        except (ValueError, KeyError):
+            if self._snapshot is None:
+                raise
+            logger.exception("app_template_store.reload_failed")
+
+        return self._snapshot or _EMPTY_SNAPSHOT
+
+
+_stores: dict[str, AppTemplateStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_app_template_store() -> AppTemplateStore:
+    """
+    Returns the process-wide AppTemplateStore, reading templates from the
+    ConfigMaps matching KOLLIE_CATALOG_CONFIGMAP_SELECTOR when it is set and
+    from KOLLIE_APP_TEMPLATE_JSON_PATH otherwise.
+    """
+    if CATALOG_CONFIGMAP_SELECTOR:
+        key = f"configmap:{CATALOG_CONFIGMAP_SELECTOR}"
+    else:
+        json_path = os.environ.get(
+            "KOLLIE_APP_TEMPLATE_JSON_PATH", "app_templates.json"
+        )
+        key = json_path
+
+    with _stores_lock:
+        if key not in _stores:
+            source: AppTemplateSource = (
+                ConfigMapAppTemplateSource(catalog=get_configmap_catalog())
+                if CATALOG_CONFIGMAP_SELECTOR
+                else JsonFileAppTemplateSource(json_path=json_path)
+            )
+            _stores[key] = AppTemplateStore(source=source)
+
+        return _stores[key]
@@ -0,0 +1,257 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Generic, Type
+
+import structlog
+from kubernetes import client
+from kubernetes.client.models.v1_config_map import V1ConfigMap
+
+from kollie.cluster.configmap import list_configmaps_by_selector, watch_configmaps
+
+from .app_template import AppTemplate
+from .item_source import ItemType
+from .validation import CatalogValidationError, ValidationReport, validate_app_templates
+
+logger = structlog.get_logger(__name__)
+
+# Label selector of the ConfigMaps holding the app catalog, e.g.
+# `kollie.tails.com/catalog=true`. When unset the catalog is read from the
+# JSON files mounted into the pod.
+CATALOG_CONFIGMAP_SELECTOR = os.environ.get("KOLLIE_CATALOG_CONFIGMAP_SELECTOR", "")
+
+APP_TEMPLATES_KEY = "app_templates.json"
+APP_BUNDLES_KEY = "app_bundles.json"
+
+# Delay before the watch is restarted after an unexpected error
+WATCH_RETRY_SECONDS = 5
+
+
+class ConfigMapCatalog:
+    """
+    In-memory copy of the JSON lists stored in a set of labelled ConfigMaps,
+    kept up to date by watching the ConfigMaps through the Kubernetes API.
+
+    Every ConfigMap can hold any of the catalog keys (e.g.
+    `app_templates.json`), each a JSON list, so the catalog can be sharded
+    across ConfigMaps, for example one per team. Items are returned ordered
+    by ConfigMap name.
+
+    A ConfigMap containing malformed JSON is logged and its previous content
+    kept, so one broken shard doesn't affect the others.
+
+    Args:
+        label_selector (str): Label selector of the catalog ConfigMaps.
+    """
+
+    def __init__(self, label_selector: str) -> None:
+        self.label_selector = label_selector
+        self._lock = threading.Lock()
+        self._data: dict[str, dict[str, list[dict]]] = {}
+        self._version = 0
+        self._resource_version = ""
+        self._watcher: threading.Thread | None = None
+
+    @property
+    def version(self) -> int:
+        """A number incremented whenever the catalog changes."""
+        return self._version
+
+    @property
+    def synced(self) -> bool:
+        """Whether the ConfigMaps have been listed at least once."""
+        return self._version > 0
+
+    def items(self, key: str) -> list[dict]:
+        """Returns the items stored under `key` in every ConfigMap."""
+        with self._lock:
+            return [
+                item
+                for name in sorted(self._data)
+                for item in self._data[name].get(key, [])
+            ]
+
+    def start(self) -> None:
+        """
+        Loads the ConfigMaps and starts watching them in a daemon thread.
+        Does nothing if the catalog is already started.
+        """
+        if self._watcher is not None:
+            return
+
+        self.load()
+
+        self._watcher = threading.Thread(target=self._watch, daemon=True)
+        self._watcher.start()
+
+    def load(self) -> None:
+        """Replaces the catalog with the current ConfigMaps."""
+        configmaps = list_configmaps_by_selector(self.label_selector)
+
+        with self._lock:
+            previous = self._data
+            self._data = {}
+
+            for configmap in configmaps.items:
+                name = configmap.metadata.name
+                self._data[name] = self._parse(configmap, previous.get(name, {}))
+
+            self._resource_version = configmaps.metadata.resource_version
+            self._version += 1
+
+    def handle_event(self, event: dict) -> None:
+        """Applies a ConfigMap watch event to the catalog."""
+        configmap: V1ConfigMap = event["object"]
+        name = configmap.metadata.name
+
+        with self._lock:
+            if event["type"] == "DELETED":
+                self._data.pop(name, None)
+            else:
+                self._data[name] = self._parse(configmap, self._data.get(name, {}))
+
+            self._resource_version = configmap.metadata.resource_version
+            self._version += 1
+
+        logger.info("configmap_catalog.updated", configmap=name, event_type=event["type"])
+
+    def _watch(self) -> None:
+        while True:
+            try:
+                for event in watch_configmaps(self.label_selector, self._resource_version):
+                    self.handle_event(event)
+            except client.ApiException as exc:
+                if exc.status != 410:
+                    logger.exception("configmap_catalog.watch_failed")
+                    time.sleep(WATCH_RETRY_SECONDS)
+
+                # the resource version is too old to resume from
+                self._reload()
+            except Exception:
+                logger.exception("configmap_catalog.watch_failed")
+                time.sleep(WATCH_RETRY_SECONDS)
+                self._reload()
+
+    def _reload(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            logger.exception("configmap_catalog.load_failed")
+
+    def _parse(
+        self, configmap: V1ConfigMap, previous: dict[str, list[dict]]
+    ) -> dict[str, list[dict]]:
+        parsed: dict[str, list[dict]] = {}
+
+        for key, content in (configmap.data or {}).items():
+            if not key.endswith(".json"):
+                continue
+
+            try:
+                items = json.loads(content) if content.strip() else []
+                if not isinstance(items, list):
+                    raise ValueError(f"{key} must contain a JSON list")
+            except ValueError:
+                logger.exception(
+                    "configmap_catalog.malformed_json",
+                    configmap=configmap.metadata.name,
+                    key=key,
+                )
+                items = previous.get(key, [])
+
+            parsed[key] = items
+
+        return parsed
+
+
+class ConfigMapAppTemplateSource:
+    """Source for AppTemplates from a ConfigMapCatalog."""
+
+    def __init__(self, catalog: ConfigMapCatalog, key: str = APP_TEMPLATES_KEY) -> None:
+        self._catalog = catalog
+        self._key = key
+
+    def __str__(self) -> str:
+        return f"{self._key} in configmaps {self._catalog.label_selector}"
+
+    def fingerprint(self) -> int:
+        """The catalog version, so stores reindex whenever it changes."""
+        return self._catalog.version
+
+    def load(self) -> list[AppTemplate]:
+        """Loads AppTemplates from the catalog.
+
+        Raises:
+            CatalogValidationError: If the templates fail validation
+
+        Returns:
+            list[AppTemplate]: List of app templates
+        """
+        items = self._catalog.items(self._key)
+        report = validate_app_templates(items, source=str(self))
+
+        if not report.valid:
+            raise CatalogValidationError(report)
+
+        return [AppTemplate.from_dict(item) for item in items]
+
+
+class ConfigMapItemSource(Generic[ItemType]):
+    """
+    Generic ConfigMapCatalog reader for any dataclass.
+    """
+
+    def __init__(
+        self,
+        item_type: Type[ItemType],
+        catalog: ConfigMapCatalog,
+        key: str,
+        validate: Callable[[object], ValidationReport] | None = None,
+    ) -> None:
+        """
+        item_type: The dataclass to hydrate items into.
+        catalog: The catalog to read items from.
+        key: The catalog key holding the items.
+        validate: Optional validation of all raw items, run before hydration.
+        """
+        self.item_type = item_type
+        self._catalog = catalog
+        self._key = key
+        self._validate = validate
+
+    def __str__(self) -> str:
+        return f"{self._key} in configmaps {self._catalog.label_selector}"
+
+    def fingerprint(self) -> int:
+        return self._catalog.version
+
+    def load(self) -> list[ItemType]:
+        items = self._catalog.items(self._key)
+
+        if self._validate is not None:
+            report = self._validate(items)
+            if not report.valid:
+                raise CatalogValidationError(report)
+
+        return [self.item_type(**raw_item) for raw_item in items]
+
+
+_catalog: ConfigMapCatalog | None = None
+_catalog_lock = threading.Lock()
+
+
+def get_configmap_catalog() -> ConfigMapCatalog:
+    """
+    Returns the process-wide catalog for KOLLIE_CATALOG_CONFIGMAP_SELECTOR,
+    loading it and starting its watch on first use.
+    """
+    global _catalog
+
+    with _catalog_lock:
+        if _catalog is None:
+            catalog = ConfigMapCatalog(label_selector=CATALOG_CONFIGMAP_SELECTOR)
+            catalog.start()
+            _catalog = catalog
+
+        return _catalog
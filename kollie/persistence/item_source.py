@@ -1,5 +1,7 @@
 import json
-from typing import Generic, Protocol, Type, TypeVar
+from typing import Callable, Generic, Protocol, Type, TypeVar
+
+from .validation import CatalogValidationError, ValidationReport
 
 ItemType = TypeVar("ItemType")
 
@@ -14,17 +16,20 @@ class JsonItemSource(Generic[ItemType]):
         item_type: Type[ItemType],
         json_path: str | None = None,
         json_str: str | None = None,
+        validate: Callable[[object], ValidationReport] | None = None,
     ) -> None:
         """
         item_type: The dataclass to hydrate json items into.
         json_path: The path to the json file.
         json_str: The json string.
+        validate: Optional validation of all raw items, run before hydration.
 
         One of json_path or json_str must be provided.
         json_str takes precedence over json_path.
         """
         self.json_str: str = ""
         self.item_type = item_type
+        self._validate = validate
 
         if json_str is not None:
             self.json_str = json_str
@@ -39,7 +44,14 @@ class JsonItemSource(Generic[ItemType]):
             return source_file.read()
 
     def load(self) -> list[ItemType]:
-        return [self.item_type(**raw_item) for raw_item in json.loads(self.json_str)]
+        raw_items = json.loads(self.json_str)
+
+        if self._validate is not None:
+            report = self._validate(raw_items)
+            if not report.valid:
+                raise CatalogValidationError(report)
+
+        return [self.item_type(**raw_item) for raw_item in raw_items]
 
 
 class ItemSource(Protocol, Generic[ItemType]):
@@ -0,0 +1,141 @@
+from collections import Counter
+from dataclasses import dataclass
+from typing import Collection
+
+
+REQUIRED_APP_TEMPLATE_KEYS = (
+    "app_name",
+    "label",
+    "git_repository_path",
+    "default_image_tag_prefix",
+    "image_repository_ref",
+)
+REQUIRED_APP_BUNDLE_KEYS = ("name", "description", "apps")
+
+
+@dataclass(frozen=True, slots=True)
+class ValidationReport:
+    """Result of validating a catalog source (app templates or bundles)."""
+
+    source: str
+    item_count: int = 0
+    errors: tuple[str, ...] = ()
+
+    @property
+    def valid(self) -> bool:
+        return not self.errors
+
+
+class CatalogValidationError(ValueError):
+    """
+    Raised when a catalog source fails validation
+    """
+
+    def __init__(self, report: ValidationReport):
+        self.report = report
+
+        super().__init__(f"{report.source} is invalid: {'; '.join(report.errors)}")
+
+
+def validate_app_templates(raw_templates: object, source: str) -> ValidationReport:
+    """
+    Validates raw app templates (as parsed from JSON) as a whole, so that a
+    bad catalog is rejected when it is loaded rather than mid-request.
+
+    Args:
+        raw_templates (object): The parsed JSON.
+        source (str): Name of the source, for error messages.
+
+    Returns:
+        ValidationReport: The validation report.
+    """
+    if not isinstance(raw_templates, list):
+        return ValidationReport(source=source, errors=("expected a JSON list",))
+
+    errors = []
+
+    for index, template in enumerate(raw_templates):
+        if not isinstance(template, dict):
+            errors.append(f"item {index} is not an object")
+            continue
+
+        name = template.get("app_name", f"item {index}")
+        missing = [key for key in REQUIRED_APP_TEMPLATE_KEYS if not template.get(key)]
+
+        if missing:
+            errors.append(f"{name} is missing {', '.join(missing)}")
+
+        ref = template.get("image_repository_ref")
+        if ref and not (isinstance(ref, dict) and ref.get("name") and ref.get("namespace")):
+            errors.append(f"{name} image_repository_ref needs a name and namespace")
+
+    names = Counter(
+        template["app_name"]
+        for template in raw_templates
+        if isinstance(template, dict) and template.get("app_name")
+    )
+    errors.extend(
+        f"{name} is defined {count} times" for name, count in names.items() if count > 1
+    )
+
+    return ValidationReport(
+        source=source, item_count=len(raw_templates), errors=tuple(errors)
+    )
+
+
+def validate_app_bundles(
+    raw_bundles: object, source: str, known_app_names: Collection[str] | None = None
+) -> ValidationReport:
+    """
+    Validates raw app bundles (as parsed from JSON) as a whole.
+
+    Args:
+        raw_bundles (object): The parsed JSON.
+        source (str): Name of the source, for error messages.
+        known_app_names (Collection[str]): App template names bundles may
+            refer to. Bundle apps aren't checked when None.
+
+    Returns:
+        ValidationReport: The validation report.
+    """
+    if not isinstance(raw_bundles, list):
+        return ValidationReport(source=source, errors=("expected a JSON list",))
+
+    errors = []
+
+    for index, bundle in enumerate(raw_bundles):
+        if not isinstance(bundle, dict):
+            errors.append(f"item {index} is not an object")
+            continue
+
+        name = bundle.get("name", f"item {index}")
+        missing = [key for key in REQUIRED_APP_BUNDLE_KEYS if key not in bundle]
+        unexpected = sorted(set(bundle) - set(REQUIRED_APP_BUNDLE_KEYS))
+
+        if missing:
+            errors.append(f"{name} is missing {', '.join(missing)}")
+
+        if unexpected:
+            errors.append(f"{name} has unexpected keys {', '.join(unexpected)}")
+
+        apps = bundle.get("apps", [])
+
+        if not isinstance(apps, list):
+            errors.append(f"{name} apps must be a list")
+        elif known_app_names is not None:
+            unknown = [app for app in apps if app not in known_app_names]
+            if unknown:
+                errors.append(f"{name} refers to unknown apps {', '.join(unknown)}")
+
+    names = Counter(
+        bundle["name"]
+        for bundle in raw_bundles
+        if isinstance(bundle, dict) and bundle.get("name")
+    )
+    errors.extend(
+        f"{name} is defined {count} times" for name, count in names.items() if count > 1
+    )
+
+    return ValidationReport(
+        source=source, item_count=len(raw_bundles), errors=tuple(errors)
+    )
@@ -0,0 +1,88 @@
+from dataclasses import dataclass, field
+from typing import Iterable
+
+
+@dataclass
+class _Node:
+    children: dict[str, "_Node"] = field(default_factory=dict)
+    terminal: bool = False
+
+
+class PrefixTrie:
+    """
+    In-memory prefix tree of strings, used to answer autocomplete queries
+    without scanning every known value.
+
+    Args:
+        values (Iterable[str]): Initial values.
+    """
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self._root = _Node()
+        self._size = 0
+
+        for value in values:
+            self.insert(value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, value: object) -> bool:
+        if not isinstance(value, str):
+            return False
+
+        node = self._find(value)
+        return node is not None and node.terminal
+
+    def insert(self, value: str) -> None:
+        """Adds a value to the trie."""
+        node = self._root
+
+        for char in value:
+            node = node.children.setdefault(char, _Node())
+
+        if not node.terminal:
+            node.terminal = True
+            self._size += 1
+
+    def starts_with(self, prefix: str, limit: int | None = None) -> list[str]:
+        """
+        Returns the values starting with `prefix` in alphabetical order.
+
+        Args:
+            prefix (str): The prefix to complete.
+            limit (int): Optional maximum number of values to return.
+
+        Returns:
+            list[str]: The matching values.
+        """
+        node = self._find(prefix)
+
+        if node is None:
+            return []
+
+        results: list[str] = []
+        stack = [(prefix, node)]
+
+        while stack and (limit is None or len(results) < limit):
+            value, node = stack.pop()
+
+            if node.terminal:
+                results.append(value)
+
+            # pushed in reverse so that values are popped alphabetically
+            for char in sorted(node.children, reverse=True):
+                stack.append((value + char, node.children[char]))
+
+        return results
+
+    def _find(self, prefix: str) -> _Node | None:
+        node = self._root
+
+        for char in prefix:
+            child = node.children.get(char)
+            if child is None:
+                return None
+            node = child
+
+        return node
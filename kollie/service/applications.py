@@ -1,10 +1,33 @@
+from dataclasses import dataclass, field
+from typing import Collection, Mapping
+
+import structlog
+
 from kollie.cluster.ingress import get_ingress
 from kollie.cluster.configmap import get_configmap
-from kollie.cluster.image_policy import create_owned_image_policy, delete_image_policies
-from kollie.exceptions import KollieConfigError, KollieException
+from kollie.cluster.constants import GIT_REPOSITORY_NARROW_PATHS
+from kollie.cluster.image_policy import (
+    delete_image_policies,
+    resolve_latest_image_tag,
+    retarget_image_policy,
+    subscribe_to_image_policy,
+    unsubscribe_from_image_policy,
+)
+from kollie.cluster.image_policy_spec import image_policy_key
+from kollie.exceptions import (
+    GitRepositorySyncTimeoutException,
+    KollieAppsCreationError,
+    KollieConfigError,
+    KollieException,
+    KollieKustomizationExistsException,
+    KollieUnknownImageTagPrefixError,
+)
 from kollie.models import KollieApp, EnvironmentMetadata
-from kollie.persistence import get_app_template_store
-from kollie.cluster.git_repository import get_git_repository
+from kollie.persistence import AppTemplate, get_app_template_store
+from kollie.cluster.git_repository import (
+    get_git_repository,
+    update_git_repository_include_paths,
+)
 from kollie.cluster.kustomization import (
     patch_kustomization,
     create_kustomization,
@@ -12,6 +35,24 @@ from kollie.cluster.kustomization import (
     get_kustomizations,
 )
 from kollie.cluster.kustomization_request import PatchKustomizationRequest
+from kollie.concurrency import map_concurrently
+from kollie.jobs import report_step
+from kollie.service.env_summary import refresh_env_summary
+from kollie.service.image_tags import is_known_image_tag_prefix
+
+
+logger = structlog.get_logger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class _EnvInputs:
+    """What creating an app needs to know about its environment."""
+
+    env_name: str
+    owner_email: str
+    owner_uid: str
+    lease_exclusion_window: str | None
+    git_repository_name: str | None
 
 
 def create_app(
@@ -21,7 +62,8 @@ def create_app(
     image_tag_prefix: str | None = None,
 ) -> None:
     """
-    Creates a new app in an environment by creating a kustomization and image policy.
+    Creates a new app in an environment by creating a kustomization and
+    subscribing it to the image policy for its image tag prefix.
 
     Args:
         app_name (str): The name of the app (for loading app template).
@@ -29,14 +71,91 @@ def create_app(
         owner_email (str): The email of the owner of the environment.
         image_tag_prefix (str): Image tag prefix to run (defaults to app template default image_tag_prefix).
     """
+    create_apps(
+        env_name=env_name,
+        owner_email=owner_email,
+        image_tag_prefixes={app_name: image_tag_prefix},
+    )
+
+
+@dataclass
+class AppsCreation:
+    """
+    Record of a create_apps operation: which apps it created, which already
+    existed (e.g. created by an earlier, interrupted attempt) and, on failure,
+    which failed and which of the created apps were removed again.
+    """
+
+    env_name: str
+    created: list[str] = field(default_factory=list)
+    existing: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    rolled_back: list[str] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        return not self.failed
+
+
+def create_apps(
+    env_name: str,
+    owner_email: str,
+    image_tag_prefixes: Mapping[str, str | None],
+    max_workers: int = 1,
+    rollback: bool = True,
+    image_tags: Mapping[str, str | None] | None = None,
+) -> AppsCreation:
+    """
+    Creates several apps in an environment.
+
+    The inputs shared by the apps (the env ConfigMap, the app templates and
+    the env's GitRepository) are read once and every app is validated before
+    anything is created. The kustomizations are then created and subscribed
+    to their image policies concurrently.
+
+    Creating apps is idempotent: an app whose kustomization already exists
+    is kept as it is and (re)subscribed to its image policy, so a failed
+    call can simply be retried. When an app fails, the apps created by this
+    call are deleted again unless `rollback` is False, in which case they
+    are kept and a retry resumes from the failed apps.
+
+    Args:
+        env_name (str): The name of the environment.
+        owner_email (str): The email of the owner of the environment.
+        image_tag_prefixes (Mapping[str, str | None]): Image tag prefix to
+            run by app name, None for the app template default.
+        max_workers (int): Maximum number of apps created at once.
+        rollback (bool): Whether to delete the created apps when an app fails.
+        image_tags (Mapping[str, str | None]): Image tag to deploy by app
+            name, e.g. the tags running in another env. Apps without one get
+            the latest tag for their image tag prefix.
+
+    Raises:
+        KollieConfigError: If an app has no app template.
+        KollieUnknownImageTagPrefixError: If an image tag prefix is unknown.
+        KollieAppsCreationError: If any app could not be created, once every
+            app has been attempted.
+        GitRepositorySyncTimeoutException: If the env's GitRepository didn't
+            pick up the new paths in time. No app is created then.
+
+    Returns:
+        AppsCreation: What was created.
+    """
     env_config = get_configmap(name=env_name)
     env_metadata = EnvironmentMetadata.from_configmap(env_config)
 
-    app_templates = get_app_template_store()
-    app_template = app_templates.get_by_name(app_name=app_name)
+    image_tags = image_tags or {}
+    apps = [
+        (app_template, image_tag_prefix, image_tags.get(app_template.app_name))
+        for app_template, image_tag_prefix in validate_apps(
+            env_name, image_tag_prefixes
+        )
+    ]
 
-    if not app_template:
-        raise KollieConfigError(message=f"App template not found for {app_name}")
+    creation = AppsCreation(env_name=env_name)
+
+    if not apps:
+        return creation
 
     env_git_repository = get_git_repository(env_name)
     git_repository_name = (
@@ -44,21 +163,221 @@ def create_app(
         if env_git_repository else None
     )
 
-    kustomization = create_kustomization(
+    widened_git_repository = None
+
+    if env_git_repository and GIT_REPOSITORY_NARROW_PATHS:
+        # The env's GitRepository only packages the paths its apps use, so the
+        # new paths must be in the artifact before the kustomizations are created
+        app_paths = _get_app_paths(env_name)
+
+        try:
+            widened_git_repository = update_git_repository_include_paths(
+                env_git_repository,
+                include_paths=app_paths
+                + [app_template.git_repository_path for app_template, _, _ in apps],
+                wait=True,
+                # keep the paths added by concurrent calls for apps not created yet
+                keep_included=True,
+            )
+        except GitRepositorySyncTimeoutException:
+            # the kustomizations would fail on the missing paths, so nothing is
+            # created and the rules go back to what the env's apps use
+            _restore_include_paths(env_name)
+            raise
+
+    env_inputs = _EnvInputs(
         env_name=env_name,
-        image_tag_prefix=image_tag_prefix or app_template.default_image_tag_prefix,
-        app_template=app_template,
         owner_email=owner_email,
         owner_uid=env_config.metadata.uid,
         lease_exclusion_window=env_metadata.lease_exclusion_window,
         git_repository_name=git_repository_name,
     )
 
-    create_owned_image_policy(
-        env_name=env_name,
-        image_tag_prefix=image_tag_prefix or app_template.default_image_tag_prefix,
-        app_template=app_template,
-        owner_uid=kustomization["metadata"]["uid"],
+    outcomes = map_concurrently(
+        lambda app: _create_app(env_inputs, *app), apps, max_workers=max_workers
+    )
+
+    for outcome in outcomes:
+        app_name = outcome.item[0].app_name
+
+        if outcome.error is not None:
+            logger.error(
+                "app.create_failed",
+                app_name=app_name,
+                env_name=env_name,
+                exc_info=outcome.error,
+            )
+            creation.failed[app_name] = str(outcome.error)
+            report_step(app_name, "failed", str(outcome.error))
+        elif outcome.result:
+            creation.created.append(app_name)
+        else:
+            creation.existing.append(app_name)
+
+    if not creation.succeeded and rollback and creation.created:
+        _rollback_apps(creation, max_workers=max_workers)
+
+    if (
+        not creation.succeeded
+        and env_git_repository
+        and widened_git_repository
+        and widened_git_repository["spec"].get("ignore")
+        != env_git_repository["spec"].get("ignore")
+    ):
+        # drop the paths of the apps that failed or were rolled back again,
+        # comparing against the widened rules rather than the ones read first
+        update_git_repository_include_paths(
+            widened_git_repository,
+            include_paths=lambda: _get_app_paths(
+                env_name, exclude_app_names=[*creation.rolled_back, *creation.failed]
+            ),
+        )
+
+    refresh_env_summary(env_name)
+
+    if creation.succeeded:
+        return creation
+
+    raise KollieAppsCreationError(
+        env_name=env_name, failed=creation.failed, rolled_back=creation.rolled_back
+    )
+
+
+def validate_apps(
+    env_name: str, image_tag_prefixes: Mapping[str, str | None]
+) -> list[tuple[AppTemplate, str]]:
+    """
+    Looks up the app template of every app and checks its image tag prefix,
+    so that callers can refuse a batch of apps before creating anything.
+
+    Args:
+        env_name (str): The name of the environment the apps are for.
+        image_tag_prefixes (Mapping[str, str | None]): Image tag prefix by
+            app name, None for the app template default.
+
+    Raises:
+        KollieConfigError: If an app has no app template.
+        KollieUnknownImageTagPrefixError: If an image tag prefix is unknown.
+
+    Returns:
+        list[tuple[AppTemplate, str]]: The app template and image tag prefix
+            of each app.
+    """
+    app_templates = get_app_template_store()
+    apps = []
+
+    for app_name, image_tag_prefix in image_tag_prefixes.items():
+        app_template = app_templates.get_by_name(app_name=app_name)
+
+        if not app_template:
+            raise KollieConfigError(message=f"App template not found for {app_name}")
+
+        image_tag_prefix = image_tag_prefix or app_template.default_image_tag_prefix
+        _validate_image_tag_prefix(app_template, image_tag_prefix, env_name)
+        apps.append((app_template, image_tag_prefix))
+
+    return apps
+
+
+def _create_app(
+    env_inputs: _EnvInputs,
+    app_template: AppTemplate,
+    image_tag_prefix: str,
+    image_tag: str | None = None,
+) -> bool:
+    """
+    Creates an app's kustomization and subscribes it to its image policy.
+    Returns False if the kustomization already existed.
+
+    A kustomization created here is deleted again if it can't be subscribed
+    to its image policy, so a failed app never leaves a kustomization behind
+    that rollback doesn't know about.
+    """
+    try:
+        kustomization = create_kustomization(
+            env_name=env_inputs.env_name,
+            image_tag_prefix=image_tag_prefix,
+            app_template=app_template,
+            owner_email=env_inputs.owner_email,
+            owner_uid=env_inputs.owner_uid,
+            lease_exclusion_window=env_inputs.lease_exclusion_window,
+            git_repository_name=env_inputs.git_repository_name,
+            image_tag=image_tag
+            or resolve_latest_image_tag(app_template, image_tag_prefix),
+        )
+        created = True
+    except KollieKustomizationExistsException:
+        existing = get_kustomizations(
+            env_name=env_inputs.env_name, app_name=app_template.app_name
+        )
+
+        if not existing:
+            raise KollieException(
+                f"Kustomization {env_inputs.env_name}-{app_template.app_name} "
+                "already exists but isn't labelled as "
+                f"{app_template.app_name} in {env_inputs.env_name}",
+                app_name=app_template.app_name,
+                env_name=env_inputs.env_name,
+            )
+
+        kustomization = existing[0]
+        # keep tracking whatever the existing kustomization tracks
+        image_tag_prefix = kustomization["metadata"]["annotations"].get(
+            "tails.com/tracking-image-tag-prefix", image_tag_prefix
+        )
+        created = False
+
+    try:
+        subscribe_to_image_policy(
+            env_name=env_inputs.env_name,
+            image_tag_prefix=image_tag_prefix,
+            app_template=app_template,
+            owner_uid=kustomization["metadata"]["uid"],
+        )
+    except Exception:
+        if created:
+            _delete_unsubscribed_app(env_inputs.env_name, app_template.app_name)
+        raise
+
+    report_step(app_template.app_name, "created" if created else "existing")
+
+    return created
+
+
+def _delete_unsubscribed_app(env_name: str, app_name: str) -> None:
+    try:
+        delete_kustomizations(env_name=env_name, app_name=app_name)
+    except Exception:
+        logger.exception("app.cleanup_failed", app_name=app_name, env_name=env_name)
+
+
+def _rollback_apps(creation: AppsCreation, max_workers: int) -> None:
+    """
+    Deletes the kustomizations of the apps created by a failed create_apps.
+    Their image policies are garbage collected with them.
+    """
+    outcomes = map_concurrently(
+        lambda app_name: delete_kustomizations(
+            env_name=creation.env_name, app_name=app_name
+        ),
+        creation.created,
+        max_workers=max_workers,
+    )
+
+    for outcome in outcomes:
+        if outcome.error is None:
+            creation.rolled_back.append(outcome.item)
+            report_step(outcome.item, "rolled_back")
+        else:
+            logger.error(
+                "app.rollback_failed",
+                app_name=outcome.item,
+                env_name=creation.env_name,
+                exc_info=outcome.error,
+            )
+
+    logger.info(
+        "apps.rolled_back", apps=creation.rolled_back, env_name=creation.env_name
     )
 
 
@@ -88,8 +407,9 @@ def delete_app(env_name: str, app_name: str):
     """
     Deletes an app by the kustomizations and its owned resources.
 
-    The App is deleted by deleting the Kustomization. The ImagePolicies are
-    deleted by the ownerReference.
+    The App is deleted by deleting the Kustomization. The Kustomization is
+    removed from the owners of its ImagePolicy, which is garbage collected
+    once no Kustomization subscribes to it.
 
     Args:
         env_name (str): The name of the environment.
@@ -97,6 +417,18 @@ def delete_app(env_name: str, app_name: str):
     """
     delete_kustomizations(env_name=env_name, app_name=app_name)
 
+    env_git_repository = (
+        get_git_repository(env_name) if GIT_REPOSITORY_NARROW_PATHS else None
+    )
+
+    if env_git_repository:
+        update_git_repository_include_paths(
+            env_git_repository,
+            include_paths=lambda: _get_app_paths(env_name, exclude_app_names=[app_name]),
+        )
+
+    refresh_env_summary(env_name)
+
 
 def update_app(env_name: str, app_name: str, attributes: dict[str, str]) -> None:
     """
@@ -123,38 +455,161 @@ def update_app(env_name: str, app_name: str, attributes: dict[str, str]) -> None
         if callable(setter):
             setter(value)
 
-    kustomization = patch_kustomization(patch_request)
+    app_template = None
 
     if "image_tag_prefix" in attributes:
+        app_template = _get_app_template(app_name)
+        _validate_image_tag_prefix(
+            app_template, attributes["image_tag_prefix"], env_name
+        )
+        patch_request.set_image_policy_key(
+            image_policy_key(
+                app_template.image_repository_ref, attributes["image_tag_prefix"]
+            )
+        )
+
+    kustomization = patch_kustomization(patch_request)
+
+    if app_template is not None:
         _refresh_image_policy(
             env_name=env_name,
-            app_name=app_name,
+            app_template=app_template,
+            previous_image_tag_prefix=app.image_tag_prefix,
             image_tag_prefix=attributes["image_tag_prefix"],
             owner_uid=kustomization["metadata"]["uid"],
         )
 
 
-def _refresh_image_policy(env_name: str, app_name: str, image_tag_prefix: str, owner_uid: str):
+def update_image_policy_subscribers(image_policy_key: str, image_tag: str) -> list[str]:
     """
-    Refreshes the image policy for an app in an environment.
+    Sets the image tag of every kustomization subscribed to a shared
+    ImagePolicy. Kustomizations already running the image tag are skipped.
 
     Args:
-        env_name (str): The name of the environment.
-        app_name (str): The name of the app.
-        image_tag_prefix (str): The value of the image tag prefix.
-        owner_uid (str): The UID of the owner.
+        image_policy_key (str): The key of the shared ImagePolicy.
+        image_tag (str): The latest image tag resolved by the ImagePolicy.
+
+    Returns:
+        list[str]: Names of the kustomizations that were patched.
     """
+    kustomizations = get_kustomizations(image_policy_key=image_policy_key)
+
+    updated = []
+
+    for kustomization in kustomizations:
+        substitute = kustomization["spec"].get("postBuild", {}).get("substitute", {})
+
+        if substitute.get("image_tag") == image_tag:
+            continue
+
+        labels = kustomization["metadata"]["labels"]
+        patch_request = PatchKustomizationRequest(
+            env_name=labels["tails-app-environment"],
+            app_name=labels["tails-app-name"],
+        ).set_image_tag(image_tag)
+
+        patch_kustomization(patch_request)
+        updated.append(patch_request.kustomization_name)
+
+    return updated
+
 
+def _restore_include_paths(env_name: str) -> None:
+    git_repository = get_git_repository(env_name)
+
+    if git_repository:
+        update_git_repository_include_paths(
+            git_repository, include_paths=lambda: _get_app_paths(env_name)
+        )
+
+
+def _get_app_paths(env_name: str, exclude_app_names: Collection[str] = ()) -> list[str]:
+    """
+    Returns the flux repository paths of the apps deployed in an environment,
+    leaving out the apps being deleted.
+    """
+    return [
+        kustomization["spec"]["path"]
+        for kustomization in get_kustomizations(env_name=env_name)
+        if kustomization["metadata"]["labels"].get("tails-app-name")
+        not in exclude_app_names
+    ]
+
+
+def _get_app_template(app_name: str) -> AppTemplate:
     app_template = get_app_template_store().get_by_name(app_name=app_name)
 
     if not app_template:
         raise KollieConfigError(message=f"App template not found for {app_name}")
 
-    delete_image_policies(env_name=env_name, app_name=app_name)
+    return app_template
+
+
+def _refresh_image_policy(
+    env_name: str,
+    app_template: AppTemplate,
+    previous_image_tag_prefix: str | None,
+    image_tag_prefix: str,
+    owner_uid: str,
+):
+    """
+    Moves the subscription of an app from the image policy of its previous
+    image tag prefix to the image policy of the new one. When the app was the
+    only subscriber of its image policy and no image policy tracks the new
+    prefix yet, the image policy is retargeted in place instead.
+
+    Args:
+        env_name (str): The name of the environment.
+        app_template (AppTemplate): The app template of the app.
+        previous_image_tag_prefix (str): The image tag prefix the app tracked.
+        image_tag_prefix (str): The value of the image tag prefix.
+        owner_uid (str): The UID of the owner.
+    """
+    # Apps created before image policies were shared own a dedicated policy
+    delete_image_policies(env_name=env_name, app_name=app_template.app_name)
 
-    create_owned_image_policy(
+    key = image_policy_key(app_template.image_repository_ref, image_tag_prefix)
+    previous_key = None
+
+    if previous_image_tag_prefix is not None:
+        previous_key = image_policy_key(
+            app_template.image_repository_ref, previous_image_tag_prefix
+        )
+
+    if previous_key == key:
+        previous_key = None
+
+    if previous_key is not None and retarget_image_policy(
+        previous_image_policy_key=previous_key,
+        image_tag_prefix=image_tag_prefix,
+        app_template=app_template,
+        owner_uid=owner_uid,
+    ):
+        return
+
+    subscribe_to_image_policy(
         env_name=env_name,
         image_tag_prefix=image_tag_prefix,
         app_template=app_template,
         owner_uid=owner_uid,
     )
+
+    if previous_key is not None:
+        unsubscribe_from_image_policy(
+            image_policy_key=previous_key, owner_uid=owner_uid
+        )
+
+
+def _validate_image_tag_prefix(
+    app_template: AppTemplate, image_tag_prefix: str, env_name: str
+) -> None:
+    """
+    Rejects image tag prefixes without any images before any objects are
+    created, when KOLLIE_VALIDATE_IMAGE_TAG_PREFIXES is enabled.
+    """
+    if not is_known_image_tag_prefix(app_template, image_tag_prefix):
+        raise KollieUnknownImageTagPrefixError(
+            image_tag_prefix=image_tag_prefix,
+            app_name=app_template.app_name,
+            env_name=env_name,
+        )
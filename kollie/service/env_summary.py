@@ -0,0 +1,148 @@
+import datetime
+import threading
+import time
+from collections import defaultdict
+
+import structlog
+from environs import Env
+
+from kollie.cluster.configmap import get_configmaps, update_env_configmap_data
+from kollie.cluster.kustomization import get_kustomizations
+from kollie.models import EnvironmentMetadata, EnvironmentSummary
+
+env = Env()
+
+# How often the daemon brings the summaries stored in the env configmaps up
+# to date with the readiness reported by Flux
+ENV_SUMMARY_REFRESH_SECONDS: int = env.int("KOLLIE_ENV_SUMMARY_REFRESH_SECONDS", 60)
+
+logger = structlog.get_logger(__name__)
+
+_refresh_thread: threading.Thread | None = None
+
+
+def refresh_env_summary(
+    env_name: str, kustomizations: list[dict] | None = None
+) -> EnvironmentSummary | None:
+    """
+    Stores the summary of an environment's apps in its configmap.
+
+    The summary is only a copy of what the kustomizations say, so failing to
+    store it is logged rather than raised: the daemon fixes it up on its
+    next pass.
+
+    Args:
+        env_name (str): The name of the environment.
+        kustomizations (list[dict]): The kustomizations of the environment,
+            listed if not given.
+
+    Returns:
+        EnvironmentSummary: The summary, None if it could not be stored.
+    """
+    try:
+        if kustomizations is None:
+            kustomizations = get_kustomizations(env_name=env_name)
+
+        summary = EnvironmentSummary.from_kustomizations(
+            kustomizations, updated_at=_now()
+        )
+
+        if update_env_configmap_data(env_name, summary.to_dict()) is None:
+            return None
+    except Exception:
+        logger.warning("env_summary.update_failed", env_name=env_name, exc_info=True)
+        return None
+
+    return summary
+
+
+def refresh_env_summaries() -> list[str]:
+    """
+    Brings the summary stored in every env configmap up to date, listing
+    the kustomizations of all environments at once. Configmaps whose summary
+    hasn't changed are not written to.
+
+    Returns:
+        list[str]: Names of the environments whose summary was updated.
+    """
+    kustomizations_by_env: dict[str, list[dict]] = defaultdict(list)
+
+    for kustomization in get_kustomizations():
+        env_name = kustomization["metadata"]["labels"].get("tails-app-environment")
+        if env_name:
+            kustomizations_by_env[env_name].append(kustomization)
+
+    updated_at = _now()
+    updated = []
+
+    for configmap in get_configmaps({"kollie.tails.com/managed-by": "kollie"}):
+        if not configmap.data or configmap.metadata is None:
+            continue
+
+        metadata = EnvironmentMetadata.from_configmap(configmap)
+        summary = EnvironmentSummary.from_kustomizations(
+            kustomizations_by_env.get(metadata.name, []), updated_at=updated_at
+        )
+
+        if not summary_changed(metadata.summary, summary):
+            continue
+
+        try:
+            update_env_configmap_data(metadata.name, summary.to_dict())
+        except Exception:
+            logger.warning(
+                "env_summary.update_failed", env_name=metadata.name, exc_info=True
+            )
+            continue
+
+        updated.append(metadata.name)
+
+    return updated
+
+
+def start_env_summary_refresher() -> None:
+    """
+    Start refreshing the env summaries every KOLLIE_ENV_SUMMARY_REFRESH_SECONDS
+    in a daemon thread, once per process.
+    """
+    global _refresh_thread
+
+    if _refresh_thread is None:
+        _refresh_thread = threading.Thread(target=_refresh_periodically, daemon=True)
+        _refresh_thread.start()
+
+
+def _refresh_periodically() -> None:
+    while True:
+        try:
+            updated = refresh_env_summaries()
+            logger.debug("env_summary.refreshed", updated=updated)
+        except Exception:
+            logger.exception("env_summary.refresh_failed")
+
+        time.sleep(ENV_SUMMARY_REFRESH_SECONDS)
+
+
+def summary_changed(
+    stored: EnvironmentSummary | None, current: EnvironmentSummary
+) -> bool:
+    """
+    Whether a stored summary is out of date, ignoring when it was made.
+
+    Args:
+        stored (EnvironmentSummary): The summary in the env configmap, None
+            if the env hasn't been summarised.
+        current (EnvironmentSummary): The summary of the env as it is now.
+    """
+    if stored is None:
+        return True
+
+    return (stored.apps, stored.not_ready_apps, stored.lease_window) != (
+        current.apps,
+        current.not_ready_apps,
+        current.lease_window,
+    )
+
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc)
@@ -1,4 +1,7 @@
-from typing import List, Optional
+import datetime
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
 
 import structlog
 
@@ -9,40 +12,101 @@ from kollie.cluster.configmap import (
     delete_configmap,
     get_configmap,
     get_configmaps,
+    iter_configmap_pages,
+    owner_label_value,
+    set_configmap_labels,
+    update_env_configmap_data,
 )
+from kollie.cluster.constants import OWNER_HASH_LABEL
 from kollie.cluster.git_repository import (
     create_git_repository,
     get_git_repository,
 )
 from kollie.cluster.kustomization import (
     get_kustomizations,
+    patch_kustomization,
+)
+from kollie.cluster.kustomization_request import (
+    PatchKustomizationRequest,
+    calculate_uptime_window_string,
+)
+from kollie.concurrency import map_concurrently
+from kollie.jobs import report_step
+from kollie.exceptions import KollieConfigError, KollieException
+from kollie.models import (
+    AppSnapshot,
+    EnvironmentMetadata,
+    EnvironmentSnapshot,
+    EnvironmentSummary,
+    KollieEnvironment,
 )
-from kollie.cluster.kustomization_request import calculate_uptime_window_string
-from kollie.exceptions import KollieConfigError
-from kollie.models import EnvironmentMetadata, KollieEnvironment
 from kollie.persistence import get_app_template_store
 from kollie.persistence.app_bundle import AppBundle, get_app_bundle_store
-from kollie.service.applications import create_app, update_app
+from kollie.persistence.app_template_search import DEFAULT_PAGE_SIZE, AppTemplatePage
+from kollie.service.applications import AppsCreation, create_apps, validate_apps
+from kollie.service.env_summary import refresh_env_summary, summary_changed
 
 env = Env()
 
 EXTENDED_LEASE_TEST_ENV_NAMES: list[str] = env.list("KOLLIE_EXTENDED_LEASE_TEST_ENV_NAMES", [])
 ENV_NAME_LABEL = "tails-app-environment"
 
+# Maximum number of apps of a bundle that are created at once
+BUNDLE_INSTALL_CONCURRENCY: int = env.int("KOLLIE_BUNDLE_INSTALL_CONCURRENCY", 8)
+# Whether the apps of a bundle are removed again when some of them fail.
+# Without rollback, installing the bundle again resumes from the failed apps.
+BUNDLE_INSTALL_ROLLBACK: bool = env.bool("KOLLIE_BUNDLE_INSTALL_ROLLBACK", True)
+# Maximum number of kustomizations patched at once when extending a lease
+LEASE_EXTENSION_CONCURRENCY: int = env.int("KOLLIE_LEASE_EXTENSION_CONCURRENCY", 10)
+# Maximum number of envs rebuilt at once by rebuild_configs
+REBUILD_CONFIGS_CONCURRENCY: int = env.int("KOLLIE_REBUILD_CONFIGS_CONCURRENCY", 16)
+REBUILD_CONFIGS_PAGE_SIZE = 250
+# Maximum number of envs deleted or extended at once by bulk operations
+BULK_OPERATION_CONCURRENCY: int = env.int("KOLLIE_BULK_OPERATION_CONCURRENCY", 8)
+# Whether listing an owner's envs also lists the envs without an owner hash
+# label, i.e. created before the label existed and not backfilled yet. Can be
+# disabled once backfill_owner_labels logs that no env is left to label, the
+# setting goes away with the fallback afterwards.
+OWNER_LABEL_FALLBACK: bool = env.bool("KOLLIE_OWNER_LABEL_FALLBACK", True)
+
 
 logger = structlog.get_logger(__name__)
 
 
 def list_envs(owner_email: str | None = None) -> List[EnvironmentMetadata]:
     """
-    Get a list of environment names stored in configmaps.
+    Get a list of environments stored in configmaps, with the summary of
+    their apps stored alongside, so listing environments takes a single
+    request whatever the number of environments.
+
+    Envs are filtered by owner through the owner hash label, so only the
+    owner's configmaps are listed. Envs created before the label existed are
+    labelled by backfill_owner_labels; until then they are listed as well
+    and matched on their owner annotation, unless KOLLIE_OWNER_LABEL_FALLBACK
+    is disabled.
+
+    Args:
+        owner_email (str): Only list the envs of this owner.
 
     Returns:
-        List[str]: A list of environment names.
+        List[EnvironmentMetadata]: The environments sorted by name.
     """
-    label_filters = {"kollie.tails.com/managed-by": "kollie"}
+    label_filters: dict[str, str | None] = {"kollie.tails.com/managed-by": "kollie"}
+
+    if owner_email is None:
+        env_configmaps = get_configmaps(label_filters=label_filters)
+    else:
+        env_configmaps = get_configmaps(
+            label_filters={
+                **label_filters,
+                OWNER_HASH_LABEL: owner_label_value(owner_email),
+            }
+        )
 
-    env_configmaps = get_configmaps(label_filters=label_filters)
+        if OWNER_LABEL_FALLBACK:
+            env_configmaps += get_configmaps(
+                label_filters={**label_filters, OWNER_HASH_LABEL: None}
+            )
 
     envs = []
 
@@ -51,18 +115,13 @@ def list_envs(owner_email: str | None = None) -> List[EnvironmentMetadata]:
         if not env_configmap.data or env_configmap.metadata is None:
             continue
 
-        # This is an inefficient way to filter by owner. It is done this way
-        # because it's not possible to filter by annotation in Kubernetes
-        # We are using annotations for the owner email because labels don't
-        # support the @ symbol
-        if (
-            owner_email is not None
-            and env_configmap.metadata.annotations["tails.com/owner"] != owner_email
-        ):
-            continue
-
         metadata = EnvironmentMetadata.from_configmap(env_configmap)
 
+        # matches the envs that haven't been labelled yet and guards against
+        # the (unlikely) collision of two owners' hashes
+        if owner_email is not None and metadata.owner_email != owner_email:
+            continue
+
         envs.append(metadata)
 
     envs = sorted(envs, key=lambda env: env.name)
@@ -70,6 +129,130 @@ def list_envs(owner_email: str | None = None) -> List[EnvironmentMetadata]:
     return envs
 
 
+def backfill_owner_labels() -> list[str]:
+    """
+    Adds the owner hash label to the env configmaps created before it was
+    introduced, so that list_envs can find them by owner. Envs that can't be
+    labelled are logged and skipped, to be retried on the next run.
+
+    Returns:
+        list[str]: Names of the environments that were labelled.
+    """
+    labelled = []
+    failed = []
+    unlabelled = get_configmaps(
+        {"kollie.tails.com/managed-by": "kollie", OWNER_HASH_LABEL: None}
+    )
+
+    for env_configmap in unlabelled:
+        metadata = env_configmap.metadata
+        owner_email = (metadata.annotations or {}).get("tails.com/owner")
+
+        if not owner_email or OWNER_HASH_LABEL in (metadata.labels or {}):
+            continue
+
+        try:
+            set_configmap_labels(
+                metadata.name, {OWNER_HASH_LABEL: owner_label_value(owner_email)}
+            )
+        except Exception:
+            logger.exception("envs.owner_label_backfill_failed", env_name=metadata.name)
+            failed.append(metadata.name)
+            continue
+
+        labelled.append(metadata.name)
+
+    # once nothing is left, KOLLIE_OWNER_LABEL_FALLBACK can be disabled
+    logger.info("envs.owner_labels_backfilled", envs=labelled, remaining=len(failed))
+
+    return labelled
+
+
+@dataclass
+class EnvSelector:
+    """
+    Selects envs for bulk operations. Envs must match every criterion given.
+    Empty names, owner emails and name prefixes count as not given, since
+    they would otherwise select every env.
+    """
+
+    names: list[str] | None = None
+    owner_email: str | None = None
+    name_prefix: str | None = None
+    created_before: datetime.datetime | None = None
+    lease_expired: bool | None = None
+
+    def __post_init__(self) -> None:
+        self.names = self.names or None
+        self.owner_email = self.owner_email or None
+        self.name_prefix = self.name_prefix or None
+
+    @property
+    def empty(self) -> bool:
+        return all(
+            value is None
+            for value in (
+                self.names,
+                self.owner_email,
+                self.name_prefix,
+                self.created_before,
+                self.lease_expired,
+            )
+        )
+
+    def matches(self, metadata: EnvironmentMetadata) -> bool:
+        if self.names is not None and metadata.name not in self.names:
+            return False
+
+        if self.owner_email is not None and metadata.owner_email != self.owner_email:
+            return False
+
+        if self.name_prefix is not None and not metadata.name.startswith(
+            self.name_prefix
+        ):
+            return False
+
+        if self.created_before is not None and _as_utc(metadata.created_at) >= _as_utc(
+            self.created_before
+        ):
+            return False
+
+        if self.lease_expired is not None:
+            lease_info = metadata.summary.lease_info if metadata.summary else None
+            expired = lease_info is not None and lease_info.is_expired
+
+            if expired != self.lease_expired:
+                return False
+
+        return True
+
+
+def select_envs(selector: EnvSelector) -> List[str]:
+    """
+    Returns the names of the envs matching a selector. The lease of an env is
+    read from the summary in its configmap, so envs that haven't been
+    summarised yet never count as expired.
+
+    Args:
+        selector (EnvSelector): The envs to select.
+
+    Raises:
+        ValueError: If the selector is empty, so that a bulk operation can't
+            run against every env by mistake.
+
+    Returns:
+        List[str]: The names of the matching envs, sorted.
+    """
+    if selector.empty:
+        raise ValueError("At least one env selection criterion is required.")
+
+    return [
+        metadata.name
+        for metadata in list_envs(owner_email=selector.owner_email)
+        if selector.matches(metadata)
+    ]
+
+
 def get_env(env_name: str) -> Optional[KollieEnvironment]:
     """
     Returns a KollieEnvironment for a given environment name.
@@ -82,6 +265,9 @@ def get_env(env_name: str) -> Optional[KollieEnvironment]:
     """
     env_config = get_configmap(name=env_name)
 
+    if env_config is None:
+        return None
+
     owner_email = env_config.metadata.annotations.get("tails.com/owner")
 
     git_repository = get_git_repository(env_name)
@@ -101,30 +287,34 @@ def get_env(env_name: str) -> Optional[KollieEnvironment]:
     return env
 
 
-def get_available_apps(env: KollieEnvironment) -> List[str]:
+def search_available_apps(
+    env: KollieEnvironment,
+    query: str = "",
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> AppTemplatePage:
     """
-    Returns a list of apps that can be added to an environment.
+    Searches the apps that can be added to an environment.
 
     Args:
         env (KollieEnvironment): The environment object.
+        query (str): Text to look for in the app name or label.
+        offset (int): Number of matches to skip.
+        limit (int): Maximum number of apps to return.
 
     Returns:
-        List[str]: A list of app names.
+        AppTemplatePage: A page of matching app templates.
     """
-    app_templates = get_app_template_store()
-    all_templates = app_templates.get_all()
-
-    available_apps = [
-        template.app_name
-        for template in all_templates
-        if template.app_name not in env.app_names
-    ]
-
-    return available_apps
+    return get_app_template_store().search(
+        query, offset=offset, limit=limit, exclude=set(env.app_names)
+    )
 
 
 def create_env(
-    env_name: str, owner_email: str, flux_repo_branch: str | None = None
+    env_name: str,
+    owner_email: str,
+    flux_repo_branch: str | None = None,
+    lease_exclusion_window: str | None = None,
 ) -> None:
     """
     Creates a new environment by creating a kustomization for each app.
@@ -133,16 +323,18 @@ def create_env(
         env_name (str): The name of the environment.
         owner_email (str): The email of the owner of the environment.
         flux_repo_branch (str): Optional k8s-apps branch to use for environment.
+        lease_exclusion_window (str): Optional downscaler default uptime,
+            otherwise set for the envs in KOLLIE_LEASE_EXCLUSION_LIST.
     """
     lease_exclusion_list: list[str] = env.list("KOLLIE_LEASE_EXCLUSION_LIST", [])
-    lease_exclusion_window = None
-    if lease_exclusion_list and env_name in lease_exclusion_list:
+    if lease_exclusion_window is None and env_name in lease_exclusion_list:
         lease_exclusion_window = "Mon-Fri 07:00-19:00 Europe/London"
     env_config = create_env_configmap(
         env_name=env_name,
         owner_email=owner_email,
         lease_exclusion_window=lease_exclusion_window,
     )
+    report_step("configmap", "created")
 
     if flux_repo_branch:
         owner_uid = env_config.metadata.uid
@@ -152,31 +344,67 @@ def create_env(
             owner_email=owner_email,
             owner_uid=owner_uid
         )
+        report_step("git_repository", "created")
 
 
-def extend_lease(env_name: str, hour: int, days: int = 0):
+def extend_lease(env_name: str, hour: int, days: int = 0) -> dict[str, str | None]:
     """
     Extends the uptime of an environment by setting the downscaler/uptime
     annotation for each kustomization in the environment.
 
+    The kustomizations are listed once and patched concurrently, at most
+    KOLLIE_LEASE_EXTENSION_CONCURRENCY at once.
+
     Args:
         env_name (str): The name of the environment to extend the lease for.
         hour (int): The hour the lease should expire at. Valid values are between 0 and 23.
         days (int): The number of days the lease should be extended. Defaults to 0.
+
+    Raises:
+        ValueError: If the environment doesn't exist.
+
+    Returns:
+        dict[str, str | None]: The error by app name, None for the apps whose
+            lease was extended.
     """
-    env = get_env(env_name)
+    uptime_window = calculate_uptime_window_string(hour=hour, days=days)
+
+    kustomizations = get_kustomizations(env_name=env_name)
 
-    if not env:
+    if not kustomizations and not get_configmap(name=env_name):
         raise ValueError(f"Environment {env_name} not found.")
 
-    for app in env.apps:
-        update_app(
-            app_name=app.name,
-            env_name=env_name,
-            attributes={"uptime_window": calculate_uptime_window_string(hour=hour, days=days)},
-        )
+    kustomizations_by_app = {
+        kustomization["metadata"]["labels"]["tails-app-name"]: kustomization
+        for kustomization in kustomizations
+    }
+
+    outcomes = map_concurrently(
+        lambda app_name: patch_kustomization(
+            PatchKustomizationRequest(env_name, app_name).set_uptime_window(uptime_window)
+        ),
+        list(kustomizations_by_app),
+        max_workers=LEASE_EXTENSION_CONCURRENCY,
+    )
 
-    # store the uptime_window_string in the configmap for quick reference
+    results: dict[str, str | None] = {}
+
+    for outcome in outcomes:
+        results[outcome.item] = None if outcome.error is None else str(outcome.error)
+
+        if outcome.error is None:
+            kustomizations_by_app[outcome.item] = outcome.result
+        else:
+            logger.error(
+                "app.lease_extension_failed",
+                app_name=outcome.item,
+                env_name=env_name,
+                exc_info=outcome.error,
+            )
+
+    refresh_env_summary(env_name, list(kustomizations_by_app.values()))
+
+    return results
 
 
 def delete_env(env_name: str):
@@ -192,19 +420,277 @@ def delete_env(env_name: str):
     delete_configmap(name=env_name)
 
 
+def delete_envs(
+    env_names: List[str], max_workers: int = BULK_OPERATION_CONCURRENCY
+) -> dict[str, str | None]:
+    """
+    Deletes several environments concurrently.
+
+    Args:
+        env_names (List[str]): The names of the environments.
+        max_workers (int): Maximum number of environments deleted at once.
+
+    Returns:
+        dict[str, str | None]: The error by env name, None for the envs that
+            were deleted.
+    """
+    return _run_for_envs("env.delete_failed", delete_env, env_names, max_workers)
+
+
+def extend_leases(
+    env_names: List[str],
+    hour: int,
+    days: int = 0,
+    max_workers: int = BULK_OPERATION_CONCURRENCY,
+) -> dict[str, str | None]:
+    """
+    Extends the lease of several environments concurrently, see extend_lease.
+
+    Args:
+        env_names (List[str]): The names of the environments.
+        hour (int): The hour the leases should expire at.
+        days (int): The number of days the leases should be extended.
+        max_workers (int): Maximum number of environments extended at once.
+
+    Returns:
+        dict[str, str | None]: The error by env name, None for the envs whose
+            lease was extended.
+    """
+
+    def extend(env_name: str) -> None:
+        failed = [
+            app_name
+            for app_name, error in extend_lease(env_name, hour, days).items()
+            if error
+        ]
+
+        if failed:
+            raise KollieException(
+                f"Failed to extend the lease of {', '.join(failed)}",
+                app_name=None,
+                env_name=env_name,
+            )
+
+    return _run_for_envs("env.lease_extension_failed", extend, env_names, max_workers)
+
+
+def _run_for_envs(
+    failure_event: str,
+    func: Callable[[str], object],
+    env_names: List[str],
+    max_workers: int,
+) -> dict[str, str | None]:
+    results: dict[str, str | None] = {}
+
+    def run(env_name: str) -> None:
+        func(env_name)
+        report_step(env_name, "done")
+
+    for outcome in map_concurrently(run, env_names, max_workers=max_workers):
+        results[outcome.item] = None if outcome.error is None else str(outcome.error)
+
+        if outcome.error is not None:
+            logger.error(failure_event, env_name=outcome.item, exc_info=outcome.error)
+            report_step(outcome.item, "failed", str(outcome.error))
+
+    return results
+
+
+def _as_utc(value: datetime.datetime) -> datetime.datetime:
+    # configmaps store naive timestamps, in the UTC of Kollie's pods
+    if value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+
+    return value
+
+
+def clone_env(
+    source_env_name: str, target_env_name: str, owner_email: str
+) -> AppsCreation:
+    """
+    Creates a new environment running the same apps as an existing one.
+
+    The apps keep tracking the same image tag prefixes and start on the
+    image tags running in the source env, so the clone deploys straight away
+    instead of waiting for its image policies. The env uses the same flux
+    repository branch. All the apps are created in one batch, at most
+    KOLLIE_BUNDLE_INSTALL_CONCURRENCY at once, like a bundle.
+
+    Args:
+        source_env_name (str): The name of the environment to copy.
+        target_env_name (str): The name of the new environment.
+        owner_email (str): The email of the owner of the new environment.
+
+    Raises:
+        KollieConfigError: If the source env doesn't exist, the target env
+            already exists or an app no longer has an app template. Nothing
+            is created then.
+        KollieUnknownImageTagPrefixError: If an image tag prefix is unknown.
+        KollieAppsCreationError: If some apps could not be created. The new
+            env is kept, with the apps that were created unless
+            KOLLIE_BUNDLE_INSTALL_ROLLBACK removed them.
+
+    Returns:
+        AppsCreation: The apps created in the new env.
+    """
+    source = get_env(source_env_name)
+
+    if not source:
+        raise KollieConfigError(message=f"Environment not found for {source_env_name}")
+
+    return _recreate_env(
+        env_name=target_env_name,
+        owner_email=owner_email,
+        flux_repo_branch=source.flux_repository_branch,
+        lease_exclusion_window=None,
+        apps=[
+            AppSnapshot(
+                name=app.name,
+                image_tag_prefix=app.image_tag_prefix,
+                image_tag=app.image_tag,
+            )
+            for app in source.apps
+        ],
+    )
+
+
+def export_env(env_name: str) -> EnvironmentSnapshot:
+    """
+    Takes a snapshot of an environment, from which import_env can recreate
+    it later.
+
+    Args:
+        env_name (str): The name of the environment.
+
+    Raises:
+        KollieConfigError: If the environment doesn't exist.
+
+    Returns:
+        EnvironmentSnapshot: The snapshot of the environment.
+    """
+    env_config = get_configmap(name=env_name)
+
+    if env_config is None:
+        raise KollieConfigError(message=f"Environment not found for {env_name}")
+
+    metadata = EnvironmentMetadata.from_configmap(env_config)
+
+    git_repository = get_git_repository(env_name)
+    environment = KollieEnvironment.from_kustomizations(
+        env_name=env_name,
+        kustomizations=get_kustomizations(env_name=env_name),
+        owner_email=metadata.owner_email,
+        flux_repository_branch=(
+            git_repository["spec"]["ref"]["branch"] if git_repository else None
+        ),
+    )
+
+    return EnvironmentSnapshot(
+        name=env_name,
+        owner_email=metadata.owner_email,
+        flux_repository_branch=environment.flux_repository_branch,
+        lease_exclusion_window=metadata.lease_exclusion_window,
+        apps=[
+            AppSnapshot(
+                name=app.name,
+                image_tag_prefix=app.image_tag_prefix,
+                image_tag=app.image_tag,
+            )
+            for app in sorted(environment.apps, key=lambda app: app.name)
+        ],
+    )
+
+
+def import_env(
+    snapshot: EnvironmentSnapshot, owner_email: str, env_name: str | None = None
+) -> AppsCreation:
+    """
+    Recreates an environment from a snapshot taken by export_env, with all
+    of its apps created in one batch like a bundle.
+
+    Args:
+        snapshot (EnvironmentSnapshot): The snapshot of the environment.
+        owner_email (str): The email of the owner of the new environment.
+        env_name (str): The name of the new environment, the snapshot's
+            by default.
+
+    Raises:
+        KollieConfigError: If the environment already exists or an app has no
+            app template. Nothing is created then.
+        KollieUnknownImageTagPrefixError: If an image tag prefix is unknown.
+        KollieAppsCreationError: If some apps could not be created.
+
+    Returns:
+        AppsCreation: The apps created in the new env.
+    """
+    return _recreate_env(
+        env_name=env_name or snapshot.name,
+        owner_email=owner_email,
+        flux_repo_branch=snapshot.flux_repository_branch,
+        lease_exclusion_window=snapshot.lease_exclusion_window,
+        apps=snapshot.apps,
+    )
+
+
+def _recreate_env(
+    env_name: str,
+    owner_email: str,
+    flux_repo_branch: str | None,
+    lease_exclusion_window: str | None,
+    apps: list[AppSnapshot],
+) -> AppsCreation:
+    if get_configmap(name=env_name):
+        raise KollieConfigError(message=f"Environment {env_name} already exists")
+
+    image_tag_prefixes = {app.name: app.image_tag_prefix for app in apps}
+    # refuse apps that can't be created before the env exists, so that a
+    # failed attempt doesn't leave an empty env behind
+    validate_apps(env_name, image_tag_prefixes)
+
+    create_env(
+        env_name=env_name,
+        owner_email=owner_email,
+        flux_repo_branch=flux_repo_branch,
+        lease_exclusion_window=lease_exclusion_window,
+    )
+
+    return create_apps(
+        env_name=env_name,
+        owner_email=owner_email,
+        image_tag_prefixes=image_tag_prefixes,
+        image_tags={app.name: app.image_tag for app in apps},
+        max_workers=BUNDLE_INSTALL_CONCURRENCY,
+        rollback=BUNDLE_INSTALL_ROLLBACK,
+    )
+
+
 def get_available_app_bundles(env_name: str) -> list[AppBundle]:
     # TODO: Do we need to filter out bundles already deployed? How?
     return get_app_bundle_store().get_all_bundles()
 
 
-def install_bundle(env_name: str, bundle_name: str, owner_email: str):
+def install_bundle(env_name: str, bundle_name: str, owner_email: str) -> AppsCreation:
     """
     Deploys a bundle of apps to an environment, using the default branch
-    for each app defined in app template.
+    for each app defined in app template. Apps are created concurrently, at
+    most KOLLIE_BUNDLE_INSTALL_CONCURRENCY at once.
+
+    Installing a bundle is all or nothing: if any app fails the apps created
+    by the installation are removed again (see KOLLIE_BUNDLE_INSTALL_ROLLBACK).
+    Apps already in the environment are left alone, so a failed installation
+    can be retried.
 
     Args:
         env_name (str): The name of the environment.
         bundle_name (str): The name of the bundle.
+
+    Raises:
+        KollieConfigError: If the bundle, the environment or an app template
+            doesn't exist.
+        KollieAppsCreationError: If some apps could not be created.
+
+    Returns:
+        AppsCreation: The apps created by the installation.
     """
     bundle = get_app_bundle_store().get_bundle(name=bundle_name)
     template_store = get_app_template_store()
@@ -219,28 +705,133 @@ def install_bundle(env_name: str, bundle_name: str, owner_email: str):
 
     # Check there are templates for all the apps in the bundle _before_ we create
     # any apps. This way we don't end up with dangling apps in the cluster.
+    image_tag_prefixes: dict[str, str | None] = {}
+
     for bundle_app in bundle.apps:
-        if not template_store.get_by_name(bundle_app):
+        template = template_store.get_by_name(bundle_app)
+
+        if not template:
             raise KollieConfigError(message=f"App template not found for {bundle_app}")
 
-    for bundle_app in bundle.apps:
-        if bundle_app not in environment.app_names:
-            template = template_store.get_by_name(bundle_app)
-
-            # We already checked for this above but mypy doesn't know that.
-            # Leaving this check here rather than silencing mypy.
-            if not template:
-                raise KollieConfigError(
-                    message=f"App template not found for {bundle_app}"
+        if bundle_app in environment.app_names:
+            logger.debug("app.already_deployed", app_name=bundle_app, env_name=env_name)
+        else:
+            image_tag_prefixes[bundle_app] = template.default_image_tag_prefix
+
+    creation = create_apps(
+        env_name=env_name,
+        owner_email=owner_email,
+        image_tag_prefixes=image_tag_prefixes,
+        max_workers=BUNDLE_INSTALL_CONCURRENCY,
+        rollback=BUNDLE_INSTALL_ROLLBACK,
+    )
+
+    for bundle_app in image_tag_prefixes:
+        logger.debug("app.deployed", app_name=bundle_app, env_name=env_name)
+
+    return creation
+
+
+@dataclass
+class ConfigsRebuild:
+    """Progress of rebuild_configs."""
+
+    scanned: int = 0
+    updated: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+    elapsed_seconds: float = 0.0
+
+    @property
+    def envs_per_second(self) -> float:
+        if not self.elapsed_seconds:
+            return 0.0
+
+        return self.scanned / self.elapsed_seconds
+
+
+def rebuild_configs(
+    max_workers: int = REBUILD_CONFIGS_CONCURRENCY,
+    page_size: int = REBUILD_CONFIGS_PAGE_SIZE,
+) -> ConfigsRebuild:
+    """
+    Recomputes what is stored in every env configmap from the cluster: the
+    summary of the env's apps (see kollie.service.env_summary) and the
+    owner hash label. Used to migrate existing envs when what Kollie stores
+    changes.
+
+    The configmaps are listed a page at a time and the envs of a page are
+    rebuilt concurrently, at most `max_workers` at once. Only configmaps that
+    are out of date are patched. Progress is logged after every page.
+
+    Args:
+        max_workers (int): Maximum number of envs rebuilt at once.
+        page_size (int): Number of configmaps listed at once.
+
+    Returns:
+        ConfigsRebuild: What was updated and the envs that failed.
+    """
+    rebuild = ConfigsRebuild()
+    started = time.monotonic()
+
+    for configmaps in iter_configmap_pages(
+        {"kollie.tails.com/managed-by": "kollie"}, page_size=page_size
+    ):
+        outcomes = map_concurrently(
+            _rebuild_config,
+            [
+                configmap
+                for configmap in configmaps
+                if configmap.data and configmap.metadata is not None
+            ],
+            max_workers=max_workers,
+        )
+
+        for outcome in outcomes:
+            env_name = outcome.item.metadata.name
+            rebuild.scanned += 1
+
+            if outcome.error is not None:
+                logger.error(
+                    "envs.rebuild_config_failed", env_name=env_name, exc_info=outcome.error
                 )
+                rebuild.failed[env_name] = str(outcome.error)
+            elif outcome.result:
+                rebuild.updated.append(env_name)
+
+        rebuild.elapsed_seconds = time.monotonic() - started
+
+        logger.info(
+            "envs.rebuild_configs_progress",
+            scanned=rebuild.scanned,
+            updated=len(rebuild.updated),
+            failed=len(rebuild.failed),
+            envs_per_second=round(rebuild.envs_per_second, 1),
+        )
 
-            create_app(
-                app_name=template.app_name,
-                env_name=env_name,
-                owner_email=owner_email,
-                image_tag_prefix=template.default_image_tag_prefix,
-            )
-            logger.debug("app.deployed", app_name=bundle_app, env_name=env_name)
+    return rebuild
 
-        else:
-            logger.debug("app.already_deployed", app_name=bundle_app, env_name=env_name)
+
+def _rebuild_config(configmap) -> bool:
+    """
+    Brings an env configmap up to date. Returns False if it already was.
+    """
+    env_name = configmap.metadata.name
+    updated = False
+
+    summary = EnvironmentSummary.from_kustomizations(
+        get_kustomizations(env_name=env_name),
+        updated_at=datetime.datetime.now(datetime.timezone.utc),
+    )
+
+    owner_email = (configmap.metadata.annotations or {}).get("tails.com/owner")
+    labels = configmap.metadata.labels or {}
+
+    if owner_email and labels.get(OWNER_HASH_LABEL) != owner_label_value(owner_email):
+        set_configmap_labels(env_name, {OWNER_HASH_LABEL: owner_label_value(owner_email)})
+        updated = True
+
+    if summary_changed(EnvironmentMetadata.from_configmap(configmap).summary, summary):
+        update_env_configmap_data(env_name, summary.to_dict())
+        updated = True
+
+    return updated
@@ -0,0 +1,233 @@
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+import structlog
+from environs import Env
+
+from kollie.cluster.image_policy import get_image_policies
+from kollie.cluster.image_policy_spec import sanitise_image_tag_prefix
+from kollie.cluster.image_repository import get_image_repository, get_latest_tags
+from kollie.cluster.interfaces import AppTemplate, ClusterObjectReference
+from kollie.exceptions import KollieConfigError
+from kollie.persistence import ImageRepositoryRef, get_app_template_store
+from kollie.prefix_trie import PrefixTrie
+
+env = Env()
+
+IMAGE_TAG_INDEX_REFRESH_SECONDS: int = env.int(
+    "KOLLIE_IMAGE_TAG_INDEX_REFRESH_SECONDS", 300
+)
+VALIDATE_IMAGE_TAG_PREFIXES: bool = env.bool(
+    "KOLLIE_VALIDATE_IMAGE_TAG_PREFIXES", False
+)
+
+# Tags are built as `<prefix>-<commit sha>-<timestamp>`
+IMAGE_TAG_PATTERN = re.compile(r"^(?P<prefix>.+)-[a-fA-F0-9]+-(?P<ts>[0-9]+)$")
+
+logger = structlog.get_logger(__name__)
+
+RepositoryKey = tuple[str, str]
+
+
+@dataclass
+class ImageTagIndex:
+    """
+    Image tag prefixes known for each ImageRepository, indexed by
+    (namespace, name) of the ImageRepository.
+    """
+
+    prefixes: dict[RepositoryKey, PrefixTrie] = field(default_factory=dict)
+
+    def get(self, image_repository_ref: ClusterObjectReference) -> PrefixTrie:
+        return self.prefixes.get(_repository_key(image_repository_ref), PrefixTrie())
+
+    def add(self, image_repository_ref: ClusterObjectReference, tag: str) -> None:
+        match = IMAGE_TAG_PATTERN.match(tag)
+
+        if not match:
+            return
+
+        key = _repository_key(image_repository_ref)
+        self.prefixes.setdefault(key, PrefixTrie()).insert(match.group("prefix"))
+
+
+_index: ImageTagIndex | None = None
+_index_lock = threading.Lock()
+_refresh_thread: threading.Thread | None = None
+
+
+def build_image_tag_index(
+    image_repository_refs: list[ClusterObjectReference],
+) -> ImageTagIndex:
+    """
+    Builds an index of the image tag prefixes in use for the given
+    ImageRepositories.
+
+    Prefixes are extracted from the tags reported by the last scan of each
+    ImageRepository and from the latest tag selected by every ImagePolicy, so
+    branches that are tracked by an env are known even once they fall out of
+    the ImageRepository's (short) list of latest tags.
+
+    Args:
+        image_repository_refs (list[ClusterObjectReference]): The
+            ImageRepositories to index.
+
+    Returns:
+        ImageTagIndex: The index.
+    """
+    index = ImageTagIndex()
+
+    for image_repository_ref in image_repository_refs:
+        image_repository = get_image_repository(image_repository_ref)
+
+        if not image_repository:
+            continue
+
+        for tag in get_latest_tags(image_repository):
+            index.add(image_repository_ref, tag)
+
+    for image_policy in get_image_policies():
+        ref = image_policy.get("spec", {}).get("imageRepositoryRef", {})
+        tag = image_policy.get("status", {}).get("latestRef", {}).get("tag")
+
+        if tag and ref.get("name"):
+            index.add(
+                ImageRepositoryRef(
+                    name=ref["name"],
+                    # imageRepositoryRef defaults to the ImagePolicy's namespace
+                    namespace=ref.get("namespace", image_policy["metadata"]["namespace"]),
+                ),
+                tag,
+            )
+
+    return index
+
+
+def get_image_tag_index() -> ImageTagIndex:
+    """
+    Returns the cached image tag index without waiting on the cluster. The
+    index is empty until its first build, which happens at startup (see
+    load_image_tag_index) or else in the background refresh thread started
+    by the first call.
+    """
+    if _index is None:
+        _start_refresh_thread()
+        return ImageTagIndex()
+
+    return _index
+
+
+def load_image_tag_index() -> None:
+    """
+    Builds the image tag index and starts the background thread that
+    rebuilds it every KOLLIE_IMAGE_TAG_INDEX_REFRESH_SECONDS. Meant to be run
+    at startup, off the event loop.
+    """
+    try:
+        refresh_image_tag_index()
+    finally:
+        _start_refresh_thread()
+
+
+def refresh_image_tag_index() -> None:
+    """Rebuilds the cached image tag index."""
+    global _index
+
+    index = _build_index_for_app_templates()
+
+    with _index_lock:
+        _index = index
+
+
+def suggest_image_tag_prefixes(
+    app_name: str, query: str = "", limit: int = 20
+) -> list[str]:
+    """
+    Returns known image tag prefixes for an app starting with `query`.
+
+    Args:
+        app_name (str): The name of the app template.
+        query (str): The beginning of the prefix, e.g. a partial branch name.
+        limit (int): Maximum number of prefixes to return.
+
+    Returns:
+        list[str]: Matching prefixes in alphabetical order.
+    """
+    app_template = get_app_template_store().get_by_name(app_name=app_name)
+
+    if not app_template:
+        raise KollieConfigError(message=f"App template not found for {app_name}")
+
+    prefixes = get_image_tag_index().get(app_template.image_repository_ref)
+
+    return prefixes.starts_with(
+        sanitise_image_tag_prefix(query) if query else "", limit=limit
+    )
+
+
+def is_known_image_tag_prefix(app_template: AppTemplate, image_tag_prefix: str) -> bool:
+    """
+    Checks an image tag prefix against the image tag index. Always True when
+    KOLLIE_VALIDATE_IMAGE_TAG_PREFIXES is disabled, and for the app's default
+    prefix.
+
+    Args:
+        app_template (AppTemplate): The app template.
+        image_tag_prefix (str): The prefix to check.
+    """
+    if not VALIDATE_IMAGE_TAG_PREFIXES:
+        return True
+
+    if image_tag_prefix == app_template.default_image_tag_prefix:
+        return True
+
+    index = get_image_tag_index()
+
+    if _index is None:
+        # not built yet, nothing to check against
+        logger.warning("image_tags.index_not_ready", app_name=app_template.app_name)
+        return True
+
+    prefixes = index.get(app_template.image_repository_ref)
+
+    return sanitise_image_tag_prefix(image_tag_prefix) in prefixes
+
+
+def _build_index_for_app_templates() -> ImageTagIndex:
+    image_repository_refs = {
+        _repository_key(template.image_repository_ref): template.image_repository_ref
+        for template in get_app_template_store().get_all()
+    }
+
+    return build_image_tag_index(list(image_repository_refs.values()))
+
+
+def _refresh_periodically() -> None:
+    delay = 0 if _index is None else IMAGE_TAG_INDEX_REFRESH_SECONDS
+
+    while True:
+        time.sleep(delay)
+        delay = IMAGE_TAG_INDEX_REFRESH_SECONDS
+
+        try:
+            refresh_image_tag_index()
+            logger.debug("image_tags.index_refreshed")
+        except Exception:
+            logger.exception("image_tags.index_refresh_failed")
+
+
+def _start_refresh_thread() -> None:
+    global _refresh_thread
+
+    with _index_lock:
+        if _refresh_thread is None:
+            _refresh_thread = threading.Thread(
+                target=_refresh_periodically, daemon=True
+            )
+            _refresh_thread.start()
+
+
+def _repository_key(image_repository_ref: ClusterObjectReference) -> RepositoryKey:
+    return (image_repository_ref.namespace, image_repository_ref.name)
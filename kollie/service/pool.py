@@ -0,0 +1,369 @@
+import datetime
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+
+import structlog
+from environs import Env
+from kubernetes import client
+
+from kollie.cluster.configmap import (
+    get_configmaps,
+    owner_label_value,
+    set_configmap_labels,
+    set_configmap_owner,
+)
+from kollie.cluster.constants import OWNER_HASH_LABEL, WARM_POOL_LABEL
+from kollie.cluster.image_policy import resolve_latest_image_tag
+from kollie.cluster.kustomization import get_kustomizations, patch_kustomization
+from kollie.cluster.kustomization_request import (
+    PatchKustomizationRequest,
+    calculate_uptime_window_string,
+)
+from kollie.concurrency import map_concurrently
+from kollie.exceptions import KollieConfigError
+from kollie.models import EnvironmentMetadata
+from kollie.persistence import get_app_template_store
+from kollie.persistence.app_bundle import get_app_bundle_store
+from kollie.service import applications, envs
+from kollie.service.env_summary import refresh_env_summary
+
+env = Env()
+
+# Number of envs kept ready for each bundle, e.g. `backend=3,frontend=1`.
+# The pool is disabled when empty.
+WARM_POOL_SIZES: dict[str, int] = env.dict(
+    "KOLLIE_WARM_POOL_SIZES", subcast_values=int, default={}
+)
+# How often the daemon tops the pools up
+WARM_POOL_REFRESH_SECONDS: int = env.int("KOLLIE_WARM_POOL_REFRESH_SECONDS", 60)
+# Owner of the envs waiting in a pool
+WARM_POOL_OWNER: str = env.str("KOLLIE_WARM_POOL_OWNER", "warm-pool@kollie.local")
+# Envs of the pool owner that never joined a pool are deleted once they are
+# this old, e.g. when the daemon stopped while provisioning them
+WARM_POOL_ORPHAN_MINUTES: int = env.int("KOLLIE_WARM_POOL_ORPHAN_MINUTES", 30)
+WARM_POOL_ENV_PREFIX = "pool"
+# The lease of pooled envs is renewed for a day once it ends within this
+WARM_POOL_LEASE_RENEWAL = datetime.timedelta(hours=12)
+
+logger = structlog.get_logger(__name__)
+
+_refresh_thread: threading.Thread | None = None
+
+
+@dataclass
+class ClaimedEnv:
+    """
+    An env taken from a warm pool: its name, the apps whose image tag prefix
+    was changed on claim and the error by app name for those that failed.
+    """
+
+    env_name: str
+    bundle_name: str
+    updated_apps: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)
+
+
+def top_up_pools() -> list[str]:
+    """
+    Maintains the warm pool of every bundle in KOLLIE_WARM_POOL_SIZES:
+    creates the missing envs, renews the lease of the pooled envs so the
+    downscaler doesn't scale them down while they wait, and deletes the envs
+    of the pool owner that never joined a pool.
+
+    An env only joins its pool once its bundle is installed, so that it
+    can't be claimed half created. Envs whose bundle fails to install are
+    deleted again.
+
+    Returns:
+        list[str]: Names of the envs added to the pools.
+    """
+    owned = [
+        configmap
+        for configmap in get_configmaps(
+            {OWNER_HASH_LABEL: owner_label_value(WARM_POOL_OWNER)}
+        )
+        if configmap.data and configmap.metadata
+    ]
+    pooled = [
+        configmap
+        for configmap in owned
+        if WARM_POOL_LABEL in (configmap.metadata.labels or {})
+    ]
+
+    _reap_orphans([configmap for configmap in owned if configmap not in pooled])
+    _renew_leases(pooled)
+
+    added = []
+
+    for bundle_name, size in WARM_POOL_SIZES.items():
+        missing = size - sum(
+            1
+            for configmap in pooled
+            if configmap.metadata.labels[WARM_POOL_LABEL] == bundle_name
+        )
+
+        for _ in range(missing):
+            env_name = f"{WARM_POOL_ENV_PREFIX}-{bundle_name}-{secrets.token_hex(3)}"
+
+            try:
+                _provision(env_name, bundle_name)
+            except Exception:
+                logger.exception(
+                    "pool.provision_failed", env_name=env_name, bundle_name=bundle_name
+                )
+                break
+
+            added.append(env_name)
+
+    return added
+
+
+def _provision(env_name: str, bundle_name: str) -> None:
+    envs.create_env(env_name=env_name, owner_email=WARM_POOL_OWNER)
+
+    try:
+        envs.install_bundle(
+            env_name=env_name, bundle_name=bundle_name, owner_email=WARM_POOL_OWNER
+        )
+        _extend_lease(env_name)
+    except Exception:
+        envs.delete_env(env_name)
+        raise
+
+    set_configmap_labels(env_name, {WARM_POOL_LABEL: bundle_name})
+
+    logger.info("pool.env_added", env_name=env_name, bundle_name=bundle_name)
+
+
+def _reap_orphans(configmaps: list) -> None:
+    """
+    Deletes the pool owner's envs that are old enough to have joined their
+    pool but never did.
+    """
+    cutoff = datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(
+        minutes=WARM_POOL_ORPHAN_MINUTES
+    )
+
+    for configmap in configmaps:
+        env_name = configmap.metadata.name
+
+        if (
+            not env_name.startswith(f"{WARM_POOL_ENV_PREFIX}-")
+            or EnvironmentMetadata.from_configmap(configmap).owner_email
+            != WARM_POOL_OWNER
+            or configmap.metadata.creation_timestamp > cutoff
+        ):
+            continue
+
+        try:
+            envs.delete_env(env_name)
+            logger.info("pool.orphan_deleted", env_name=env_name)
+        except Exception:
+            logger.exception("pool.orphan_deletion_failed", env_name=env_name)
+
+
+def _renew_leases(configmaps: list) -> None:
+    """Extends the lease of the pooled envs whose lease is about to end."""
+    for configmap in configmaps:
+        metadata = EnvironmentMetadata.from_configmap(configmap)
+        lease_info = metadata.summary.lease_info if metadata.summary else None
+
+        if lease_info is not None and lease_info.time_left > WARM_POOL_LEASE_RENEWAL:
+            continue
+
+        try:
+            _extend_lease(metadata.name)
+        except Exception:
+            logger.exception("pool.lease_renewal_failed", env_name=metadata.name)
+
+
+def _extend_lease(env_name: str) -> None:
+    """Leases an env until the same time tomorrow."""
+    hour = datetime.datetime.now(datetime.timezone.utc).hour
+    envs.extend_lease(env_name=env_name, hour=hour, days=1)
+
+
+def claim_env(
+    bundle_name: str,
+    owner_email: str,
+    image_tag_prefixes: dict[str, str] | None = None,
+) -> ClaimedEnv | None:
+    """
+    Hands an env of a bundle's warm pool over to a new owner, preferring the
+    envs whose apps are all ready.
+
+    The env keeps its name: its configmap and kustomizations get the new
+    owner and a fresh lease, and only the apps given an image tag prefix
+    other than the one they track are updated.
+
+    Args:
+        bundle_name (str): The name of the bundle.
+        owner_email (str): The email of the new owner.
+        image_tag_prefixes (dict[str, str]): Image tag prefix by app name,
+            for the apps that shouldn't track their default prefix.
+
+    Raises:
+        KollieConfigError: If an image tag prefix is given for an app that
+            isn't part of the bundle.
+
+    Returns:
+        ClaimedEnv: The claimed env, None if the pool is empty.
+    """
+    image_tag_prefixes = image_tag_prefixes or {}
+    bundle = get_app_bundle_store().get_bundle(name=bundle_name)
+
+    if not bundle:
+        raise KollieConfigError(message=f"App bundle not found for {bundle_name}")
+
+    unknown_apps = sorted(set(image_tag_prefixes) - set(bundle.apps))
+
+    if unknown_apps:
+        raise KollieConfigError(
+            message=f"Apps not in bundle {bundle_name}: {', '.join(unknown_apps)}"
+        )
+
+    for configmap in _claim_candidates(bundle_name):
+        try:
+            set_configmap_owner(
+                configmap, owner_email=owner_email, labels={WARM_POOL_LABEL: None}
+            )
+        except client.ApiException as exc:
+            # somebody else claimed it or it was deleted meanwhile
+            if exc.status in (404, 409):
+                continue
+            raise
+
+        env_name = configmap.metadata.name
+        logger.info("pool.env_claimed", env_name=env_name, bundle_name=bundle_name)
+
+        return _hand_over(env_name, bundle_name, owner_email, image_tag_prefixes)
+
+    logger.warning("pool.empty", bundle_name=bundle_name)
+
+    return None
+
+
+def _claim_candidates(bundle_name: str) -> list:
+    """The pool's configmaps, ready envs first, then oldest first."""
+    configmaps = [
+        configmap
+        for configmap in get_configmaps({WARM_POOL_LABEL: bundle_name})
+        if configmap.data and configmap.metadata
+    ]
+
+    def rank(configmap):
+        metadata = EnvironmentMetadata.from_configmap(configmap)
+        ready = metadata.summary is not None and metadata.summary.ready
+        return (not ready, metadata.created_at.timestamp())
+
+    return sorted(configmaps, key=rank)
+
+
+def _hand_over(
+    env_name: str,
+    bundle_name: str,
+    owner_email: str,
+    image_tag_prefixes: dict[str, str],
+) -> ClaimedEnv:
+    claimed = ClaimedEnv(env_name=env_name, bundle_name=bundle_name)
+    uptime_window = calculate_uptime_window_string()
+
+    kustomizations_by_app = {
+        kustomization["metadata"]["labels"]["tails-app-name"]: kustomization
+        for kustomization in get_kustomizations(env_name=env_name)
+    }
+
+    prefix_changes = [
+        (app_name, image_tag_prefix)
+        for app_name, image_tag_prefix in image_tag_prefixes.items()
+        if app_name in kustomizations_by_app
+        and image_tag_prefix
+        != kustomizations_by_app[app_name]["metadata"]["annotations"].get(
+            "tails.com/tracking-image-tag-prefix"
+        )
+    ]
+
+    outcomes = map_concurrently(
+        lambda app_name: patch_kustomization(
+            PatchKustomizationRequest(env_name, app_name)
+            .set_owner_email(owner_email)
+            .set_uptime_window(uptime_window)
+        ),
+        list(kustomizations_by_app),
+        max_workers=envs.LEASE_EXTENSION_CONCURRENCY,
+    )
+
+    for outcome in outcomes:
+        if outcome.error is None:
+            kustomizations_by_app[outcome.item] = outcome.result
+        else:
+            claimed.failed[outcome.item] = str(outcome.error)
+
+    updates = map_concurrently(
+        lambda change: _set_image_tag_prefix(env_name, *change),
+        prefix_changes,
+        max_workers=envs.BUNDLE_INSTALL_CONCURRENCY,
+    )
+
+    for update in updates:
+        app_name = update.item[0]
+
+        if update.error is None:
+            claimed.updated_apps.append(app_name)
+        else:
+            claimed.failed[app_name] = str(update.error)
+
+    for app_name, error in claimed.failed.items():
+        logger.error(
+            "pool.hand_over_failed", env_name=env_name, app_name=app_name, error=error
+        )
+
+    refresh_env_summary(env_name, list(kustomizations_by_app.values()))
+
+    return claimed
+
+
+def _set_image_tag_prefix(env_name: str, app_name: str, image_tag_prefix: str) -> None:
+    """
+    Points an app at another image tag prefix, deploying the latest image tag
+    of the prefix straight away rather than once its ImagePolicy reconciles.
+    """
+    attributes = {"image_tag_prefix": image_tag_prefix}
+
+    app_template = get_app_template_store().get_by_name(app_name=app_name)
+    image_tag = (
+        resolve_latest_image_tag(app_template, image_tag_prefix)
+        if app_template
+        else None
+    )
+
+    if image_tag:
+        attributes["image_tag"] = image_tag
+
+    applications.update_app(env_name=env_name, app_name=app_name, attributes=attributes)
+
+
+def start_pool_refresher() -> None:
+    """
+    Start topping the warm pools up every KOLLIE_WARM_POOL_REFRESH_SECONDS in
+    a daemon thread, once per process. Does nothing when no pool is
+    configured.
+    """
+    global _refresh_thread
+
+    if WARM_POOL_SIZES and _refresh_thread is None:
+        _refresh_thread = threading.Thread(target=_top_up_periodically, daemon=True)
+        _refresh_thread.start()
+
+
+def _top_up_periodically() -> None:
+    while True:
+        try:
+            added = top_up_pools()
+            logger.debug("pool.topped_up", added=added)
+        except Exception:
+            logger.exception("pool.top_up_failed")
+
+        time.sleep(WARM_POOL_REFRESH_SECONDS)
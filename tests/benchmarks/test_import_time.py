@@ -0,0 +1,47 @@
+"""
+Import-time benchmark of the web app, skipped unless KOLLIE_RUN_BENCHMARKS=1, e.g.
+
+    KOLLIE_RUN_BENCHMARKS=1 pytest tests/benchmarks -s
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("KOLLIE_RUN_BENCHMARKS") != "1",
+    reason="set KOLLIE_RUN_BENCHMARKS=1 to run benchmarks",
+)
+
+MODULE = "kollie.app.main"
+SLOWEST = 15
+
+
+def _import_times(module: str) -> list[tuple[int, str]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    times = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times.append((int(cumulative), name.strip()))
+
+    return times
+
+
+def test_web_app_import_time():
+    times = _import_times(MODULE)
+    total = next(cumulative for cumulative, name in times if name == MODULE)
+
+    print(f"\nimport {MODULE}: {total / 1000:.0f}ms")
+    for cumulative, name in sorted(times, reverse=True)[1:SLOWEST]:
+        print(f"  {cumulative / 1000:8.1f}ms  {name}")
@@ -0,0 +1,60 @@
+"""
+Micro-benchmarks, skipped unless KOLLIE_RUN_BENCHMARKS=1, e.g.
+
+    KOLLIE_RUN_BENCHMARKS=1 pytest tests/benchmarks -s
+"""
+
+import os
+import timeit
+
+import pytest
+
+from kollie.cluster.kustomization_request import CreateKustomizationRequest
+from kollie.persistence import AppTemplate, ImageRepositoryRef
+
+pytestmark = pytest.mark.skipif(
+    os.environ.get("KOLLIE_RUN_BENCHMARKS") != "1",
+    reason="set KOLLIE_RUN_BENCHMARKS=1 to run benchmarks",
+)
+
+BUNDLE_SIZE = 200
+ROUNDS = 20
+
+
+def _app_templates(count: int) -> list[AppTemplate]:
+    return [
+        AppTemplate(
+            app_name=f"app-{i}",
+            label=f"App {i}",
+            git_repository_name="flux",
+            git_repository_path=f"apps/app-{i}/testing",
+            default_image_tag_prefix="main",
+            image_repository_ref=ImageRepositoryRef(
+                name=f"app-{i}", namespace="flux-system"
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def test_kustomization_body_per_app_cost():
+    app_templates = _app_templates(BUNDLE_SIZE)
+
+    def build_bundle():
+        for app_template in app_templates:
+            CreateKustomizationRequest(
+                env_name="benchmark",
+                app_template=app_template,
+                image_tag_prefix="feature/benchmark",
+                owner_email="benchmark@example.com",
+                owner_uid="uid",
+                lease_exclusion_window="window",
+            ).body
+
+    build_bundle()  # compile the templates
+    seconds = min(timeit.repeat(build_bundle, number=1, repeat=ROUNDS))
+
+    print(
+        f"\n{BUNDLE_SIZE} apps: {seconds * 1000:.2f}ms per bundle, "
+        f"{seconds / BUNDLE_SIZE * 1e6:.1f}us per app"
+    )
@@ -3,10 +3,21 @@ import json
 
 from unittest.mock import patch, mock_open
 
+import pytest
 from freezegun import freeze_time
 
-from kollie.models import KollieEnvironment
-from tests.kollie.helpers import build_configmaps, build_kustomization
+from kollie.app.readiness import CheckResult
+from kollie.exceptions import KollieConfigError
+from kollie.jobs import get_job_runner, report_step
+from kollie.models import AppSnapshot, EnvironmentSnapshot
+from kollie.persistence.validation import CatalogValidationError, ValidationReport
+from kollie.persistence import AppTemplateStore
+from kollie.persistence.app_template_search import AppTemplatePage
+from kollie.service import envs
+from kollie.service.applications import AppsCreation
+from kollie.service.pool import ClaimedEnv
+from tests.kollie.helpers import MagicAppTemplateSource, build_configmaps, build_kustomization
+from kubernetes.client import ApiException
 from kubernetes.client.models import V1ConfigMap, V1ObjectMeta
 
 
@@ -16,6 +27,38 @@ def test_ping(test_client):
     assert response.json() == {"message": "Pong..."}
 
 
+@patch("kollie.app.main.check_readiness")
+def test_readyz(check_readiness_mock, test_client):
+    check_readiness_mock.return_value = {
+        "cluster": CheckResult(ready=True, detail="v1.30.0"),
+        "app_templates": CheckResult(ready=True, detail="2 app templates"),
+    }
+
+    response = test_client.get("/readyz")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "ready": True,
+        "checks": {
+            "cluster": {"ready": True, "detail": "v1.30.0"},
+            "app_templates": {"ready": True, "detail": "2 app templates"},
+        },
+    }
+
+
+@patch("kollie.app.main.check_readiness")
+def test_readyz_not_ready(check_readiness_mock, test_client):
+    check_readiness_mock.return_value = {
+        "cluster": CheckResult(ready=True, detail="v1.30.0"),
+        "warm_up": CheckResult(ready=False, detail="warming up"),
+    }
+
+    response = test_client.get("/readyz")
+
+    assert response.status_code == 503
+    assert response.json()["ready"] is False
+
+
 @patch("builtins.open", new_callable=mock_open)
 @patch.dict(os.environ, {"KOLLIE_APP_TEMPLATE_JSON_PATH": "dummy_path"})
 def test_apps(mock_open_func, test_client):
@@ -78,6 +121,7 @@ def test_environment_index(get_configmaps_mock, test_client):
             "name": "env1",
             "owner_email": "test@owner.com",
             "lease_exclusion_window": None,
+            "summary": None,
             "created_at": "2024-01-01T00:00:00",
         },
         {
@@ -85,6 +129,7 @@ def test_environment_index(get_configmaps_mock, test_client):
             "owner_email": "test2@owner.com",
             "created_at": "2024-01-01T00:00:00",
             "lease_exclusion_window": "stuff and things",
+            "summary": None,
         },
     ]
 
@@ -133,19 +178,22 @@ def test_environment_details(
     assert not set(actual_app_names) ^ set(["AlladinsFriedChicken", "SKVP"])
 
 
+def _wait_for_job(test_client, response) -> dict:
+    assert response.status_code == 202
+    job = get_job_runner().get(response.json()["id"])
+    assert job is not None and job.wait(timeout=5)
+
+    job_response = test_client.get(f"/api/jobs/{response.json()['id']}")
+    assert job_response.status_code == 200
+
+    return job_response.json()
+
+
 @patch("kollie.service.envs.create_env", autospec=True)
-@patch("kollie.service.envs.get_env", autospec=True)
-def test_create_environment(get_env_mock, create_env_mock, test_client):
+def test_create_environment(create_env_mock, test_client):
     # we are patching at the service level for this endpoint and rely on
     # separate tests for ensuring the service methods behave as expected
 
-    get_env_mock.return_value = KollieEnvironment(
-        name="env1",
-        apps=[],
-        owner_email="test@test.local",
-        flux_repository_branch="test-branch"
-    )
-
     # act
     response = test_client.post(
         "/api/env",
@@ -154,16 +202,371 @@ def test_create_environment(get_env_mock, create_env_mock, test_client):
     )
 
     # assert
-    assert response.status_code == 201
+    job = _wait_for_job(test_client, response)
+    assert job["name"] == "create_env"
+    assert job["status"] == "succeeded"
     create_env_mock.assert_called_once_with(
         env_name="env1",
         owner_email="test@test.local",
         flux_repo_branch="test-branch"
     )
+
+
+@patch("kollie.service.envs.delete_env", autospec=True)
+def test_delete_environment(delete_env_mock, test_client):
+    response = test_client.delete(
+        "/api/env/env1", headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"}
+    )
+
+    assert _wait_for_job(test_client, response)["status"] == "succeeded"
+    delete_env_mock.assert_called_once_with("env1")
+
+
+@patch("kollie.service.envs.install_bundle", autospec=True)
+@patch("kollie.app.api.endpoints.get_app_bundle_store", autospec=True)
+def test_install_bundle_reports_failure_in_job(
+    get_app_bundle_store_mock, install_bundle_mock, test_client
+):
+    def install_bundle(env_name, bundle_name, owner_email):
+        report_step("foo", "created")
+        raise KollieConfigError(message="App template not found for bar")
+
+    install_bundle_mock.side_effect = install_bundle
+
+    response = test_client.post(
+        "/api/env/env1/bundles",
+        json={"bundle_name": "bundle1"},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    job = _wait_for_job(test_client, response)
+    assert job["status"] == "failed"
+    assert job["error"] == "App template not found for bar"
+    assert [(step["name"], step["status"]) for step in job["steps"]] == [
+        ("foo", "created")
+    ]
+    install_bundle_mock.assert_called_once_with(
+        env_name="env1", bundle_name="bundle1", owner_email="test@test.local"
+    )
+
+
+@patch("kollie.app.api.endpoints.get_app_bundle_store", autospec=True)
+def test_install_bundle_unknown_bundle(get_app_bundle_store_mock, test_client):
+    get_app_bundle_store_mock.return_value.get_bundle.return_value = None
+
+    response = test_client.post(
+        "/api/env/env1/bundles",
+        json={"bundle_name": "missing"},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 404
+
+
+@patch("kollie.service.envs.clone_env", autospec=True)
+def test_clone_environment(clone_env_mock, test_client):
+    clone_env_mock.return_value = AppsCreation(env_name="env2", created=["foo"])
+
+    response = test_client.post(
+        "/api/env/env1/clone",
+        json={"target_env_name": "env2"},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 202
+    job = _wait_for_job(test_client, response)
+    assert job["status"] == "succeeded"
+    assert job["result"]["created"] == ["foo"]
+    clone_env_mock.assert_called_once_with(
+        source_env_name="env1", target_env_name="env2", owner_email="test@test.local"
+    )
+
+
+@patch("kollie.service.envs.export_env", autospec=True)
+def test_export_environment(export_env_mock, test_client):
+    export_env_mock.return_value = EnvironmentSnapshot(
+        name="env1",
+        owner_email="test@test.local",
+        apps=[AppSnapshot(name="foo", image_tag_prefix="main", image_tag="main-abc")],
+    )
+
+    response = test_client.get("/api/env/env1/snapshot")
+
+    assert response.status_code == 200
     assert response.json() == {
+        "version": 1,
         "name": "env1",
-        "apps": [],
         "owner_email": "test@test.local",
-        "flux_repository_branch": "test-branch",
-        "created_on": None,
+        "apps": [{"name": "foo", "image_tag_prefix": "main", "image_tag": "main-abc"}],
+    }
+
+
+@patch("kollie.service.envs.export_env", autospec=True)
+def test_export_environment_not_found(export_env_mock, test_client):
+    export_env_mock.side_effect = KollieConfigError(message="Environment not found")
+
+    assert test_client.get("/api/env/env1/snapshot").status_code == 404
+
+
+@patch("kollie.service.envs.import_env", autospec=True)
+def test_import_environment(import_env_mock, test_client):
+    import_env_mock.return_value = AppsCreation(env_name="env2", created=["foo"])
+
+    response = test_client.post(
+        "/api/env/import",
+        json={
+            "snapshot": {"version": 1, "name": "env1", "apps": [{"name": "foo"}]},
+            "env_name": "env2",
+        },
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 202
+    assert _wait_for_job(test_client, response)["status"] == "succeeded"
+    import_env_mock.assert_called_once_with(
+        EnvironmentSnapshot(name="env1", owner_email=None, apps=[AppSnapshot(name="foo")]),
+        owner_email="test@test.local",
+        env_name="env2",
+    )
+
+
+def test_import_environment_malformed_snapshot(test_client):
+    response = test_client.post(
+        "/api/env/import",
+        json={"snapshot": {"version": 1, "apps": []}},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 400
+
+
+@patch("kollie.service.pool.claim_env", autospec=True)
+def test_claim_environment(claim_env_mock, test_client):
+    claim_env_mock.return_value = ClaimedEnv(
+        env_name="pool-backend-aaa", bundle_name="backend", updated_apps=["foo"]
+    )
+
+    response = test_client.post(
+        "/api/env/claim",
+        json={"bundle_name": "backend", "image_tag_prefixes": {"foo": "feature"}},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "env_name": "pool-backend-aaa",
+        "bundle_name": "backend",
+        "updated_apps": ["foo"],
+        "failed": {},
     }
+    claim_env_mock.assert_called_once_with(
+        bundle_name="backend",
+        owner_email="test@test.local",
+        image_tag_prefixes={"foo": "feature"},
+    )
+
+
+@patch("kollie.service.pool.claim_env", autospec=True)
+def test_claim_environment_from_empty_pool(claim_env_mock, test_client):
+    claim_env_mock.return_value = None
+
+    response = test_client.post(
+        "/api/env/claim",
+        json={"bundle_name": "backend"},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 404
+
+
+def test_unknown_job(test_client):
+    assert test_client.get("/api/jobs/unknown").status_code == 404
+
+
+@patch("kollie.service.image_tags.suggest_image_tag_prefixes", autospec=True)
+def test_image_tag_prefixes(suggest_image_tag_prefixes_mock, test_client):
+    suggest_image_tag_prefixes_mock.return_value = ["feature-a", "feature-b"]
+
+    response = test_client.get("/api/apps/test_app/image-tag-prefixes?q=feat")
+
+    assert response.status_code == 200
+    assert response.json() == ["feature-a", "feature-b"]
+    suggest_image_tag_prefixes_mock.assert_called_once_with(
+        "test_app", query="feat", limit=20
+    )
+
+
+@patch("kollie.service.image_tags.suggest_image_tag_prefixes", autospec=True)
+def test_image_tag_prefixes_unknown_app(suggest_image_tag_prefixes_mock, test_client):
+    suggest_image_tag_prefixes_mock.side_effect = KollieConfigError(
+        message="App template not found for nope"
+    )
+
+    response = test_client.get("/api/apps/nope/image-tag-prefixes")
+
+    assert response.status_code == 404
+
+
+@patch("kollie.service.image_tags.suggest_image_tag_prefixes", autospec=True)
+def test_image_tag_prefixes_cluster_unavailable(
+    suggest_image_tag_prefixes_mock, test_client
+):
+    suggest_image_tag_prefixes_mock.side_effect = ApiException(status=500)
+
+    response = test_client.get("/api/apps/test_app/image-tag-prefixes")
+
+    assert response.status_code == 503
+
+
+@patch("kollie.app.api.endpoints.get_app_template_store")
+def test_search_apps(get_app_template_store_mock, test_client):
+    get_app_template_store_mock.return_value = AppTemplateStore(
+        source=MagicAppTemplateSource(["checkout", "payments", "pets"])
+    )
+
+    response = test_client.get("/api/apps/search?q=p&limit=1")
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [item["app_name"] for item in body["items"]] == ["payments"]
+    assert body["total"] == 2
+    assert body["offset"] == 0
+    assert body["limit"] == 1
+
+
+@patch("kollie.app.api.endpoints.envs", autospec=True)
+def test_search_apps_in_env(envs_mock, test_client):
+    envs_mock.search_available_apps.return_value = AppTemplatePage(
+        items=(), total=0, offset=10, limit=5
+    )
+
+    response = test_client.get("/api/apps/search?q=pay&env=test_env&offset=10&limit=5")
+
+    assert response.status_code == 200
+    assert response.json() == {"items": [], "total": 0, "offset": 10, "limit": 5}
+    envs_mock.search_available_apps.assert_called_once_with(
+        envs_mock.get_env.return_value, "pay", offset=10, limit=5
+    )
+
+
+@patch("kollie.app.api.endpoints.envs", autospec=True)
+def test_search_apps_unknown_env(envs_mock, test_client):
+    envs_mock.get_env.return_value = None
+
+    response = test_client.get("/api/apps/search?env=nope")
+
+    assert response.status_code == 404
+
+
+def test_search_apps_rejects_large_pages(test_client):
+    response = test_client.get("/api/apps/search?limit=1000")
+
+    assert response.status_code == 422
+
+
+@patch("kollie.app.api.endpoints.get_app_bundle_report")
+@patch("kollie.app.api.endpoints.get_app_bundle_store")
+@patch("kollie.app.api.endpoints.get_app_template_store")
+def test_catalog_validation(
+    get_app_template_store_mock,
+    get_app_bundle_store_mock,
+    get_app_bundle_report_mock,
+    test_client,
+):
+    get_app_template_store_mock.return_value.report = ValidationReport(
+        source="app_templates.json", item_count=3
+    )
+    get_app_bundle_store_mock.side_effect = CatalogValidationError(
+        ValidationReport(source="app_bundles.json", errors=("x refers to unknown apps y",))
+    )
+    get_app_bundle_report_mock.return_value = get_app_bundle_store_mock.side_effect.report
+
+    response = test_client.get("/api/catalog/validation")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "app_templates": {
+            "source": "app_templates.json",
+            "valid": True,
+            "item_count": 3,
+            "errors": [],
+        },
+        "app_bundles": {
+            "source": "app_bundles.json",
+            "valid": False,
+            "item_count": 0,
+            "errors": ["x refers to unknown apps y"],
+        },
+    }
+
+
+@patch("kollie.service.envs.delete_envs", autospec=True)
+@patch("kollie.service.envs.select_envs", autospec=True)
+def test_bulk_delete_environments(select_envs_mock, delete_envs_mock, test_client):
+    select_envs_mock.return_value = ["env1", "env2"]
+    delete_envs_mock.return_value = {"env1": None, "env2": "boom"}
+
+    response = test_client.post(
+        "/api/env/bulk/delete",
+        json={"selector": {"name_prefix": "env", "lease_expired": True}},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    job = _wait_for_job(test_client, response)
+    assert job["result"] == {"env1": None, "env2": "boom"}
+    select_envs_mock.assert_called_once_with(
+        envs.EnvSelector(name_prefix="env", lease_expired=True)
+    )
+    delete_envs_mock.assert_called_once_with(["env1", "env2"])
+
+
+@pytest.mark.parametrize("selector", [{}, {"name_prefix": ""}, {"names": []}])
+@patch("kollie.service.envs.delete_envs", autospec=True)
+def test_bulk_delete_environments_requires_a_selection(
+    delete_envs_mock, selector, test_client
+):
+    response = test_client.post(
+        "/api/env/bulk/delete",
+        json={"selector": selector},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 400
+    delete_envs_mock.assert_not_called()
+
+
+@patch("kollie.service.envs.extend_leases", autospec=True)
+@patch("kollie.service.envs.select_envs", autospec=True)
+def test_bulk_extend_leases(select_envs_mock, extend_leases_mock, test_client):
+    select_envs_mock.return_value = ["env1"]
+    extend_leases_mock.return_value = {"env1": None}
+
+    response = test_client.post(
+        "/api/env/bulk/extend-lease",
+        json={"selector": {"names": ["env1"]}, "hour": 21, "days": 1},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    job = _wait_for_job(test_client, response)
+    assert job["result"] == {"env1": None}
+    extend_leases_mock.assert_called_once_with(["env1"], hour=21, days=1)
+
+
+def test_bulk_extend_leases_validates_hour(test_client):
+    response = test_client.post(
+        "/api/env/bulk/extend-lease",
+        json={"selector": {"names": ["env1"]}, "hour": 24},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 422
+
+
+def test_bulk_extend_leases_validates_days(test_client):
+    response = test_client.post(
+        "/api/env/bulk/extend-lease",
+        json={"selector": {"names": ["env1"]}, "hour": 21, "days": 6},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@test.local"},
+    )
+
+    assert response.status_code == 422
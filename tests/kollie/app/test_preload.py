@@ -0,0 +1,38 @@
+from unittest.mock import Mock, patch
+
+from kollie.app import preload as preload_module
+from kollie.app.preload import is_preloaded, preload
+from kollie.app.ui.views import preload_templates
+
+
+def test_preload_runs_every_step_despite_failures():
+    broken = Mock(side_effect=ValueError("broken"))
+    working = Mock()
+
+    with (
+        patch.dict(
+            preload_module.PRELOADS, {"broken": broken, "working": working}, clear=True
+        ),
+        patch.object(preload_module, "_preloaded", preload_module.threading.Event()),
+    ):
+        assert not is_preloaded()
+
+        preload()
+
+        assert is_preloaded()
+
+    broken.assert_called_once_with()
+    working.assert_called_once_with()
+
+
+def test_preload_templates_compiles_every_template():
+    with patch("kollie.app.ui.views.templates") as templates:
+        templates.env.list_templates.return_value = ["/index.jinja2", "/create.jinja2"]
+
+        preload_templates()
+
+    assert templates.env.get_template.call_count == 2
+
+
+def test_ui_templates_compile():
+    preload_templates()
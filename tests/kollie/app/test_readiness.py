@@ -0,0 +1,85 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from kollie.app import readiness
+from kollie.app.readiness import (
+    CheckResult,
+    check_app_bundles,
+    check_app_templates,
+    check_cluster,
+    check_configmap_catalog,
+    check_readiness,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_cluster_checks():
+    readiness._cluster_checks.clear()
+    yield
+    readiness._cluster_checks.clear()
+
+
+@patch("kollie.app.readiness.check_cluster_connection", return_value="v1.30.0")
+def test_check_cluster_is_cached(check_cluster_connection_mock):
+    assert check_cluster() == CheckResult(ready=True, detail="v1.30.0")
+    assert check_cluster() == CheckResult(ready=True, detail="v1.30.0")
+
+    check_cluster_connection_mock.assert_called_once_with()
+
+
+@patch("kollie.app.readiness.check_cluster_connection", side_effect=OSError("timeout"))
+def test_check_cluster_unreachable(_):
+    result = check_cluster()
+
+    assert not result.ready
+    assert "timeout" in result.detail
+
+
+@patch("kollie.app.readiness.get_app_template_store")
+def test_check_app_templates(get_app_template_store_mock):
+    get_app_template_store_mock.return_value.get_names.return_value = {"a": 1, "b": 2}.keys()
+
+    assert check_app_templates() == CheckResult(ready=True, detail="2 app templates")
+
+
+@patch("kollie.app.readiness.get_app_template_store")
+def test_check_app_templates_not_loaded(get_app_template_store_mock):
+    get_app_template_store_mock.return_value.get_names.side_effect = FileNotFoundError(
+        "app_templates.json"
+    )
+
+    assert not check_app_templates().ready
+
+
+@patch("kollie.app.readiness.get_app_bundle_store", side_effect=ValueError("invalid"))
+def test_check_app_bundles_not_loaded(_):
+    assert check_app_bundles() == CheckResult(ready=False, detail="invalid")
+
+
+@patch("kollie.app.readiness.CATALOG_CONFIGMAP_SELECTOR", new="")
+def test_check_configmap_catalog_unused():
+    assert check_configmap_catalog().ready
+
+
+@patch("kollie.app.readiness.get_configmap_catalog")
+@patch("kollie.app.readiness.CATALOG_CONFIGMAP_SELECTOR", new="kollie.tails.com/catalog=true")
+def test_check_configmap_catalog_not_synced(get_configmap_catalog_mock):
+    get_configmap_catalog_mock.return_value.synced = False
+
+    assert check_configmap_catalog() == CheckResult(ready=False, detail="not synced")
+
+
+def test_check_readiness_reports_failing_checks():
+    checks = {
+        "ok": Mock(return_value=CheckResult(ready=True)),
+        "broken": Mock(side_effect=RuntimeError("boom")),
+    }
+
+    with patch.dict(readiness.READINESS_CHECKS, checks, clear=True):
+        results = check_readiness()
+
+    assert results == {
+        "ok": CheckResult(ready=True),
+        "broken": CheckResult(ready=False, detail="boom"),
+    }
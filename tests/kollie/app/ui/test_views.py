@@ -1,6 +1,10 @@
+import datetime
 from unittest.mock import patch
 
-from kollie.models import KollieEnvironment
+from kollie.jobs import Job, JobStep
+from kollie.models import EnvironmentMetadata, EnvironmentSummary, KollieEnvironment
+from kollie.persistence.app_template_search import AppTemplatePage
+from tests.kollie.helpers import MagicAppTemplateSource
 
 
 @patch("kollie.app.ui.views.envs", autospec=True)
@@ -20,6 +24,38 @@ def test_create_env(mock_envs, test_client):
     assert response.template.name == "/envs/details.jinja2"
 
 
+@patch("kollie.app.ui.views.envs", autospec=True)
+def test_add_app_renders_first_page_of_available_apps(mock_envs, test_client):
+    mock_envs.get_env.return_value = KollieEnvironment(
+        name="test_env", apps=[], owner_email="test@owner.com", flux_repository_branch=None
+    )
+    mock_envs.search_available_apps.return_value = AppTemplatePage(
+        items=tuple(MagicAppTemplateSource(["app_1", "app_2"]).load()),
+        total=60,
+        offset=0,
+        limit=2,
+    )
+
+    response = test_client.get("/env/test_env/add-app")
+
+    mock_envs.search_available_apps.assert_called_once_with(
+        mock_envs.get_env.return_value
+    )
+    assert response.status_code == 200
+    assert response.template.name == "/apps/add.jinja2"
+    assert '<option value="app_2">app_2</option>' in response.text
+    assert "Showing 2 of 60 apps" in response.text
+
+
+@patch("kollie.app.ui.views.envs", autospec=True)
+def test_add_app_404(mock_envs, test_client):
+    mock_envs.get_env.return_value = None
+
+    response = test_client.get("/env/nope/add-app")
+
+    assert response.status_code == 404
+
+
 @patch("kollie.app.ui.views.applications")
 def test_app_detail(mock_apps, test_client):
     response = test_client.get("/env/test_env/test_app")
@@ -90,8 +126,9 @@ def test_select_bundle_raises_404_when_env_does_not_exist(mock_envs, test_client
     assert response.status_code == 404
 
 
+@patch("kollie.app.ui.views.get_job_runner", autospec=True)
 @patch("kollie.app.ui.views.envs")
-def test_deploy_bundle_calls_service_method_correctly(mock_envs, test_client):
+def test_deploy_bundle_queues_installation(mock_envs, mock_get_job_runner, test_client):
     # arrange
     mock_envs.get_env.return_value = KollieEnvironment(
         name="test_env",
@@ -99,21 +136,82 @@ def test_deploy_bundle_calls_service_method_correctly(mock_envs, test_client):
         apps=[],
         flux_repository_branch=None
     )
+    mock_get_job_runner.return_value.submit.return_value = Job(id="job1", name="install_bundle")
 
     # act
     response = test_client.post(
         "/env/foo/add-bundle",
         data={"bundle_name": "test_bundle"},
         headers={"X-AUTH-REQUEST-EMAIL": "test@owner.com"},
+        follow_redirects=False,
     )
 
     # assert
-    assert response.status_code == 200
-    mock_envs.install_bundle.assert_called_once_with(
-        env_name="foo", bundle_name="test_bundle", owner_email="test@owner.com"
+    assert response.status_code == 302
+    assert response.headers["location"] == "/env/foo?job=job1"
+    mock_get_job_runner.return_value.submit.assert_called_once_with(
+        "install_bundle",
+        mock_envs.install_bundle,
+        env_name="foo",
+        bundle_name="test_bundle",
+        owner_email="test@owner.com",
+    )
+
+
+@patch("kollie.app.ui.views.get_job_runner", autospec=True)
+@patch("kollie.app.ui.views.envs")
+def test_clone_environment_queues_clone(mock_envs, mock_get_job_runner, test_client):
+    mock_envs.get_env.return_value = KollieEnvironment(
+        name="foo",
+        owner_email="test@owner.com",
+        apps=[],
+        flux_repository_branch=None
+    )
+    mock_get_job_runner.return_value.submit.return_value = Job(id="job1", name="clone_env")
+
+    response = test_client.post(
+        "/env/foo/clone",
+        data={"target_env_name": "bar"},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@owner.com"},
+        follow_redirects=False,
+    )
+
+    assert response.status_code == 302
+    assert response.headers["location"] == "/env/foo?job=job1"
+    mock_get_job_runner.return_value.submit.assert_called_once_with(
+        "clone_env",
+        mock_envs.clone_env,
+        source_env_name="foo",
+        target_env_name="bar",
+        owner_email="test@owner.com",
     )
 
 
+@patch("kollie.app.ui.views.get_job_runner", autospec=True)
+@patch("kollie.app.ui.views.envs")
+def test_env_detail_shows_job_progress(mock_envs, mock_get_job_runner, test_client):
+    mock_envs.get_env.return_value = KollieEnvironment(
+        name="test_env",
+        owner_email="test@owner.com",
+        apps=[],
+        flux_repository_branch=None
+    )
+    mock_envs.EXTENDED_LEASE_TEST_ENV_NAMES = []
+    mock_get_job_runner.return_value.get.return_value = Job(
+        id="job1",
+        name="install_bundle",
+        status="running",
+        steps=[JobStep(name="foo", status="created")],
+    )
+
+    response = test_client.get("/env/test_env?job=job1")
+
+    assert response.status_code == 200
+    assert 'data-job-id="job1"' in response.text
+    assert "foo: created" in response.text
+    mock_get_job_runner.return_value.get.assert_called_once_with("job1")
+
+
 @patch("kollie.app.ui.views.envs")
 def test_deploy_bundle_404(mock_envs, test_client):
     # arrange
@@ -129,3 +227,59 @@ def test_deploy_bundle_404(mock_envs, test_client):
     # assert
     assert response.status_code == 404
     mock_envs.deploy_app_bundle.assert_not_called()
+
+
+@patch("kollie.app.ui.views.envs", autospec=True)
+def test_extend_lease(mock_envs, test_client):
+    mock_envs.extend_lease.return_value = {"foo": None, "bar": None}
+
+    response = test_client.post(
+        "/env/test_env/extend-lease",
+        data={"hour": 10, "days": 1},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@owner.com"},
+        follow_redirects=False,
+    )
+
+    mock_envs.extend_lease.assert_called_once_with("test_env", 10, 1)
+    assert response.status_code == 302
+
+
+@patch("kollie.app.ui.views.envs", autospec=True)
+def test_extend_lease_partial_failure(mock_envs, test_client):
+    mock_envs.extend_lease.return_value = {"foo": "boom", "bar": None}
+
+    response = test_client.post(
+        "/env/test_env/extend-lease",
+        data={"hour": 10},
+        headers={"X-AUTH-REQUEST-EMAIL": "test@owner.com"},
+    )
+
+    assert response.status_code == 500
+    assert "foo" in response.json()["detail"]
+
+
+@patch("kollie.app.ui.views.envs", autospec=True)
+def test_environment_index_shows_summaries(mock_envs, test_client):
+    mock_envs.list_envs.return_value = [
+        EnvironmentMetadata(
+            name="summarised_env",
+            owner_email="test@owner.com",
+            created_at=datetime.datetime(2024, 1, 1),
+            lease_exclusion_window=None,
+            summary=EnvironmentSummary(apps=["bar", "foo"], not_ready_apps=["foo"]),
+        ),
+        EnvironmentMetadata(
+            name="new_env",
+            owner_email="test@owner.com",
+            created_at=datetime.datetime(2024, 1, 1),
+            lease_exclusion_window=None,
+        ),
+    ]
+
+    response = test_client.get(
+        "/", headers={"X-AUTH-REQUEST-EMAIL": "test@owner.com"}
+    )
+
+    assert response.status_code == 200
+    assert "1/2 ready" in response.text
+    assert "new_env" in response.text
@@ -1,11 +1,18 @@
-from unittest.mock import patch
+import json
+from unittest.mock import Mock, patch
 from freezegun import freeze_time
 import pytest
+from kubernetes.client import ApiException
 from kollie.cluster.configmap import (
     create_env_configmap,
     delete_configmap,
     get_configmap,
     get_configmaps,
+    iter_configmap_pages,
+    owner_label_value,
+    set_configmap_labels,
+    set_configmap_owner,
+    update_env_configmap_data,
 )
 
 
@@ -33,6 +40,15 @@ def test_get_configmaps(mock_api):
     )
 
 
+def test_get_configmaps_without_label(mock_api):
+    mock_instance = mock_api.return_value
+    get_configmaps(label_filters={"test": "test", "missing": None})
+
+    mock_instance.list_namespaced_config_map.assert_called_once_with(
+        "kollie", label_selector="tails-app-stage=testing,test=test,!missing"
+    )
+
+
 @freeze_time("2024-01-19 15:03:08")
 @patch("kollie.cluster.configmap.client.V1ConfigMap", new=dict)
 @patch("kollie.cluster.configmap.client.V1ObjectMeta", new=dict)
@@ -60,6 +76,7 @@ def test_create_env_configmap(mock_api):
                     "tails-app-stage": "testing",
                     "tails-app-environment": "test-configmap",
                     "kollie.tails.com/managed-by": "kollie",
+                    "kollie.tails.com/owner-hash": "587d4c12fef06af41f2fdfa19a3e68443bf8a792",
                 },
             },
             "data": {
@@ -76,3 +93,117 @@ def test_delete_configmap(mock_api):
     mock_instance.delete_namespaced_config_map.assert_called_once_with(
         "test-configmap", "test-namespace"
     )
+
+
+def _env_configmap(data: dict, resource_version: str = "1"):
+    configmap = Mock()
+    configmap.data = {"json": json.dumps(data)}
+    configmap.metadata.resource_version = resource_version
+    return configmap
+
+
+def test_update_env_configmap_data_merges_into_json(mock_api):
+    mock_instance = mock_api.return_value
+    mock_instance.read_namespaced_config_map.return_value = _env_configmap(
+        {"env_name": "test-env", "apps": []}, resource_version="42"
+    )
+
+    update_env_configmap_data("test-env", {"apps": ["foo"], "lease_window": "x"})
+
+    mock_instance.patch_namespaced_config_map.assert_called_once_with(
+        "test-env",
+        "kollie",
+        {
+            "metadata": {"resourceVersion": "42"},
+            "data": {
+                "json": json.dumps(
+                    {"env_name": "test-env", "apps": ["foo"], "lease_window": "x"}
+                )
+            },
+        },
+    )
+
+
+def test_update_env_configmap_data_retries_conflicts(mock_api):
+    mock_instance = mock_api.return_value
+    mock_instance.read_namespaced_config_map.side_effect = [
+        _env_configmap({"apps": []}, resource_version="1"),
+        _env_configmap({"apps": [], "other": True}, resource_version="2"),
+    ]
+    mock_instance.patch_namespaced_config_map.side_effect = [
+        ApiException(status=409),
+        "patched",
+    ]
+
+    assert update_env_configmap_data("test-env", {"apps": ["foo"]}) == "patched"
+
+    last_body = mock_instance.patch_namespaced_config_map.call_args.args[2]
+    assert last_body["metadata"] == {"resourceVersion": "2"}
+    assert json.loads(last_body["data"]["json"]) == {"apps": ["foo"], "other": True}
+
+
+def test_update_env_configmap_data_missing_env(mock_api):
+    mock_instance = mock_api.return_value
+    mock_instance.read_namespaced_config_map.side_effect = ApiException(status=404)
+
+    assert update_env_configmap_data("test-env", {"apps": []}) is None
+    mock_instance.patch_namespaced_config_map.assert_not_called()
+
+
+def test_owner_label_value_is_a_valid_label_value():
+    value = owner_label_value("Test@Testing.com ")
+
+    assert value == owner_label_value("test@testing.com")
+    assert len(value) <= 63
+    assert value.isalnum()
+
+
+def test_set_configmap_labels(mock_api):
+    mock_instance = mock_api.return_value
+
+    set_configmap_labels("test-env", {"foo": "bar"})
+
+    mock_instance.patch_namespaced_config_map.assert_called_once_with(
+        "test-env", "kollie", {"metadata": {"labels": {"foo": "bar"}}}
+    )
+
+
+def test_set_configmap_owner_guards_with_resource_version(mock_api):
+    mock_instance = mock_api.return_value
+    configmap = Mock()
+    configmap.metadata.name = "test-env"
+    configmap.metadata.resource_version = "42"
+
+    set_configmap_owner(configmap, "test@testing.com", {"foo": None})
+
+    mock_instance.patch_namespaced_config_map.assert_called_once_with(
+        "test-env",
+        "kollie",
+        {
+            "metadata": {
+                "resourceVersion": "42",
+                "annotations": {"tails.com/owner": "test@testing.com"},
+                "labels": {
+                    "kollie.tails.com/owner-hash": "587d4c12fef06af41f2fdfa19a3e68443bf8a792",
+                    "foo": None,
+                },
+            }
+        },
+    )
+
+
+def test_iter_configmap_pages_follows_continue_tokens(mock_api):
+    mock_instance = mock_api.return_value
+    first, second = Mock(), Mock()
+    first.items, first.metadata._continue = ["a", "b"], "token"
+    second.items, second.metadata._continue = ["c"], None
+    mock_instance.list_namespaced_config_map.side_effect = [first, second]
+
+    pages = list(iter_configmap_pages({"test": "test"}, page_size=2))
+
+    assert pages == [["a", "b"], ["c"]]
+    assert mock_instance.list_namespaced_config_map.call_args_list[1].kwargs == {
+        "label_selector": "tails-app-stage=testing,test=test",
+        "limit": 2,
+        "_continue": "token",
+    }
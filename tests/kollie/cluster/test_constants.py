@@ -0,0 +1,82 @@
+import json
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from kollie.cluster import constants
+from kollie.cluster.constants import (
+    get_common_substitutions,
+    refresh_common_substitutions,
+)
+
+
+@pytest.fixture()
+def substitutions_file(tmp_path):
+    json_path = tmp_path / "common_substitutions.json"
+    json_path.write_text(json.dumps({"stage": "testing"}))
+
+    with (
+        patch.object(constants, "common_substitutions_path", str(json_path)),
+        patch.object(constants, "_common_substitutions", (None, {})),
+    ):
+        yield json_path
+
+
+def _replace(json_path, content: str):
+    replacement = json_path.parent / "replacement.json"
+    replacement.write_text(content)
+    replacement.replace(json_path)
+
+
+def test_refresh_common_substitutions(substitutions_file):
+    assert refresh_common_substitutions()
+    assert get_common_substitutions() == {"stage": "testing"}
+
+    assert not refresh_common_substitutions()
+
+    _replace(substitutions_file, json.dumps({"stage": "staging"}))
+
+    assert refresh_common_substitutions()
+    assert get_common_substitutions() == {"stage": "staging"}
+
+
+def test_refresh_common_substitutions_keeps_previous_on_error(substitutions_file):
+    refresh_common_substitutions()
+
+    _replace(substitutions_file, "[]")
+
+    with pytest.raises(ValueError):
+        refresh_common_substitutions()
+
+    assert get_common_substitutions() == {"stage": "testing"}
+    assert not refresh_common_substitutions()
+
+
+def test_import_does_not_load_common_substitutions(tmp_path):
+    # a fresh interpreter, as the modules are already imported here
+    result = subprocess.run(
+        [sys.executable, "-c", "import kollie.app.main"],
+        env={
+            **os.environ,
+            "KOLLIE_COMMON_SUBSTITUTIONS_JSON_PATH": str(tmp_path / "missing.json"),
+        },
+        capture_output=True,
+        text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+
+
+def test_common_substitutions_are_loaded_on_first_use(tmp_path):
+    json_path = tmp_path / "common_substitutions.json"
+    json_path.write_text(json.dumps({"stage": "testing"}))
+
+    with (
+        patch.object(constants, "common_substitutions_path", str(json_path)),
+        patch.object(constants, "_common_substitutions", None),
+    ):
+        assert get_common_substitutions() == {"stage": "testing"}
+        assert not refresh_common_substitutions()
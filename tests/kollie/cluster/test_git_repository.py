@@ -6,10 +6,12 @@ from kubernetes.client.exceptions import ApiException
 from kollie.cluster.constants import DEFAULT_FLUX_REPOSITORY, KOLLIE_NAMESPACE
 from kollie.cluster.git_repository import (
     create_git_repository, get_git_repository, GROUP, VERSION,
-    OBJECT_PLURAL
+    OBJECT_PLURAL, update_git_repository_include_paths
 )
 from kollie.exceptions import (
-    CreateCustomObjectsApiException, GetCustomObjectsApiException
+    CreateCustomObjectsApiException,
+    GetCustomObjectsApiException,
+    GitRepositorySyncTimeoutException,
 )
 
 
@@ -19,6 +21,12 @@ def mock_kube_client():
         yield mock_client
 
 
+@pytest.fixture(autouse=True)
+def narrow_paths():
+    with patch("kollie.cluster.git_repository_request.GIT_REPOSITORY_NARROW_PATHS", new=True):
+        yield
+
+
 @patch("kollie.cluster.git_repository_request.V1ObjectMeta", new=dict)
 @patch("kollie.cluster.git_repository_request.V1OwnerReference", new=dict)
 def test_create_git_repository(mock_kube_client):
@@ -102,6 +110,7 @@ def test_create_git_repository(mock_kube_client):
                 "ref": {"branch": branch},
                 "secretRef": {"name": DEFAULT_FLUX_REPOSITORY},
                 "url": f"ssh://git@github.com/tailsdotcom/{DEFAULT_FLUX_REPOSITORY}",
+                "ignore": "/*",
             },
         }
     )
@@ -196,3 +205,164 @@ def test_get_git_repository_error(mock_kube_client):
 
     # assert
     assert exc.value.custom_object == OBJECT_PLURAL
+
+
+def test_update_git_repository_include_paths_patches_changed_rules(mock_kube_client):
+    # arrange
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*"},
+    }
+
+    # act
+    update_git_repository_include_paths(
+        git_repository, include_paths=["./example-service/kollie"]
+    )
+
+    # assert
+    mock_api.patch_namespaced_custom_object.assert_called_once_with(
+        group=GROUP,
+        version=VERSION,
+        namespace=KOLLIE_NAMESPACE,
+        plural=OBJECT_PLURAL,
+        name="test-repo-test_env",
+        body={
+            "metadata": {"resourceVersion": "1"},
+            "spec": {"ignore": "/*\n!/example-service/"},
+        },
+    )
+
+
+def test_update_git_repository_include_paths_skips_unchanged_rules(mock_kube_client):
+    # arrange
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*\n!/example-service/"},
+    }
+
+    # act
+    result = update_git_repository_include_paths(
+        git_repository, include_paths=["./example-service/kollie"], wait=True
+    )
+
+    # assert
+    assert result == git_repository
+    mock_api.patch_namespaced_custom_object.assert_not_called()
+    mock_api.get_namespaced_custom_object.assert_not_called()
+
+
+@patch("kollie.cluster.git_repository._wait_for_observed_ignore", autospec=True)
+def test_update_git_repository_include_paths_waits_for_new_paths(
+    mock_wait, mock_kube_client
+):
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*\n!/example-service/"},
+    }
+
+    update_git_repository_include_paths(
+        git_repository,
+        include_paths=["./example-service/kollie", "./other-service/kollie"],
+        wait=True,
+    )
+
+    mock_wait.assert_called_once_with(
+        name="test-repo-test_env", ignore="/*\n!/example-service/\n!/other-service/"
+    )
+
+
+@patch("kollie.cluster.git_repository._wait_for_observed_ignore", autospec=True)
+def test_update_git_repository_include_paths_skips_wait_for_included_paths(
+    mock_wait, mock_kube_client
+):
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*\n!/example-service/\n!/other-service/"},
+    }
+
+    update_git_repository_include_paths(
+        git_repository, include_paths=["./example-service/kollie"], wait=True
+    )
+
+    mock_api.patch_namespaced_custom_object.assert_called_once()
+    mock_wait.assert_not_called()
+
+
+def test_update_git_repository_include_paths_recomputes_on_conflict(mock_kube_client):
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*"},
+    }
+    # a concurrent call added other-service in the meantime
+    mock_api.get_namespaced_custom_object.return_value = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "2"},
+        "spec": {"ignore": "/*\n!/other-service/"},
+    }
+    mock_api.patch_namespaced_custom_object.side_effect = [
+        ApiException(status=409),
+        {"patched": True},
+    ]
+
+    result = update_git_repository_include_paths(
+        git_repository, include_paths=["./example-service/kollie"], keep_included=True
+    )
+
+    assert result == {"patched": True}
+    retry = mock_api.patch_namespaced_custom_object.call_args_list[1].kwargs
+    assert retry["body"] == {
+        "metadata": {"resourceVersion": "2"},
+        "spec": {"ignore": "/*\n!/example-service/\n!/other-service/"},
+    }
+
+
+def test_update_git_repository_include_paths_calls_path_function_per_attempt(
+    mock_kube_client,
+):
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*\n!/example-service/\n!/other-service/"},
+    }
+    mock_api.get_namespaced_custom_object.return_value = git_repository
+    mock_api.patch_namespaced_custom_object.side_effect = [
+        ApiException(status=409),
+        {"patched": True},
+    ]
+    include_paths = MagicMock(
+        side_effect=[["./example-service/kollie"], ["./other-service/kollie"]]
+    )
+
+    update_git_repository_include_paths(git_repository, include_paths=include_paths)
+
+    assert include_paths.call_count == 2
+    assert mock_api.patch_namespaced_custom_object.call_args.kwargs["body"]["spec"] == {
+        "ignore": "/*\n!/other-service/"
+    }
+
+
+@patch("kollie.cluster.git_repository.IGNORE_SYNC_TIMEOUT_SECONDS", new=0)
+def test_update_git_repository_include_paths_raises_when_not_observed(
+    mock_kube_client,
+):
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    git_repository = {
+        "metadata": {"name": "test-repo-test_env", "resourceVersion": "1"},
+        "spec": {"ignore": "/*"},
+    }
+
+    with pytest.raises(GitRepositorySyncTimeoutException):
+        update_git_repository_include_paths(
+            git_repository, include_paths=["./example-service/kollie"], wait=True
+        )
+
+    mock_api.patch_namespaced_custom_object.assert_called_once()
@@ -1,7 +1,19 @@
 from unittest.mock import patch
 
+import pytest
+
 from kollie.cluster.constants import DEFAULT_FLUX_REPOSITORY, KOLLIE_NAMESPACE
-from kollie.cluster.git_repository_request import CreateGitRepositoryRequest
+from kollie.cluster.git_repository_request import (
+    CreateGitRepositoryRequest,
+    build_ignore_rules,
+    includes_all,
+)
+
+
+@pytest.fixture(autouse=True)
+def narrow_paths():
+    with patch("kollie.cluster.git_repository_request.GIT_REPOSITORY_NARROW_PATHS", new=True):
+        yield
 
 
 @patch("kollie.cluster.git_repository_request.V1ObjectMeta", new=dict)
@@ -50,5 +62,72 @@ def test_create_git_repository_request_body():
             "ref": {"branch": branch},
             "secretRef": {"name": DEFAULT_FLUX_REPOSITORY},
             "url": f"ssh://git@github.com/tailsdotcom/{DEFAULT_FLUX_REPOSITORY}",
+            "ignore": "/*",
         },
     }
+
+
+@pytest.mark.parametrize(
+    "app_paths,expected_rules",
+    [
+        pytest.param([], "/*", id="no apps"),
+        pytest.param(
+            ["./example-service/kollie"],
+            "/*\n!/example-service/",
+            id="app directory is included",
+        ),
+        pytest.param(
+            ["./apps/foo/testing", "apps/bar/testing/", "./apps/foo/kollie"],
+            "/*\n!/apps/\n/apps/*\n!/apps/bar/\n!/apps/foo/",
+            id="siblings of nested app directories are excluded",
+        ),
+        pytest.param(["./toplevel"], "/*\n!/toplevel/", id="top level path"),
+        pytest.param(["./foo/kollie", "./"], None, id="repository root"),
+    ],
+)
+def test_build_ignore_rules(app_paths, expected_rules):
+    assert build_ignore_rules(app_paths) == expected_rules
+
+
+@patch(
+    "kollie.cluster.git_repository_request.GIT_REPOSITORY_INCLUDE_PATHS",
+    new=["shared/components", "apps"],
+)
+def test_build_ignore_rules_always_includes_configured_paths():
+    assert build_ignore_rules(["./apps/foo/testing"]) == (
+        "/*\n!/apps/\n!/shared/\n/shared/*\n!/shared/components/"
+    )
+
+
+@patch("kollie.cluster.git_repository_request.GIT_REPOSITORY_NARROW_PATHS", new=False)
+def test_build_ignore_rules_uses_whole_repository_unless_narrowed():
+    assert build_ignore_rules(["./apps/foo/testing"]) is None
+
+
+@pytest.mark.parametrize(
+    "ignore,other_ignore,expected",
+    [
+        pytest.param(None, "/*\n!/apps/", True, id="whole repository"),
+        pytest.param("/*\n!/apps/", None, False, id="to whole repository"),
+        pytest.param(
+            "/*\n!/apps/\n/apps/*\n!/apps/bar/\n!/apps/foo/",
+            "/*\n!/apps/\n/apps/*\n!/apps/foo/",
+            True,
+            id="narrower",
+        ),
+        pytest.param(
+            "/*\n!/apps/",
+            "/*\n!/apps/\n/apps/*\n!/apps/foo/",
+            True,
+            id="included through a parent",
+        ),
+        pytest.param(
+            "/*\n!/apps/\n/apps/*\n!/apps/foo/",
+            "/*\n!/apps/\n/apps/*\n!/apps/bar/\n!/apps/foo/",
+            False,
+            id="wider",
+        ),
+    ],
+)
+def test_includes_all(ignore, other_ignore, expected):
+    assert includes_all(ignore, other_ignore) is expected
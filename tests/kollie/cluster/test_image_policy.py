@@ -1,19 +1,48 @@
 from unittest.mock import MagicMock, patch
-from pytest import fixture
+from pytest import fixture, raises
 
-from kollie.cluster.image_policy import create_owned_image_policy
+from kollie.cluster.image_policy import (
+    _latest_image_tags,
+    resolve_latest_image_tag,
+    retarget_image_policy,
+    subscribe_to_image_policy,
+    unsubscribe_from_image_policy,
+)
+from kollie.cluster.image_policy_spec import image_policy_key
+from kollie.exceptions import KollieImagePolicyException
 from kollie.persistence import AppTemplate, ImageRepositoryRef
 
 
 @fixture()
 def mock_kube_client():
     with patch("kollie.cluster.image_policy.client") as mock_client:
+        mock_client.ApiException = Exception
         yield mock_client
 
 
-def test_create_owned_image_policy(mock_kube_client):
-    """Test that the ImagePolicy is created with the correct parameters."""
-    app_template = AppTemplate(
+@fixture()
+def mock_api(mock_kube_client):
+    mock_api = MagicMock()
+    mock_kube_client.CustomObjectsApi.return_value = mock_api
+    yield mock_api
+
+
+@fixture(autouse=True)
+def clear_latest_image_tags():
+    _latest_image_tags.clear()
+    yield
+    _latest_image_tags.clear()
+
+
+@fixture()
+def mock_get_image_repository():
+    with patch("kollie.cluster.image_policy.get_image_repository") as mock:
+        yield mock
+
+
+@fixture()
+def app_template():
+    yield AppTemplate(
         app_name="test_app",
         label="test_label",
         git_repository_name="test-flux-repo",
@@ -24,12 +53,34 @@ def test_create_owned_image_policy(mock_kube_client):
         default_image_tag_prefix="default_image_tag_prefix",
     )
 
-    mock_api = MagicMock()
-    mock_kube_client.V1ObjectMeta = dict
-    mock_kube_client.V1OwnerReference = dict
-    mock_kube_client.CustomObjectsApi.return_value = mock_api
 
-    create_owned_image_policy(
+def _owner_reference(env_name: str, uid: str) -> dict:
+    return {
+        "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
+        "kind": "Kustomization",
+        "name": f"{env_name}-test_app",
+        "uid": uid,
+        "blockOwnerDeletion": True,
+    }
+
+
+def _shared_image_policy(owner_references: list[dict]) -> dict:
+    return {
+        "metadata": {
+            "name": "test_repo-abcdef",
+            "resourceVersion": "42",
+            "ownerReferences": owner_references,
+        }
+    }
+
+
+def test_subscribe_creates_shared_image_policy(mock_api, app_template):
+    """Test that the ImagePolicy is created with the correct parameters."""
+    mock_api.list_namespaced_custom_object.return_value = {"items": []}
+
+    key = image_policy_key(app_template.image_repository_ref, "test_tag_prefix")
+
+    subscribe_to_image_policy(
         env_name="test_env",
         image_tag_prefix="test_tag_prefix",
         app_template=app_template,
@@ -41,19 +92,23 @@ def test_create_owned_image_policy(mock_kube_client):
         "apiVersion": "image.toolkit.fluxcd.io/v1",
         "kind": "ImagePolicy",
         "metadata": {
-            "name": "test_env-test_app",
+            "name": f"test_repo-{key[:12]}",
             "labels": {
                 "tails-app-stage": "testing",
-                "tails-app-environment": "test_env",
-                "tails-app-name": "test_app",
+                "kollie.tails.com/managed-by": "kollie",
+                "kollie.tails.com/image-policy-key": key,
+            },
+            "annotations": {
+                "kollie.tails.com/image-repository": "test_namespace/test_repo",
+                "tails.com/tracking-image-tag-prefix": "test_tag_prefix",
             },
-            "owner_references": [
+            "ownerReferences": [
                 {
-                    "api_version": "kustomize.toolkit.fluxcd.io/v1",
+                    "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
+                    "kind": "test_kind",
                     "name": "test_env-test_app",
-                    "block_owner_deletion": True,
                     "uid": "test_uid",
-                    "kind": "test_kind",
+                    "blockOwnerDeletion": True,
                 }
             ],
         },
@@ -70,6 +125,13 @@ def test_create_owned_image_policy(mock_kube_client):
         },
     }
 
+    mock_api.list_namespaced_custom_object.assert_called_once_with(
+        group="image.toolkit.fluxcd.io",
+        version="v1",
+        namespace="kollie",
+        plural="imagepolicies",
+        label_selector=f"kollie.tails.com/image-policy-key={key}",
+    )
     mock_api.create_namespaced_custom_object.assert_called_once_with(
         group="image.toolkit.fluxcd.io",
         version="v1",
@@ -77,3 +139,293 @@ def test_create_owned_image_policy(mock_kube_client):
         plural="imagepolicies",
         body=expected_body,
     )
+
+
+def test_subscribe_adds_owner_to_existing_image_policy(mock_api, app_template):
+    existing_owner = _owner_reference("other_env", "other_uid")
+    mock_api.list_namespaced_custom_object.return_value = {
+        "items": [_shared_image_policy([existing_owner])]
+    }
+
+    subscribe_to_image_policy(
+        env_name="test_env",
+        image_tag_prefix="main",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    mock_api.create_namespaced_custom_object.assert_not_called()
+    mock_api.patch_namespaced_custom_object.assert_called_once_with(
+        group="image.toolkit.fluxcd.io",
+        version="v1",
+        namespace="kollie",
+        plural="imagepolicies",
+        name="test_repo-abcdef",
+        body={
+            "metadata": {
+                "resourceVersion": "42",
+                "ownerReferences": [
+                    existing_owner,
+                    _owner_reference("test_env", "test_uid"),
+                ],
+            }
+        },
+    )
+
+
+def test_subscribe_is_idempotent(mock_api, app_template):
+    image_policy = _shared_image_policy([_owner_reference("test_env", "test_uid")])
+    mock_api.list_namespaced_custom_object.return_value = {"items": [image_policy]}
+
+    result = subscribe_to_image_policy(
+        env_name="test_env",
+        image_tag_prefix="main",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    assert result == image_policy
+    mock_api.create_namespaced_custom_object.assert_not_called()
+    mock_api.patch_namespaced_custom_object.assert_not_called()
+
+
+def test_subscribe_retries_on_conflict(mock_kube_client, mock_api, app_template):
+    class ApiException(Exception):
+        def __init__(self, status):
+            self.status = status
+
+    mock_kube_client.ApiException = ApiException
+    created_meanwhile = _shared_image_policy([_owner_reference("other_env", "other_uid")])
+    mock_api.list_namespaced_custom_object.side_effect = [
+        {"items": []},
+        {"items": [created_meanwhile]},
+        {"items": [created_meanwhile]},
+    ]
+    mock_api.create_namespaced_custom_object.side_effect = ApiException(status=409)
+
+    subscribe_to_image_policy(
+        env_name="test_env",
+        image_tag_prefix="main",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    mock_api.create_namespaced_custom_object.assert_called_once()
+    mock_api.patch_namespaced_custom_object.assert_called_once()
+
+
+def test_subscribe_raises_on_api_error(mock_kube_client, mock_api, app_template):
+    class ApiException(Exception):
+        status = 500
+
+    mock_kube_client.ApiException = ApiException
+    mock_api.list_namespaced_custom_object.return_value = {"items": []}
+    mock_api.create_namespaced_custom_object.side_effect = ApiException()
+
+    with raises(KollieImagePolicyException):
+        subscribe_to_image_policy(
+            env_name="test_env",
+            image_tag_prefix="main",
+            app_template=app_template,
+            owner_uid="test_uid",
+        )
+
+
+def test_unsubscribe_removes_owner_reference(mock_api):
+    other_owner = _owner_reference("other_env", "other_uid")
+    mock_api.list_namespaced_custom_object.return_value = {
+        "items": [
+            _shared_image_policy(
+                [other_owner, _owner_reference("test_env", "test_uid")]
+            )
+        ]
+    }
+
+    unsubscribe_from_image_policy(image_policy_key="key", owner_uid="test_uid")
+
+    mock_api.delete_namespaced_custom_object.assert_not_called()
+    mock_api.patch_namespaced_custom_object.assert_called_once_with(
+        group="image.toolkit.fluxcd.io",
+        version="v1",
+        namespace="kollie",
+        plural="imagepolicies",
+        name="test_repo-abcdef",
+        body={"metadata": {"resourceVersion": "42", "ownerReferences": [other_owner]}},
+    )
+
+
+def test_unsubscribe_deletes_image_policy_without_subscribers(mock_api):
+    mock_api.list_namespaced_custom_object.return_value = {
+        "items": [_shared_image_policy([_owner_reference("test_env", "test_uid")])]
+    }
+
+    unsubscribe_from_image_policy(image_policy_key="key", owner_uid="test_uid")
+
+    mock_api.patch_namespaced_custom_object.assert_not_called()
+    mock_api.delete_namespaced_custom_object.assert_called_once()
+    assert (
+        mock_api.delete_namespaced_custom_object.call_args.kwargs["name"]
+        == "test_repo-abcdef"
+    )
+
+
+def test_subscribe_creates_image_policy_under_generated_name_when_name_is_taken(
+    mock_kube_client, mock_api, app_template
+):
+    class ApiException(Exception):
+        def __init__(self, status):
+            self.status = status
+
+    mock_kube_client.ApiException = ApiException
+    mock_api.list_namespaced_custom_object.return_value = {"items": []}
+    mock_api.create_namespaced_custom_object.side_effect = [
+        ApiException(status=409),
+        {"metadata": {"name": "test_repo-abcdef-x1"}},
+    ]
+
+    subscribe_to_image_policy(
+        env_name="test_env",
+        image_tag_prefix="main",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    metadata = mock_api.create_namespaced_custom_object.call_args.kwargs["body"]["metadata"]
+    key = image_policy_key(app_template.image_repository_ref, "main")
+    assert "name" not in metadata
+    assert metadata["generateName"] == f"test_repo-{key[:12]}-"
+
+
+def test_retarget_patches_unshared_image_policy_in_place(mock_api, app_template):
+    mock_api.list_namespaced_custom_object.side_effect = [
+        {"items": [_shared_image_policy([_owner_reference("test_env", "test_uid")])]},
+        {"items": []},
+    ]
+
+    result = retarget_image_policy(
+        previous_image_policy_key="previous_key",
+        image_tag_prefix="feature/foo",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    assert result == mock_api.patch_namespaced_custom_object.return_value
+    mock_api.create_namespaced_custom_object.assert_not_called()
+    mock_api.delete_namespaced_custom_object.assert_not_called()
+    mock_api.patch_namespaced_custom_object.assert_called_once_with(
+        group="image.toolkit.fluxcd.io",
+        version="v1",
+        namespace="kollie",
+        plural="imagepolicies",
+        name="test_repo-abcdef",
+        body={
+            "metadata": {
+                "resourceVersion": "42",
+                "labels": {
+                    "kollie.tails.com/image-policy-key": image_policy_key(
+                        app_template.image_repository_ref, "feature/foo"
+                    )
+                },
+                "annotations": {"tails.com/tracking-image-tag-prefix": "feature/foo"},
+            },
+            "spec": {
+                "filterTags": {
+                    "pattern": "^feature-foo-[a-fA-F0-9]+-(?P<ts>.*)",
+                    "extract": "$ts",
+                }
+            },
+        },
+    )
+
+
+def test_retarget_leaves_shared_image_policy_alone(mock_api, app_template):
+    mock_api.list_namespaced_custom_object.return_value = {
+        "items": [
+            _shared_image_policy(
+                [
+                    _owner_reference("other_env", "other_uid"),
+                    _owner_reference("test_env", "test_uid"),
+                ]
+            )
+        ]
+    }
+
+    result = retarget_image_policy(
+        previous_image_policy_key="previous_key",
+        image_tag_prefix="feature",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    assert result is None
+    mock_api.patch_namespaced_custom_object.assert_not_called()
+
+
+def test_retarget_leaves_image_policy_alone_when_new_prefix_is_tracked(
+    mock_api, app_template
+):
+    mock_api.list_namespaced_custom_object.side_effect = [
+        {"items": [_shared_image_policy([_owner_reference("test_env", "test_uid")])]},
+        {"items": [_shared_image_policy([_owner_reference("other_env", "other_uid")])]},
+    ]
+
+    result = retarget_image_policy(
+        previous_image_policy_key="previous_key",
+        image_tag_prefix="feature",
+        app_template=app_template,
+        owner_uid="test_uid",
+    )
+
+    assert result is None
+    mock_api.patch_namespaced_custom_object.assert_not_called()
+
+
+def test_resolve_latest_image_tag_from_shared_image_policy(
+    mock_api, mock_get_image_repository, app_template
+):
+    image_policy = _shared_image_policy([])
+    image_policy["status"] = {"latestRef": {"tag": "main-abc123-1700000000"}}
+    mock_api.list_namespaced_custom_object.return_value = {"items": [image_policy]}
+
+    assert resolve_latest_image_tag(app_template, "main") == "main-abc123-1700000000"
+    mock_get_image_repository.assert_not_called()
+
+
+def test_resolve_latest_image_tag_from_image_repository(
+    mock_api, mock_get_image_repository, app_template
+):
+    mock_api.list_namespaced_custom_object.return_value = {"items": []}
+    mock_get_image_repository.return_value = {
+        "status": {
+            "lastScanResult": {
+                "latestTags": [
+                    "main-abc123-1700000001",
+                    "main-def456-1700000100",
+                    "feature-abc123-1700000500",
+                    "main-latest",
+                ]
+            }
+        }
+    }
+
+    assert resolve_latest_image_tag(app_template, "main") == "main-def456-1700000100"
+
+
+def test_resolve_latest_image_tag_is_cached(
+    mock_api, mock_get_image_repository, app_template
+):
+    mock_api.list_namespaced_custom_object.return_value = {"items": []}
+    mock_get_image_repository.return_value = None
+
+    assert resolve_latest_image_tag(app_template, "main") is None
+    assert resolve_latest_image_tag(app_template, "main") is None
+
+    mock_get_image_repository.assert_called_once()
+
+
+def test_resolve_latest_image_tag_handles_api_errors(
+    mock_api, mock_get_image_repository, app_template
+):
+    mock_api.list_namespaced_custom_object.side_effect = Exception("boom")
+
+    assert resolve_latest_image_tag(app_template, "main") is None
@@ -1,7 +1,11 @@
 from unittest.mock import Mock
 import pytest
 
-from kollie.cluster.image_policy_spec import LatestTimestampImagePolicySpec
+from kollie.cluster.image_policy_spec import (
+    LatestTimestampImagePolicySpec,
+    image_policy_key,
+)
+from kollie.persistence import ImageRepositoryRef
 
 
 @pytest.mark.parametrize(
@@ -31,3 +35,16 @@ def test_for_image_tag_prefix_with_different_branches(branch, image_prefix):
     assert policy_spec.filterTags.pattern == f"^{image_prefix}-[a-fA-F0-9]+-(?P<ts>.*)"
     assert policy_spec.filterTags.extract == "$ts"
     assert policy_spec.policy == {"numerical": {"order": "asc"}}
+
+
+def test_image_policy_key_is_shared_by_equivalent_prefixes():
+    image_repository_ref = ImageRepositoryRef(name="test_repo", namespace="test_namespace")
+
+    key = image_policy_key(image_repository_ref, "feature/foo")
+
+    assert key == image_policy_key(image_repository_ref, "feature-foo")
+    assert key != image_policy_key(image_repository_ref, "main")
+    assert key != image_policy_key(
+        ImageRepositoryRef(name="other_repo", namespace="test_namespace"), "feature/foo"
+    )
+    assert len(key) <= 63
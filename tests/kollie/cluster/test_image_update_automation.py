@@ -171,6 +171,60 @@ def test_handle_image_update_policy_event_with_multiple_matching_image_policies(
     mock_logger.warning.assert_not_called()
 
 
+@patch("kollie.cluster.image_update_automation.find_image_policies")
+@patch("kollie.cluster.image_update_automation.applications")
+def test_handle_shared_image_policy_event_fans_out_latest_tag(
+    applications_mock, find_image_policies_mock, dummy_image_policy
+):
+    image_policy = {**dummy_image_policy}
+    image_policy["metadata"] = {
+        "name": "boofar-abcdef",
+        "labels": {
+            "tails-app-stage": "testing",
+            "kollie.tails.com/image-policy-key": "policy_key",
+        },
+    }
+
+    handle_image_policy_event({"type": "MODIFIED", "object": image_policy})
+
+    find_image_policies_mock.assert_not_called()
+    applications_mock.update_app.assert_not_called()
+    applications_mock.update_image_policy_subscribers.assert_called_once_with(
+        image_policy_key="policy_key", image_tag="main-latest"
+    )
+
+
+@patch("kollie.cluster.image_update_automation.applications")
+def test_handle_shared_image_policy_event_ignores_deleted_policies(
+    applications_mock, dummy_image_policy
+):
+    image_policy = {**dummy_image_policy}
+    image_policy["metadata"] = {
+        "name": "boofar-abcdef",
+        "labels": {"kollie.tails.com/image-policy-key": "policy_key"},
+    }
+
+    handle_image_policy_event({"type": "DELETED", "object": image_policy})
+
+    applications_mock.update_image_policy_subscribers.assert_not_called()
+
+
+@patch("kollie.cluster.image_update_automation.applications")
+def test_handle_shared_image_policy_event_ignores_outdated_status(
+    applications_mock, dummy_image_policy
+):
+    image_policy = {**dummy_image_policy}
+    image_policy["metadata"] = {
+        "name": "boofar-abcdef",
+        "generation": 2,
+        "labels": {"kollie.tails.com/image-policy-key": "policy_key"},
+    }
+
+    handle_image_policy_event({"type": "MODIFIED", "object": image_policy})
+
+    applications_mock.update_image_policy_subscribers.assert_not_called()
+
+
 @patch("kollie.cluster.image_update_automation.watch.Watch")
 @patch("kollie.cluster.image_update_automation.client.CustomObjectsApi")
 @patch("kollie.cluster.image_update_automation.handle_image_policy_event")
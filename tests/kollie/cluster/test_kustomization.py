@@ -1,7 +1,9 @@
 from copy import deepcopy
 from unittest.mock import Mock, patch, MagicMock
 
+import pytest
 from freezegun import freeze_time
+from kubernetes.client.exceptions import ApiException
 from pytest import fixture
 
 from kollie.cluster.kustomization import (
@@ -10,6 +12,11 @@ from kollie.cluster.kustomization import (
     delete_kustomizations,
 )
 from kollie.cluster.constants import KOLLIE_NAMESPACE
+from kollie.cluster.image_policy_spec import image_policy_key
+from kollie.exceptions import (
+    KollieKustomizationException,
+    KollieKustomizationExistsException,
+)
 
 DEFAULT_REQUST_BODY = {
     "apiVersion": "kustomize.toolkit.fluxcd.io/v1",
@@ -22,10 +29,10 @@ DEFAULT_REQUST_BODY = {
             "tails.com/owner": "test@test.local",
             "tails.com/tracking-image-tag-prefix": "main"
         },
-        "owner_references": [
+        "ownerReferences": [
             {
-                "api_version": "v1",
-                "block_owner_deletion": True,
+                "apiVersion": "v1",
+                "blockOwnerDeletion": True,
                 "kind": "ConfigMap",
                 "uid": "test_uid"
             }
@@ -99,8 +106,6 @@ def test_get_kustomizations(mock_kube_client):
 
 
 @freeze_time("2024-01-01")
-@patch("kollie.cluster.kustomization_request.V1ObjectMeta", new=dict)
-@patch("kollie.cluster.kustomization_request.V1OwnerReference", new=dict)
 def test_create_kustomization(mock_request_setup):
     # arrange
     testenv_name = "feature-foo"
@@ -123,7 +128,10 @@ def test_create_kustomization(mock_request_setup):
     req_body["metadata"]["name"] = f"{testenv_name}-{app_template.app_name}"
     req_body["metadata"]["labels"]["tails-app-environment"] = testenv_name
     req_body["metadata"]["labels"]["tails-app-name"] = app_template.app_name
-    req_body["metadata"]["owner_references"][0]["name"] = testenv_name
+    req_body["metadata"]["labels"]["kollie.tails.com/image-policy-key"] = image_policy_key(
+        app_template.image_repository_ref, app_template.default_image_tag_prefix
+    )
+    req_body["metadata"]["ownerReferences"][0]["name"] = testenv_name
     req_body["spec"]["sourceRef"]["name"] = app_template.git_repository_name
     req_body["spec"]["path"] = app_template.git_repository_path
     req_body["spec"]["postBuild"]["substitute"]["environment"] = testenv_name
@@ -138,8 +146,6 @@ def test_create_kustomization(mock_request_setup):
 
 
 @freeze_time("2024-01-01")
-@patch("kollie.cluster.kustomization_request.V1ObjectMeta", new=dict)
-@patch("kollie.cluster.kustomization_request.V1OwnerReference", new=dict)
 def test_create_kustomization_with_git_repository_name(mock_request_setup):
    # arrange
     testenv_name = "feature-foo"
@@ -164,7 +170,10 @@ def test_create_kustomization_with_git_repository_name(mock_request_setup):
     req_body["metadata"]["name"] = f"{testenv_name}-{app_template.app_name}"
     req_body["metadata"]["labels"]["tails-app-environment"] = testenv_name
     req_body["metadata"]["labels"]["tails-app-name"] = app_template.app_name
-    req_body["metadata"]["owner_references"][0]["name"] = testenv_name
+    req_body["metadata"]["labels"]["kollie.tails.com/image-policy-key"] = image_policy_key(
+        app_template.image_repository_ref, app_template.default_image_tag_prefix
+    )
+    req_body["metadata"]["ownerReferences"][0]["name"] = testenv_name
     req_body["spec"]["sourceRef"]["name"] = git_repository_name
     req_body["spec"]["sourceRef"]["namespace"] = KOLLIE_NAMESPACE
     req_body["spec"]["path"] = app_template.git_repository_path
@@ -201,3 +210,30 @@ def test_delete_kustomization(get_kustomizations_mock, mock_kube_client):
         namespace="kollie",
         name=kustomization_name,
     )
+
+
+@pytest.mark.parametrize(
+    "status, expected_exception",
+    [
+        (409, KollieKustomizationExistsException),
+        (500, KollieKustomizationException),
+    ],
+)
+def test_create_kustomization_api_errors(
+    mock_request_setup, mock_kube_client, status, expected_exception
+):
+    mock_kube_client.ApiException = ApiException
+    mock_request_setup["mock_api"].create_namespaced_custom_object.side_effect = (
+        ApiException(status=status)
+    )
+    app_template = mock_request_setup["app_template"]
+
+    with pytest.raises(expected_exception):
+        create_kustomization(
+            env_name="feature-foo",
+            image_tag_prefix="main",
+            app_template=app_template,
+            owner_email="test@test.local",
+            owner_uid="test_uid",
+            lease_exclusion_window=None,
+        )
@@ -1,22 +1,31 @@
 import pytest
 
 from datetime import datetime, timedelta, timezone
-from unittest.mock import Mock, patch
+from unittest.mock import Mock
 
 from freezegun import freeze_time
 from kollie.cluster.kustomization_request import (
+    _compiled_templates,
     calculate_uptime_window_string,
+    compile_kustomization_template,
     CreateKustomizationRequest,
     PatchKustomizationRequest,
     DEFAULT_LEASE_DAYS_EXTEND,
     DEFAULT_LEASE_HOUR_EXTEND,
 )
 from kollie.cluster.constants import KOLLIE_NAMESPACE
+from kollie.cluster.image_policy_spec import image_policy_key
+from kollie.persistence import AppTemplate, ImageRepositoryRef
+
+
+@pytest.fixture(autouse=True)
+def clear_compiled_templates():
+    _compiled_templates.clear()
+    yield
+    _compiled_templates.clear()
 
 
 @freeze_time("2024-01-01")
-@patch("kollie.cluster.kustomization_request.V1ObjectMeta", new=dict)
-@patch("kollie.cluster.kustomization_request.V1OwnerReference", new=dict)
 def test_kustomization_request_body():
     env_name = "test_env"
     image_tag_prefix = "test_image_tag_prefix"
@@ -24,6 +33,9 @@ def test_kustomization_request_body():
         app_name="test_app",
         git_repository_path="test_path",
         git_repository_name="test_name",
+        image_repository_ref=ImageRepositoryRef(
+            name="test_repo", namespace="test_namespace"
+        ),
     )
     owner_email = "test@owner.com"
     owner_uid = "test_uid"
@@ -46,18 +58,21 @@ def test_kustomization_request_body():
                 "tails-app-stage": "testing",
                 "tails-app-environment": env_name,
                 "tails-app-name": app_template.app_name,
+                "kollie.tails.com/image-policy-key": image_policy_key(
+                    app_template.image_repository_ref, image_tag_prefix
+                ),
             },
             "annotations": {
                 "tails.com/owner": owner_email,
                 "tails.com/tracking-image-tag-prefix": image_tag_prefix,
             },
-            "owner_references": [
+            "ownerReferences": [
                 {
-                    "api_version": "v1",
+                    "apiVersion": "v1",
                     "kind": "ConfigMap",
                     "name": "test_env",
                     "uid": "test_uid",
-                    "block_owner_deletion": True,
+                    "blockOwnerDeletion": True,
                 }
             ],
         },
@@ -85,8 +100,6 @@ def test_kustomization_request_body():
 
 
 @freeze_time("2024-01-01")
-@patch("kollie.cluster.kustomization_request.V1ObjectMeta", new=dict)
-@patch("kollie.cluster.kustomization_request.V1OwnerReference", new=dict)
 def test_kustomization_request_body_with_flux_repository_branch():
     env_name = "test_env"
     image_tag_prefix = "test_image_tag_prefix"
@@ -94,6 +107,9 @@ def test_kustomization_request_body_with_flux_repository_branch():
         app_name="test_app",
         git_repository_path="test_path",
         git_repository_name="test_name",
+        image_repository_ref=ImageRepositoryRef(
+            name="test_repo", namespace="test_namespace"
+        ),
     )
     owner_email = "test@owner.com"
     owner_uid = "test_uid"
@@ -116,6 +132,69 @@ def test_kustomization_request_body_with_flux_repository_branch():
     }
 
 
+def test_kustomization_request_body_with_image_tag():
+    request = CreateKustomizationRequest(
+        env_name="test_env",
+        app_template=Mock(
+            app_name="test_app",
+            git_repository_path="test_path",
+            git_repository_name="test_name",
+            image_repository_ref=ImageRepositoryRef(
+                name="test_repo", namespace="test_namespace"
+            ),
+        ),
+        image_tag_prefix="main",
+        owner_email="test@owner.com",
+        owner_uid="test_uid",
+        lease_exclusion_window=None,
+        image_tag="main-abc123-1700000000",
+    )
+
+    substitute = request.body["spec"]["postBuild"]["substitute"]
+    assert substitute["image_tag"] == "main-abc123-1700000000"
+
+
+def test_compile_kustomization_template_is_reused():
+    app_template = AppTemplate(
+        app_name="test_app",
+        label="Test App",
+        git_repository_name="test_name",
+        git_repository_path="test_path",
+        image_repository_ref=ImageRepositoryRef(
+            name="test_repo", namespace="test_namespace"
+        ),
+        default_image_tag_prefix="main",
+    )
+
+    compiled = compile_kustomization_template(app_template)
+
+    assert compile_kustomization_template(app_template) is compiled
+    assert compile_kustomization_template(app_template, "test-git-repo") is not compiled
+
+
+def test_compiled_kustomization_template_bodies_are_independent():
+    compiled = compile_kustomization_template(
+        Mock(
+            app_name="test_app",
+            git_repository_path="test_path",
+            git_repository_name="test_name",
+            image_repository_ref=ImageRepositoryRef(
+                name="test_repo", namespace="test_namespace"
+            ),
+        )
+    )
+
+    first = compiled.build("env-1", "main", "a@example.com", "uid-1", "window")
+    first["spec"]["postBuild"]["substitute"]["environment"] = "changed"
+    first["spec"]["sourceRef"]["name"] = "changed"
+
+    second = compiled.build("env-2", "main", "b@example.com", "uid-2", "window")
+
+    assert second["spec"]["postBuild"]["substitute"]["environment"] == "env-2"
+    assert second["spec"]["sourceRef"]["name"] == "test_name"
+    assert second["metadata"]["ownerReferences"][0]["uid"] == "uid-2"
+
+
 def test_kustomization_name():
     request = PatchKustomizationRequest("env", "app")
     assert request.kustomization_name == "env-app"
@@ -138,6 +217,15 @@ def test_set_image_tag_prefix():
     )
 
 
+def test_set_image_policy_key():
+    request = PatchKustomizationRequest("env", "app")
+    request.set_image_policy_key("policy_key")
+    assert (
+        request.body["metadata"]["labels"]["kollie.tails.com/image-policy-key"]
+        == "policy_key"
+    )
+
+
 def test_set_owner():
     request = PatchKustomizationRequest("env", "app")
     request.set_owner("new_owner_uid")
@@ -149,6 +237,14 @@ def test_set_owner():
     assert owner_ref["blockOwnerDeletion"] is True
 
 
+def test_set_owner_email():
+    request = PatchKustomizationRequest("env", "app")
+    request.set_owner_email("test@owner.com")
+    assert request.body == {
+        "metadata": {"annotations": {"tails.com/owner": "test@owner.com"}}
+    }
+
+
 def test_all_setters():
     request = PatchKustomizationRequest("env", "app")
     request.set_image_tag("new_image_tag")
@@ -8,7 +8,11 @@ from kollie.app.main import create_app
 
 @fixture
 def test_client():
-    with mock.patch("kollie.app.main.connect_to_cluster"):
+    with (
+        mock.patch("kollie.app.main.connect_to_cluster"),
+        mock.patch("kollie.app.main.start_config_watcher"),
+        mock.patch("kollie.app.main.start_preload"),
+    ):
         app = create_app()
         client = TestClient(app)
         yield client
@@ -116,6 +116,9 @@ class MagicAppTemplateSource:
     def __init__(self, app_names: list[str]) -> None:
         self._app_names = app_names
 
+    def fingerprint(self) -> None:
+        return None
+
     def load(self) -> list[AppTemplate]:
         return [
             AppTemplate(
@@ -1,4 +1,14 @@
-from kollie.persistence.app_bundle import AppBundle, AppBundleStore
+import json
+
+import pytest
+
+from kollie.persistence.app_bundle import (
+    AppBundle,
+    AppBundleStore,
+    get_app_bundle_report,
+    get_app_bundle_store,
+)
+from kollie.persistence.validation import CatalogValidationError
 from kollie.persistence.item_source import JsonItemSource
 
 
@@ -73,3 +83,75 @@ def test_app_bundle_store_get_bundle_not_found():
 
     # assert
     assert bundle is None
+
+
+@pytest.fixture()
+def app_templates_file(tmp_path, monkeypatch):
+    json_path = tmp_path / "app_templates.json"
+    json_path.write_text(
+        json.dumps(
+            [
+                {
+                    "app_name": "app1",
+                    "label": "App 1",
+                    "git_repository_path": "app1/testing",
+                    "image_repository_ref": {"name": "app1", "namespace": "flux"},
+                    "default_image_tag_prefix": "main",
+                }
+            ]
+        )
+    )
+    monkeypatch.setenv("KOLLIE_APP_TEMPLATE_JSON_PATH", str(json_path))
+
+    yield json_path
+
+
+def test_get_app_bundle_store_reloads_changed_file(
+    tmp_path, monkeypatch, app_templates_file
+):
+    json_path = tmp_path / "app_bundles.json"
+    json_path.write_text('[{"name": "bundle1", "description": "", "apps": []}]')
+    monkeypatch.setenv("KOLLIE_APP_BUNDLE_JSON_PATH", str(json_path))
+
+    store = get_app_bundle_store()
+
+    assert get_app_bundle_store() is store
+
+    replacement = tmp_path / "replacement.json"
+    replacement.write_text('[{"name": "bundle2", "description": "", "apps": []}]')
+    replacement.replace(json_path)
+
+    assert get_app_bundle_store().get_bundle("bundle2") is not None
+
+
+def test_get_app_bundle_store_keeps_bundles_when_file_is_broken(
+    tmp_path, monkeypatch, app_templates_file
+):
+    json_path = tmp_path / "app_bundles.json"
+    json_path.write_text('[{"name": "bundle1", "description": "", "apps": []}]')
+    monkeypatch.setenv("KOLLIE_APP_BUNDLE_JSON_PATH", str(json_path))
+
+    store = get_app_bundle_store()
+
+    replacement = tmp_path / "replacement.json"
+    replacement.write_text('[{"name": "bundle1"')
+    replacement.replace(json_path)
+
+    assert get_app_bundle_store() is store
+
+
+def test_get_app_bundle_store_rejects_unknown_apps(
+    tmp_path, monkeypatch, app_templates_file
+):
+    json_path = tmp_path / "app_bundles.json"
+    json_path.write_text(
+        '[{"name": "bundle1", "description": "", "apps": ["app1", "nope"]}]'
+    )
+    monkeypatch.setenv("KOLLIE_APP_BUNDLE_JSON_PATH", str(json_path))
+
+    with pytest.raises(CatalogValidationError):
+        get_app_bundle_store()
+
+    report = get_app_bundle_report()
+    assert report is not None
+    assert report.errors == ("bundle1 refers to unknown apps nope",)
@@ -1,3 +1,7 @@
+from dataclasses import FrozenInstanceError
+
+import pytest
+
 from kollie.persistence import AppTemplate, ImageRepositoryRef
 
 
@@ -70,3 +74,20 @@ def test_app_template_image_tag_prefix_default():
     assert app_template.image_repository_ref.name == "test_repo"
     assert app_template.image_repository_ref.namespace == "test_namespace"
     assert app_template.default_image_tag_prefix == "main"
+
+
+def test_app_template_is_immutable_and_precomputes_sanitised_prefix():
+    app_template = AppTemplate.from_dict(
+        {
+            "app_name": "test_app",
+            "label": "test_label",
+            "git_repository_path": "bob/builder",
+            "image_repository_ref": {"name": "test_repo", "namespace": "test_namespace"},
+            "default_image_tag_prefix": "feature/things",
+        }
+    )
+
+    assert app_template.sanitised_default_image_tag_prefix == "feature-things"
+
+    with pytest.raises(FrozenInstanceError):
+        app_template.label = "changed"  # type: ignore[misc]
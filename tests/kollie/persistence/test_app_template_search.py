@@ -0,0 +1,80 @@
+import pytest
+
+from kollie.persistence import AppTemplate, ImageRepositoryRef
+from kollie.persistence.app_template_search import AppTemplateIndex
+
+
+def _template(app_name: str, label: str) -> AppTemplate:
+    return AppTemplate(
+        app_name=app_name,
+        label=label,
+        git_repository_name="flux-test-repo",
+        git_repository_path="bob/builder",
+        image_repository_ref=ImageRepositoryRef(
+            name=f"{app_name}_repo", namespace="test_namespace"
+        ),
+        default_image_tag_prefix="main",
+    )
+
+
+@pytest.fixture
+def index():
+    return AppTemplateIndex(
+        [
+            _template("checkout-api", "Checkout API"),
+            _template("api", "Public API"),
+            _template("payments", "Payment Service"),
+            _template("pet-food-service", "Pet Food"),
+        ]
+    )
+
+
+def _names(page) -> list[str]:
+    return [template.app_name for template in page.items]
+
+
+def test_empty_query_returns_catalog_order(index):
+    page = index.search("")
+
+    assert _names(page) == ["checkout-api", "api", "payments", "pet-food-service"]
+    assert page.total == 4
+
+
+def test_matches_are_ranked(index):
+    # exact, then prefix of a name, then prefix of a word
+    assert _names(index.search("api")) == ["api", "checkout-api"]
+
+
+def test_matches_labels_case_insensitively(index):
+    assert _names(index.search("SERVICE")) == ["payments", "pet-food-service"]
+
+
+def test_substring_and_fuzzy_matches(index):
+    assert _names(index.search("ayment")) == ["payments"]
+    assert _names(index.search("pfs")) == ["pet-food-service"]
+
+
+def test_no_matches(index):
+    page = index.search("zzz")
+
+    assert page.items == ()
+    assert page.total == 0
+    assert not page.has_more
+
+
+def test_paging(index):
+    first = index.search("", offset=0, limit=3)
+    second = index.search("", offset=3, limit=3)
+
+    assert _names(first) == ["checkout-api", "api", "payments"]
+    assert first.has_more
+    assert _names(second) == ["pet-food-service"]
+    assert not second.has_more
+    assert second.total == 4
+
+
+def test_exclude(index):
+    page = index.search("api", exclude={"api"})
+
+    assert _names(page) == ["checkout-api"]
+    assert page.total == 1
@@ -53,3 +53,24 @@ def test_load_returns_empty_list_when_file_is_empty():
         source = JsonFileAppTemplateSource("/dummy_path/file.json")
         templates = source.load()
         assert templates == []
+
+
+def test_fingerprint_changes_when_file_is_replaced(tmp_path):
+    json_path = tmp_path / "app_templates.json"
+    json_path.write_text("[]")
+    source = JsonFileAppTemplateSource(str(json_path))
+
+    fingerprint = source.fingerprint()
+    assert fingerprint == source.fingerprint()
+
+    replacement = tmp_path / "replacement.json"
+    replacement.write_text("[ ]")
+    replacement.replace(json_path)
+
+    assert source.fingerprint() != fingerprint
+
+
+def test_fingerprint_is_none_for_missing_file():
+    source = JsonFileAppTemplateSource("/dummy_path/file.json")
+
+    assert source.fingerprint() is None
@@ -60,3 +60,89 @@ def test_get_app_template_store_with_valid_env():
 
     assert isinstance(store, AppTemplateStore)
     assert isinstance(store._source, JsonFileAppTemplateSource)
+
+
+def test_store_only_reloads_when_fingerprint_changes(mock_app_template_source):
+    mock_app_template_source.fingerprint.return_value = 1
+    store = AppTemplateStore(source=mock_app_template_source)
+
+    store.get_by_name("test_app")
+    store.get_by_name("test_app_2")
+    store.get_all()
+
+    assert mock_app_template_source.load.call_count == 1
+
+    mock_app_template_source.fingerprint.return_value = 2
+
+    store.get_by_name("test_app")
+
+    assert mock_app_template_source.load.call_count == 2
+
+
+def test_store_reloads_sources_without_fingerprint(mock_app_template_source):
+    mock_app_template_source.fingerprint.return_value = None
+    store = AppTemplateStore(source=mock_app_template_source)
+
+    store.get_by_name("test_app")
+    store.get_by_name("test_app")
+
+    assert mock_app_template_source.load.call_count == 2
+
+
+def test_get_by_name_returns_none_for_unknown_app(mock_app_template_source):
+    store = AppTemplateStore(source=mock_app_template_source)
+
+    assert store.get_by_name("unknown") is None
+
+
+def test_get_app_template_store_is_shared(monkeypatch):
+    monkeypatch.setenv("KOLLIE_APP_TEMPLATE_JSON_PATH", "shared_store.json")
+
+    assert get_app_template_store() is get_app_template_store()
+
+
+def test_store_keeps_templates_when_source_breaks(mock_app_template_source):
+    mock_app_template_source.fingerprint.return_value = 1
+    store = AppTemplateStore(source=mock_app_template_source)
+
+    assert store.get_by_name("test_app") is not None
+
+    mock_app_template_source.fingerprint.return_value = 2
+    mock_app_template_source.load.side_effect = ValueError("malformed JSON")
+
+    assert store.get_by_name("test_app") is not None
+    assert store.get_by_name("test_app") is not None
+
+    # the broken source isn't reparsed until it changes again
+    assert mock_app_template_source.load.call_count == 2
+
+
+def test_search(mock_app_template_source):
+    store = AppTemplateStore(source=mock_app_template_source)
+
+    page = store.search("label_2")
+
+    assert [template.app_name for template in page.items] == ["test_app_2"]
+    assert page.total == 1
+
+
+def test_search_index_is_rebuilt_on_reload(mock_app_template_source):
+    mock_app_template_source.fingerprint.return_value = 1
+    store = AppTemplateStore(source=mock_app_template_source)
+    assert store.search("new").total == 0
+
+    mock_app_template_source.fingerprint.return_value = 2
+    mock_app_template_source.load.return_value = [
+        AppTemplate(
+            app_name="new_app",
+            label="New app",
+            git_repository_name="flux-test-repo",
+            git_repository_path="bob/builder",
+            image_repository_ref=ImageRepositoryRef(
+                name="new_repo", namespace="test_namespace"
+            ),
+            default_image_tag_prefix="main",
+        )
+    ]
+
+    assert [template.app_name for template in store.search("new").items] == ["new_app"]
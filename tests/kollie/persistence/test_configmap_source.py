@@ -0,0 +1,133 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from kubernetes.client.models import V1ConfigMap, V1ConfigMapList, V1ListMeta, V1ObjectMeta
+
+from kollie.persistence import AppTemplateStore
+from kollie.persistence.app_bundle import AppBundle, AppBundleStore
+from kollie.persistence.configmap_source import (
+    ConfigMapAppTemplateSource,
+    ConfigMapCatalog,
+    ConfigMapItemSource,
+)
+
+
+def _template(app_name: str) -> dict:
+    return {
+        "app_name": app_name,
+        "label": f"{app_name} label",
+        "git_repository_path": f"{app_name}/testing",
+        "image_repository_ref": {"name": app_name, "namespace": "flux-system"},
+        "default_image_tag_prefix": "main",
+    }
+
+
+def _configmap(name: str, resource_version: str = "1", **data) -> V1ConfigMap:
+    return V1ConfigMap(
+        metadata=V1ObjectMeta(name=name, resource_version=resource_version),
+        data={key: value if isinstance(value, str) else json.dumps(value) for key, value in data.items()},
+    )
+
+
+@pytest.fixture()
+def catalog():
+    configmaps = V1ConfigMapList(
+        metadata=V1ListMeta(resource_version="10"),
+        items=[
+            _configmap(
+                "team-b",
+                **{"app_templates.json": [_template("b1")]},
+            ),
+            _configmap(
+                "team-a",
+                **{
+                    "app_templates.json": [_template("a1"), _template("a2")],
+                    "app_bundles.json": [
+                        {"name": "bundle", "description": "", "apps": ["a1", "b1"]}
+                    ],
+                },
+            ),
+        ],
+    )
+
+    with patch(
+        "kollie.persistence.configmap_source.list_configmaps_by_selector",
+        return_value=configmaps,
+    ) as mock_list:
+        catalog = ConfigMapCatalog(label_selector="kollie.tails.com/catalog=true")
+        catalog.load()
+
+        mock_list.assert_called_once_with("kollie.tails.com/catalog=true")
+        yield catalog
+
+
+def test_load_merges_configmaps_in_name_order(catalog):
+    assert [item["app_name"] for item in catalog.items("app_templates.json")] == [
+        "a1",
+        "a2",
+        "b1",
+    ]
+    assert catalog.items("unknown.json") == []
+
+
+def test_handle_event_updates_catalog(catalog):
+    version = catalog.version
+
+    catalog.handle_event(
+        {
+            "type": "MODIFIED",
+            "object": _configmap(
+                "team-b", "11", **{"app_templates.json": [_template("b2")]}
+            ),
+        }
+    )
+    catalog.handle_event({"type": "DELETED", "object": _configmap("team-a", "12")})
+
+    assert [item["app_name"] for item in catalog.items("app_templates.json")] == ["b2"]
+    assert catalog.version == version + 2
+
+
+def test_malformed_configmap_keeps_previous_content(catalog):
+    catalog.handle_event(
+        {
+            "type": "MODIFIED",
+            "object": _configmap("team-b", "11", **{"app_templates.json": "[{"}),
+        }
+    )
+
+    assert [item["app_name"] for item in catalog.items("app_templates.json")] == [
+        "a1",
+        "a2",
+        "b1",
+    ]
+
+
+def test_app_template_store_with_configmap_source(catalog):
+    store = AppTemplateStore(source=ConfigMapAppTemplateSource(catalog=catalog))
+
+    template = store.get_by_name("b1")
+    assert template is not None
+    assert template.git_repository_path == "b1/testing"
+
+    catalog.handle_event(
+        {
+            "type": "ADDED",
+            "object": _configmap(
+                "team-c", "11", **{"app_templates.json": [_template("c1")]}
+            ),
+        }
+    )
+
+    assert store.get_by_name("c1") is not None
+
+
+def test_app_bundle_store_with_configmap_source(catalog):
+    source = ConfigMapItemSource(
+        item_type=AppBundle, catalog=catalog, key="app_bundles.json"
+    )
+    store = AppBundleStore(app_bundle_source=source)
+
+    bundle = store.get_bundle("bundle")
+    assert bundle is not None
+    assert bundle.apps == ("a1", "b1")
@@ -0,0 +1,68 @@
+from kollie.persistence.validation import validate_app_bundles, validate_app_templates
+
+
+def _template(app_name: str, **overrides) -> dict:
+    return {
+        "app_name": app_name,
+        "label": f"{app_name} label",
+        "git_repository_path": f"{app_name}/testing",
+        "image_repository_ref": {"name": app_name, "namespace": "flux-system"},
+        "default_image_tag_prefix": "main",
+    } | overrides
+
+
+def test_validate_app_templates_valid():
+    report = validate_app_templates([_template("a"), _template("b")], source="test")
+
+    assert report.valid
+    assert report.item_count == 2
+
+
+def test_validate_app_templates_reports_every_error():
+    template_without_label = _template("b")
+    del template_without_label["label"]
+
+    report = validate_app_templates(
+        [
+            _template("a"),
+            template_without_label,
+            _template("a"),
+            _template("c", image_repository_ref={"name": "c"}),
+            "nope",
+        ],
+        source="test",
+    )
+
+    assert not report.valid
+    assert report.errors == (
+        "b is missing label",
+        "c image_repository_ref needs a name and namespace",
+        "item 4 is not an object",
+        "a is defined 2 times",
+    )
+
+
+def test_validate_app_templates_requires_list():
+    report = validate_app_templates({"app_name": "a"}, source="test")
+
+    assert report.errors == ("expected a JSON list",)
+
+
+def test_validate_app_bundles():
+    report = validate_app_bundles(
+        [
+            {"name": "one", "description": "", "apps": ["a", "b"]},
+            {"name": "two", "apps": ["a", "x"], "extra": True},
+            {"name": "one", "description": "", "apps": "a"},
+        ],
+        source="test",
+        known_app_names={"a", "b"},
+    )
+
+    assert report.errors == (
+        "two is missing description",
+        "two has unexpected keys extra",
+        "two refers to unknown apps x",
+        "one apps must be a list",
+        "one is defined 2 times",
+    )
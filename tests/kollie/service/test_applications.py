@@ -1,10 +1,36 @@
-from unittest.mock import Mock, patch
+from unittest.mock import ANY, Mock, patch
 import pytest
 from kollie.persistence.app_template import AppTemplate
-from kollie.exceptions import KollieConfigError
-from kollie.service.applications import create_app, update_app
+from kollie.exceptions import (
+    GitRepositorySyncTimeoutException,
+    KollieAppsCreationError,
+    KollieConfigError,
+    KollieImagePolicyException,
+    KollieKustomizationException,
+    KollieKustomizationExistsException,
+    KollieUnknownImageTagPrefixError,
+)
+from kollie.cluster.git_repository import update_git_repository_include_paths
+from kollie.persistence import AppTemplateStore
+from kollie.service.applications import (
+    create_app,
+    create_apps,
+    delete_app,
+    update_app,
+    update_image_policy_subscribers,
+)
 from kollie.service.envs import install_bundle
-from tests.kollie.helpers import build_configmaps
+from tests.kollie.helpers import (
+    MagicAppTemplateSource,
+    build_configmaps,
+    build_kustomization,
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_refresh_env_summary():
+    with patch("kollie.service.applications.refresh_env_summary") as mock:
+        yield mock
 
 
 @patch("kollie.service.applications.get_app_template_store")
@@ -58,15 +84,17 @@ def test_install_bundle_raises_config_error_when_env_not_found(
 
 
 @patch("kollie.service.applications.get_configmap", autospec=True)
-@patch("kollie.service.applications.create_owned_image_policy", autospec=True)
+@patch("kollie.service.applications.subscribe_to_image_policy", autospec=True)
 @patch("kollie.service.applications.create_kustomization", autospec=True)
 @patch("kollie.service.applications.get_app_template_store", autospec=True)
+@patch("kollie.service.applications.resolve_latest_image_tag", autospec=True)
 @patch("kollie.service.applications.get_git_repository", autospec=True)
 def test_create_app_defaults_to_branch_from_app_template(
     mock_get_git_repository,
+    mock_resolve_latest_image_tag,
     mock_get_app_template_store,
     mock_create_kustomization,
-    mock_create_owned_image_policy,
+    mock_subscribe_to_image_policy,
     mock_get_configmap,
 ):
     # arrange
@@ -95,6 +123,7 @@ def test_create_app_defaults_to_branch_from_app_template(
     )[0]
     mock_get_app_template_store.return_value.get_by_name.return_value = template
     mock_get_git_repository.return_value = None
+    mock_resolve_latest_image_tag.return_value = "mctest-abc123-1700000000"
 
     # act
     create_app(app_name="test_app", env_name="test_env", owner_email="test@owner.com")
@@ -112,9 +141,11 @@ def test_create_app_defaults_to_branch_from_app_template(
         owner_uid=mock_get_configmap.return_value.metadata.uid,
         lease_exclusion_window=None,
         git_repository_name=None,
+        image_tag="mctest-abc123-1700000000",
     )
+    mock_resolve_latest_image_tag.assert_called_once_with(template, "mctest")
 
-    mock_create_owned_image_policy.assert_called_once_with(
+    mock_subscribe_to_image_policy.assert_called_once_with(
         env_name="test_env",
         image_tag_prefix="mctest",
         app_template=template,
@@ -123,15 +154,22 @@ def test_create_app_defaults_to_branch_from_app_template(
 
 
 @patch("kollie.service.applications.get_configmap", autospec=True)
-@patch("kollie.service.applications.create_owned_image_policy", autospec=True)
+@patch("kollie.service.applications.subscribe_to_image_policy", autospec=True)
 @patch("kollie.service.applications.create_kustomization", autospec=True)
 @patch("kollie.service.applications.get_app_template_store", autospec=True)
+@patch("kollie.service.applications.get_kustomizations", autospec=True)
+@patch("kollie.service.applications.update_git_repository_include_paths", autospec=True)
+@patch("kollie.service.applications.resolve_latest_image_tag", autospec=True)
 @patch("kollie.service.applications.get_git_repository", autospec=True)
+@patch("kollie.service.applications.GIT_REPOSITORY_NARROW_PATHS", new=True)
 def test_create_app_with_git_repository_in_env(
     mock_get_git_repository,
+    mock_resolve_latest_image_tag,
+    mock_update_git_repository_include_paths,
+    mock_get_kustomizations,
     mock_get_app_template_store,
     mock_create_kustomization,
-    mock_create_owned_image_policy,
+    mock_subscribe_to_image_policy,
     mock_get_configmap,
 ):
     # arrange
@@ -159,6 +197,10 @@ def test_create_app_with_git_repository_in_env(
     )[0]
     mock_get_app_template_store.return_value.get_by_name.return_value = template
     mock_get_git_repository.return_value = {"metadata": {"name": "test-git-repo"}}
+    mock_resolve_latest_image_tag.return_value = None
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="test_env", app_name="other_app")
+    ]
 
     # act
     create_app(app_name="test_app", env_name="test_env", owner_email="test@owner.com")
@@ -172,4 +214,431 @@ def test_create_app_with_git_repository_in_env(
         owner_uid=mock_get_configmap.return_value.metadata.uid,
         lease_exclusion_window=None,
         git_repository_name="test-git-repo",
+        image_tag=None,
+    )
+    mock_update_git_repository_include_paths.assert_called_once_with(
+        mock_get_git_repository.return_value,
+        include_paths=["./other_app/testing", "bob/builder"],
+        wait=True,
+        keep_included=True,
+    )
+
+
+@patch("kollie.service.applications.get_configmap", autospec=True)
+@patch("kollie.service.applications.subscribe_to_image_policy", autospec=True)
+@patch("kollie.service.applications.create_kustomization", autospec=True)
+@patch("kollie.service.applications.get_app_template_store", autospec=True)
+@patch("kollie.service.applications.get_kustomizations", autospec=True)
+@patch("kollie.service.applications.update_git_repository_include_paths", autospec=True)
+@patch("kollie.service.applications.resolve_latest_image_tag", autospec=True)
+@patch("kollie.service.applications.get_git_repository", autospec=True)
+@patch("kollie.service.applications.GIT_REPOSITORY_NARROW_PATHS", new=True)
+def test_create_apps_reads_shared_inputs_once(
+    mock_get_git_repository,
+    mock_resolve_latest_image_tag,
+    mock_update_git_repository_include_paths,
+    mock_get_kustomizations,
+    mock_get_app_template_store,
+    mock_create_kustomization,
+    mock_subscribe_to_image_policy,
+    mock_get_configmap,
+):
+    mock_get_configmap.return_value = build_configmaps(
+        environments=[{"name": "test_env", "owner_email": "test@owner.com"}]
+    )[0]
+    mock_get_app_template_store.return_value = AppTemplateStore(
+        source=MagicAppTemplateSource(["foo", "bar", "baz"])
+    )
+    mock_get_git_repository.return_value = {"metadata": {"name": "test-git-repo"}}
+    mock_get_kustomizations.return_value = []
+    mock_resolve_latest_image_tag.return_value = None
+
+    create_apps(
+        env_name="test_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": None, "bar": "feature", "baz": None},
+        max_workers=3,
+    )
+
+    mock_get_configmap.assert_called_once_with(name="test_env")
+    mock_get_git_repository.assert_called_once_with("test_env")
+    mock_update_git_repository_include_paths.assert_called_once_with(
+        mock_get_git_repository.return_value,
+        include_paths=["bob/builder", "bob/builder", "bob/builder"],
+        wait=True,
+        keep_included=True,
+    )
+
+    assert mock_create_kustomization.call_count == 3
+    assert {
+        (call.kwargs["app_template"].app_name, call.kwargs["image_tag_prefix"])
+        for call in mock_create_kustomization.call_args_list
+    } == {("foo", "main"), ("bar", "feature"), ("baz", "main")}
+    assert mock_subscribe_to_image_policy.call_count == 3
+
+
+def test_create_apps_reuses_given_image_tags(create_apps_mocks):
+    create_apps_mocks.create_kustomization.side_effect = None
+
+    create_apps_mocks.resolve_latest_image_tag.return_value = "resolved"
+
+    create_apps(
+        env_name="test_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": "main", "bar": "feature"},
+        image_tags={"foo": "main-abc123"},
+    )
+
+    create_apps_mocks.resolve_latest_image_tag.assert_called_once_with(ANY, "feature")
+    assert {
+        call.kwargs["app_template"].app_name: call.kwargs["image_tag"]
+        for call in create_apps_mocks.create_kustomization.call_args_list
+    } == {"foo": "main-abc123", "bar": "resolved"}
+
+
+@pytest.fixture
+def create_apps_mocks():
+    with (
+        patch("kollie.service.applications.get_configmap", autospec=True) as get_configmap,
+        patch("kollie.service.applications.get_app_template_store", autospec=True) as get_store,
+        patch("kollie.service.applications.get_git_repository", autospec=True) as get_git_repository,
+        patch("kollie.service.applications.get_kustomizations", autospec=True) as get_kustomizations,
+        patch("kollie.service.applications.update_git_repository_include_paths", autospec=True) as update_paths,
+        patch("kollie.service.applications.resolve_latest_image_tag", autospec=True) as resolve,
+        patch("kollie.service.applications.create_kustomization", autospec=True) as create,
+        patch("kollie.service.applications.subscribe_to_image_policy", autospec=True) as subscribe,
+        patch("kollie.service.applications.delete_kustomizations", autospec=True) as delete,
+    ):
+        get_configmap.return_value = build_configmaps(
+            environments=[{"name": "test_env", "owner_email": "test@owner.com"}]
+        )[0]
+        get_store.return_value = AppTemplateStore(
+            source=MagicAppTemplateSource(["foo", "bar"])
+        )
+        get_git_repository.return_value = None
+        get_kustomizations.return_value = []
+        resolve.return_value = None
+
+        def create_kustomization(**kwargs):
+            app_name = kwargs["app_template"].app_name
+            if app_name == "foo":
+                raise KollieKustomizationException("create", app_name, "test_env")
+            return {"metadata": {"uid": f"{app_name}-uid"}}
+
+        create.side_effect = create_kustomization
+
+        yield Mock(
+            get_git_repository=get_git_repository,
+            get_kustomizations=get_kustomizations,
+            update_git_repository_include_paths=update_paths,
+            create_kustomization=create,
+            subscribe_to_image_policy=subscribe,
+            delete_kustomizations=delete,
+            resolve_latest_image_tag=resolve,
+        )
+
+
+def test_create_apps_rolls_back_created_apps_on_failure(
+    create_apps_mocks, mock_refresh_env_summary
+):
+    with pytest.raises(KollieAppsCreationError) as exc_info:
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None, "bar": None},
+            max_workers=2,
+        )
+
+    # every app is attempted before rolling back
+    assert create_apps_mocks.create_kustomization.call_count == 2
+    assert exc_info.value.failed == {
+        "foo": "Failed to create Kustomization for foo in test_env"
+    }
+    assert exc_info.value.rolled_back == ["bar"]
+    create_apps_mocks.delete_kustomizations.assert_called_once_with(
+        env_name="test_env", app_name="bar"
+    )
+    # the summary is refreshed once the env is back to its previous state
+    mock_refresh_env_summary.assert_called_once_with("test_env")
+
+
+@pytest.mark.parametrize(
+    "created_apps", [["bar"], []], ids=["rolled back", "every app failed"]
+)
+@patch("kollie.cluster.git_repository_request.GIT_REPOSITORY_NARROW_PATHS", new=True)
+@patch("kollie.cluster.git_repository._wait_for_observed_ignore", autospec=True)
+@patch("kollie.cluster.git_repository.client", autospec=True)
+@patch("kollie.service.applications.GIT_REPOSITORY_NARROW_PATHS", new=True)
+def test_create_apps_restores_git_repository_paths_on_failure(
+    mock_client, mock_wait, created_apps, create_apps_mocks
+):
+    original_ignore = "/*\n!/other_app/"
+    git_repository = {
+        "metadata": {"name": "test-git-repo", "resourceVersion": "1"},
+        "spec": {"ignore": original_ignore},
+    }
+    create_apps_mocks.get_git_repository.return_value = git_repository
+    create_apps_mocks.get_kustomizations.return_value = [
+        build_kustomization(env_name="test_env", app_name="other_app")
+    ]
+    # exercise the real rules so the restore is compared with the widened ones
+    create_apps_mocks.update_git_repository_include_paths.side_effect = (
+        update_git_repository_include_paths
+    )
+    mock_api = mock_client.CustomObjectsApi.return_value
+    mock_api.patch_namespaced_custom_object.side_effect = lambda **kwargs: {
+        "metadata": {"name": kwargs["name"], "resourceVersion": "2"},
+        "spec": kwargs["body"]["spec"],
+    }
+
+    def create_kustomization(**kwargs):
+        app_name = kwargs["app_template"].app_name
+        if app_name not in created_apps:
+            raise KollieKustomizationException("create", app_name, "test_env")
+        return {"metadata": {"uid": f"{app_name}-uid"}}
+
+    create_apps_mocks.create_kustomization.side_effect = create_kustomization
+
+    with pytest.raises(KollieAppsCreationError):
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None, "bar": None},
+        )
+
+    patched_rules = [
+        kwargs["body"]["spec"]["ignore"]
+        for _, kwargs in mock_api.patch_namespaced_custom_object.call_args_list
+    ]
+    assert patched_rules == ["/*\n!/bob/\n!/other_app/", original_ignore]
+
+
+@patch("kollie.service.applications.GIT_REPOSITORY_NARROW_PATHS", new=True)
+def test_create_apps_creates_nothing_when_paths_are_not_picked_up(create_apps_mocks):
+    git_repository = {"metadata": {"name": "test-git-repo"}}
+    create_apps_mocks.get_git_repository.return_value = git_repository
+    create_apps_mocks.update_git_repository_include_paths.side_effect = [
+        GitRepositorySyncTimeoutException(name="test-git-repo"),
+        git_repository,
+    ]
+
+    with pytest.raises(GitRepositorySyncTimeoutException):
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None, "bar": None},
+        )
+
+    create_apps_mocks.create_kustomization.assert_not_called()
+    # the rules are put back to the paths of the env's apps
+    assert create_apps_mocks.update_git_repository_include_paths.call_count == 2
+    restore = create_apps_mocks.update_git_repository_include_paths.call_args
+    assert restore.args == (git_repository,)
+    assert restore.kwargs["include_paths"]() == []
+
+
+def test_create_apps_without_rollback_keeps_created_apps(create_apps_mocks):
+    with pytest.raises(KollieAppsCreationError) as exc_info:
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None, "bar": None},
+            rollback=False,
+        )
+
+    assert exc_info.value.rolled_back == []
+    create_apps_mocks.delete_kustomizations.assert_not_called()
+
+
+def test_create_apps_adopts_existing_kustomizations(create_apps_mocks):
+    existing = build_kustomization(env_name="test_env", app_name="foo")
+    existing["metadata"]["uid"] = "foo-uid"
+    existing["metadata"]["annotations"]["tails.com/tracking-image-tag-prefix"] = "feature"
+    create_apps_mocks.create_kustomization.side_effect = KollieKustomizationExistsException(
+        app_name="foo", env_name="test_env"
+    )
+    create_apps_mocks.get_kustomizations.return_value = [existing]
+
+    creation = create_apps(
+        env_name="test_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": None},
+    )
+
+    assert creation.created == []
+    assert creation.existing == ["foo"]
+    assert creation.succeeded
+    create_apps_mocks.subscribe_to_image_policy.assert_called_once_with(
+        env_name="test_env",
+        image_tag_prefix="feature",
+        app_template=ANY,
+        owner_uid="foo-uid",
+    )
+
+
+def test_create_apps_deletes_kustomization_when_subscription_fails(create_apps_mocks):
+    create_apps_mocks.create_kustomization.side_effect = None
+    create_apps_mocks.create_kustomization.return_value = {"metadata": {"uid": "uid"}}
+    create_apps_mocks.subscribe_to_image_policy.side_effect = KollieImagePolicyException(
+        app_name="foo", env_name="test_env"
+    )
+
+    with pytest.raises(KollieAppsCreationError) as exc_info:
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None},
+            rollback=False,
+        )
+
+    assert list(exc_info.value.failed) == ["foo"]
+    create_apps_mocks.delete_kustomizations.assert_called_once_with(
+        env_name="test_env", app_name="foo"
+    )
+
+
+def test_create_apps_reports_unlabelled_existing_kustomizations(create_apps_mocks):
+    create_apps_mocks.create_kustomization.side_effect = KollieKustomizationExistsException(
+        app_name="foo", env_name="test_env"
+    )
+    create_apps_mocks.get_kustomizations.return_value = []
+
+    with pytest.raises(KollieAppsCreationError) as exc_info:
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None},
+        )
+
+    assert "isn't labelled" in exc_info.value.failed["foo"]
+    create_apps_mocks.subscribe_to_image_policy.assert_not_called()
+    create_apps_mocks.delete_kustomizations.assert_not_called()
+
+
+@patch("kollie.service.applications.get_configmap", autospec=True)
+@patch("kollie.service.applications.create_kustomization", autospec=True)
+@patch("kollie.service.applications.get_app_template_store", autospec=True)
+def test_create_apps_checks_every_template_first(
+    mock_get_app_template_store, mock_create_kustomization, mock_get_configmap
+):
+    mock_get_configmap.return_value = build_configmaps(
+        environments=[{"name": "test_env", "owner_email": "test@owner.com"}]
+    )[0]
+    mock_get_app_template_store.return_value = AppTemplateStore(
+        source=MagicAppTemplateSource(["foo"])
+    )
+
+    with pytest.raises(KollieConfigError):
+        create_apps(
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"foo": None, "missing": None},
+        )
+
+    mock_create_kustomization.assert_not_called()
+
+
+@patch("kollie.service.applications.patch_kustomization", autospec=True)
+@patch("kollie.service.applications.get_kustomizations", autospec=True)
+def test_update_image_policy_subscribers_patches_outdated_kustomizations(
+    mock_get_kustomizations, mock_patch_kustomization
+):
+    # arrange
+    up_to_date = build_kustomization(env_name="env1", app_name="test_app")
+    up_to_date["spec"]["postBuild"]["substitute"]["image_tag"] = "main-abc-2"
+    outdated = build_kustomization(env_name="env2", app_name="test_app")
+    outdated["spec"]["postBuild"]["substitute"]["image_tag"] = "main-abc-1"
+    never_deployed = build_kustomization(env_name="env3", app_name="test_app")
+
+    mock_get_kustomizations.return_value = [up_to_date, outdated, never_deployed]
+
+    # act
+    updated = update_image_policy_subscribers(
+        image_policy_key="policy_key", image_tag="main-abc-2"
     )
+
+    # assert
+    mock_get_kustomizations.assert_called_once_with(image_policy_key="policy_key")
+    assert updated == ["env2-test_app", "env3-test_app"]
+    assert mock_patch_kustomization.call_count == 2
+    for call in mock_patch_kustomization.call_args_list:
+        request = call.args[0]
+        assert request.body == {
+            "spec": {"postBuild": {"substitute": {"image_tag": "main-abc-2"}}}
+        }
+
+
+@patch("kollie.service.applications.delete_kustomizations", autospec=True)
+@patch("kollie.service.applications.get_kustomizations", autospec=True)
+@patch("kollie.service.applications.update_git_repository_include_paths", autospec=True)
+@patch("kollie.service.applications.get_git_repository", autospec=True)
+@patch("kollie.service.applications.GIT_REPOSITORY_NARROW_PATHS", new=True)
+def test_delete_app_excludes_app_path_from_git_repository(
+    mock_get_git_repository,
+    mock_update_git_repository_include_paths,
+    mock_get_kustomizations,
+    mock_delete_kustomizations,
+):
+    # arrange
+    mock_get_git_repository.return_value = {"metadata": {"name": "test-git-repo"}}
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="test_env", app_name="deleted_app"),
+        build_kustomization(env_name="test_env", app_name="other_app"),
+    ]
+
+    # act
+    delete_app(env_name="test_env", app_name="deleted_app")
+
+    # assert
+    mock_delete_kustomizations.assert_called_once_with(
+        env_name="test_env", app_name="deleted_app"
+    )
+    mock_update_git_repository_include_paths.assert_called_once_with(
+        mock_get_git_repository.return_value, include_paths=ANY
+    )
+    # the paths are read again if the git repository changed meanwhile
+    include_paths = mock_update_git_repository_include_paths.call_args.kwargs[
+        "include_paths"
+    ]
+    assert include_paths() == ["./other_app/testing"]
+
+
+@patch("kollie.service.applications.delete_kustomizations", autospec=True)
+@patch("kollie.service.applications.get_kustomizations", autospec=True)
+@patch("kollie.service.applications.get_git_repository", autospec=True)
+def test_delete_app_skips_git_repository_unless_narrowing(
+    mock_get_git_repository, mock_get_kustomizations, mock_delete_kustomizations
+):
+    delete_app(env_name="test_env", app_name="deleted_app")
+
+    mock_delete_kustomizations.assert_called_once_with(
+        env_name="test_env", app_name="deleted_app"
+    )
+    mock_get_git_repository.assert_not_called()
+    mock_get_kustomizations.assert_not_called()
+
+
+@patch("kollie.service.applications.get_configmap", autospec=True)
+@patch("kollie.service.applications.create_kustomization", autospec=True)
+@patch("kollie.service.applications.get_app_template_store", autospec=True)
+@patch("kollie.service.applications.is_known_image_tag_prefix", autospec=True)
+def test_create_app_rejects_unknown_image_tag_prefix(
+    mock_is_known_image_tag_prefix,
+    mock_get_app_template_store,
+    mock_create_kustomization,
+    mock_get_configmap,
+):
+    mock_get_configmap.return_value = build_configmaps(
+        environments=[{"name": "test_env", "owner_email": "test@owner.com"}]
+    )[0]
+    mock_is_known_image_tag_prefix.return_value = False
+
+    with pytest.raises(KollieUnknownImageTagPrefixError):
+        create_app(
+            app_name="test_app",
+            env_name="test_env",
+            owner_email="test@owner.com",
+            image_tag_prefix="typo",
+        )
+
+    mock_create_kustomization.assert_not_called()
@@ -0,0 +1,91 @@
+import json
+from unittest.mock import patch
+
+import pytest
+from freezegun import freeze_time
+
+from kollie.models import EnvironmentSummary
+from kollie.service.env_summary import refresh_env_summaries, refresh_env_summary
+from tests.kollie.helpers import build_configmaps, build_kustomization
+
+
+@pytest.fixture
+def mock_update_env_configmap_data():
+    with patch(
+        "kollie.service.env_summary.update_env_configmap_data", autospec=True
+    ) as mock:
+        yield mock
+
+
+@freeze_time("2024-12-06")
+def test_refresh_env_summary_stores_summary(mock_update_env_configmap_data):
+    kustomizations = [
+        build_kustomization(env_name="test_env", app_name="foo"),
+        build_kustomization(env_name="test_env", app_name="bar"),
+    ]
+
+    summary = refresh_env_summary("test_env", kustomizations)
+
+    assert summary is not None
+    assert summary.apps == ["bar", "foo"]
+    mock_update_env_configmap_data.assert_called_once_with(
+        "test_env",
+        {
+            "apps": ["bar", "foo"],
+            "not_ready_apps": [],
+            "lease_window": None,
+            "summary_updated_at": "2024-12-06T00:00:00+00:00",
+        },
+    )
+
+
+@patch("kollie.service.env_summary.get_kustomizations", autospec=True)
+def test_refresh_env_summary_lists_kustomizations(
+    mock_get_kustomizations, mock_update_env_configmap_data
+):
+    mock_get_kustomizations.return_value = []
+
+    refresh_env_summary("test_env")
+
+    mock_get_kustomizations.assert_called_once_with(env_name="test_env")
+
+
+def test_refresh_env_summary_does_not_raise(mock_update_env_configmap_data):
+    mock_update_env_configmap_data.side_effect = Exception("boom")
+
+    assert refresh_env_summary("test_env", []) is None
+
+
+@patch("kollie.service.env_summary.get_configmaps", autospec=True)
+@patch("kollie.service.env_summary.get_kustomizations", autospec=True)
+def test_refresh_env_summaries_only_writes_changed_summaries(
+    mock_get_kustomizations, mock_get_configmaps, mock_update_env_configmap_data
+):
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="unchanged", app_name="foo"),
+        build_kustomization(env_name="changed", app_name="foo"),
+        build_kustomization(env_name="changed", app_name="bar"),
+    ]
+    configmaps = build_configmaps(
+        [
+            {"name": "unchanged", "owner_email": "test@owner.com"},
+            {"name": "changed", "owner_email": "test@owner.com"},
+            {"name": "new", "owner_email": "test@owner.com"},
+        ]
+    )
+    # "new" has never been summarised
+    for configmap in configmaps[:2]:
+        body = json.loads(configmap.data["json"])
+        body.update(EnvironmentSummary(apps=["foo"]).to_dict())
+        body["summary_updated_at"] = "2024-12-01T00:00:00+00:00"
+        configmap.data = {"json": json.dumps(body)}
+    mock_get_configmaps.return_value = configmaps
+
+    updated = refresh_env_summaries()
+
+    assert updated == ["changed", "new"]
+    mock_get_kustomizations.assert_called_once_with()
+    assert [
+        (call.args[0], call.args[1]["apps"])
+        for call in mock_update_env_configmap_data.call_args_list
+    ] == [("changed", ["bar", "foo"]), ("new", [])]
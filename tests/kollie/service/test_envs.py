@@ -1,19 +1,63 @@
+import json
 import pytest
 import os
 
 from datetime import datetime, timezone
 from freezegun import freeze_time
-from unittest.mock import MagicMock, Mock, patch
+from kubernetes.client import ApiException
+from unittest.mock import Mock, call, patch
 
-from kollie.exceptions import KollieConfigError, KollieException
-from kollie.models import KollieEnvironment, _datetime_from_str
+from kollie.exceptions import (
+    KollieConfigError,
+    KollieException,
+    KollieKustomizationException,
+)
+from kollie.models import (
+    AppSnapshot,
+    EnvironmentMetadata,
+    EnvironmentSnapshot,
+    EnvironmentSummary,
+    KollieApp,
+    KollieEnvironment,
+    _datetime_from_str,
+)
 from kollie.persistence.app_bundle import AppBundle
 from kollie.persistence.app_template_store import AppTemplateStore
 from kollie.service.applications import create_app, update_app
 
-from kollie.service.envs import create_env, install_bundle, extend_lease
+from kollie.service.envs import (
+    BUNDLE_INSTALL_CONCURRENCY,
+    EnvSelector,
+    backfill_owner_labels,
+    clone_env,
+    create_env,
+    delete_envs,
+    export_env,
+    extend_lease,
+    extend_leases,
+    import_env,
+    install_bundle,
+    list_envs,
+    rebuild_configs,
+    select_envs,
+)
+from kollie.cluster.configmap import owner_label_value
+from kollie.cluster.image_policy_spec import image_policy_key
 from kollie.cluster.kustomization_request import PatchKustomizationRequest
-from tests.kollie.helpers import MagicAppTemplateSource, build_configmaps
+from tests.kollie.helpers import (
+    MagicAppTemplateSource,
+    build_configmaps,
+    build_kustomization,
+)
+
+
+@pytest.fixture(autouse=True)
+def mock_refresh_env_summary():
+    with (
+        patch("kollie.service.envs.refresh_env_summary") as mock,
+        patch("kollie.service.applications.refresh_env_summary"),
+    ):
+        yield mock
 
 
 @pytest.fixture(scope="function")
@@ -35,8 +79,8 @@ def mock_create_kustomization():
 
 
 @pytest.fixture(scope="function")
-def mock_create_owned_image_policy():
-    with patch("kollie.service.applications.create_owned_image_policy") as mock:
+def mock_subscribe_to_image_policy():
+    with patch("kollie.service.applications.subscribe_to_image_policy") as mock:
         yield mock
 
 
@@ -128,7 +172,7 @@ def test_create_env_lease_exclusion(
 @patch("kollie.service.applications.get_configmap")
 def test_create_app_template_not_found_raises_config_error(
     mock_get_configmap,
-    mock_create_owned_image_policy,
+    mock_subscribe_to_image_policy,
     mock_create_kustomization,
     mock_get_app_template_store,
 ):
@@ -157,21 +201,27 @@ def test_create_app_template_not_found_raises_config_error(
     )
 
     mock_create_kustomization.assert_not_called()
-    mock_create_owned_image_policy.assert_not_called()
+    mock_subscribe_to_image_policy.assert_not_called()
 
 
+@patch("kollie.service.applications.retarget_image_policy")
+@patch("kollie.service.applications.unsubscribe_from_image_policy")
 @patch("kollie.service.applications.patch_kustomization")
 @patch("kollie.service.applications.delete_image_policies")
 def test_update_branch(
     mock_delete_image_policies,
     mock_patch_kustomization,
+    mock_unsubscribe_from_image_policy,
+    mock_retarget_image_policy,
     mock_get_app_template_store,
-    mock_create_owned_image_policy,
+    mock_subscribe_to_image_policy,
     mock_get_app,
 ):
-    mock_get_app_template_store.return_value.get_by_name.return_value = MagicMock()
+    template = MagicAppTemplateSource(app_names=["test_app"]).load()[0]
+    mock_get_app_template_store.return_value.get_by_name.return_value = template
     mock_patch_kustomization.return_value = {"metadata": {"uid": "test_uid"}}
-    mock_get_app.return_value = Mock()
+    mock_retarget_image_policy.return_value = None
+    mock_get_app.return_value = Mock(image_tag_prefix="staging")
 
     update_app(env_name="test_env", app_name="test_app", attributes=dict(image_tag_prefix="main"))
 
@@ -183,18 +233,61 @@ def test_update_branch(
         PatchKustomizationRequest(
             env_name="test_env",
             app_name="test_app",
-            body={"metadata": {"annotations": {"tails.com/tracking-image-tag-prefix": "main"}}},
+            body={
+                "metadata": {
+                    "annotations": {"tails.com/tracking-image-tag-prefix": "main"},
+                    "labels": {
+                        "kollie.tails.com/image-policy-key": image_policy_key(
+                            template.image_repository_ref, "main"
+                        )
+                    },
+                }
+            },
         )
     )
     mock_delete_image_policies.assert_called_once_with(
         env_name="test_env", app_name="test_app"
     )
-    mock_create_owned_image_policy.assert_called_once_with(
+    mock_subscribe_to_image_policy.assert_called_once_with(
         env_name="test_env",
         image_tag_prefix="main",
-        app_template=mock_get_app_template_store.return_value.get_by_name.return_value,
+        app_template=template,
         owner_uid=mock_patch_kustomization.return_value["metadata"]["uid"],
     )
+    mock_unsubscribe_from_image_policy.assert_called_once_with(
+        image_policy_key=image_policy_key(template.image_repository_ref, "staging"),
+        owner_uid="test_uid",
+    )
+
+
+@patch("kollie.service.applications.retarget_image_policy")
+@patch("kollie.service.applications.unsubscribe_from_image_policy")
+@patch("kollie.service.applications.patch_kustomization")
+@patch("kollie.service.applications.delete_image_policies")
+def test_update_branch_retargets_unshared_image_policy(
+    mock_delete_image_policies,
+    mock_patch_kustomization,
+    mock_unsubscribe_from_image_policy,
+    mock_retarget_image_policy,
+    mock_get_app_template_store,
+    mock_subscribe_to_image_policy,
+    mock_get_app,
+):
+    template = MagicAppTemplateSource(app_names=["test_app"]).load()[0]
+    mock_get_app_template_store.return_value.get_by_name.return_value = template
+    mock_patch_kustomization.return_value = {"metadata": {"uid": "test_uid"}}
+    mock_get_app.return_value = Mock(image_tag_prefix="staging")
+
+    update_app(env_name="test_env", app_name="test_app", attributes=dict(image_tag_prefix="main"))
+
+    mock_retarget_image_policy.assert_called_once_with(
+        previous_image_policy_key=image_policy_key(template.image_repository_ref, "staging"),
+        image_tag_prefix="main",
+        app_template=template,
+        owner_uid="test_uid",
+    )
+    mock_subscribe_to_image_policy.assert_not_called()
+    mock_unsubscribe_from_image_policy.assert_not_called()
 
 
 def test_update_image_tag_refix_app_template_not_found_raises_config_error(
@@ -273,9 +366,9 @@ def test_datetime_from_str_formats(date_str, expected_dt, raise_exception):
 
 @patch("kollie.service.envs.get_app_template_store")
 @patch("kollie.service.envs.get_app_bundle_store")
-@patch("kollie.service.envs.create_app")
+@patch("kollie.service.envs.create_apps")
 def test_install_bundle_creates_expected_apps(
-    mock_create_app,
+    mock_create_apps,
     mock_get_app_bundle_store,
     mock_get_app_template_store,
     mock_get_env,
@@ -283,10 +376,12 @@ def test_install_bundle_creates_expected_apps(
     # arrange
     app_names = ["foo", "bar", "baz"]
 
+    installed_app = Mock()
+    installed_app.name = "foo"
     mock_get_env.return_value = KollieEnvironment(
         name="test_env",
         owner_email="test@owner.com",
-        apps=[Mock(name="foo")],
+        apps=[installed_app],
         flux_repository_branch=None
     )
 
@@ -306,40 +401,569 @@ def test_install_bundle_creates_expected_apps(
     )
 
     # assert
-    assert mock_create_app.call_count == 3
+    mock_create_apps.assert_called_once_with(
+        env_name="test_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"bar": "main", "baz": "main"},
+        max_workers=BUNDLE_INSTALL_CONCURRENCY,
+        rollback=True,
+    )
 
-    for app_name in app_names:
-        mock_create_app.assert_any_call(
-            app_name=app_name,
-            image_tag_prefix="main",
-            env_name="test_env",
+
+@patch("kollie.service.envs.validate_apps")
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.create_env")
+@patch("kollie.service.envs.create_apps")
+def test_clone_env_reuses_apps_and_image_tags(
+    mock_create_apps,
+    mock_create_env,
+    mock_get_configmap,
+    mock_validate_apps,
+    mock_get_env,
+):
+    mock_get_env.return_value = KollieEnvironment(
+        name="source_env",
+        owner_email="source@owner.com",
+        apps=[
+            KollieApp(
+                name="foo",
+                env_name="source_env",
+                owner_email="source@owner.com",
+                image_tag="main-abc123",
+                image_tag_prefix="main",
+            ),
+            KollieApp(
+                name="bar",
+                env_name="source_env",
+                owner_email="source@owner.com",
+                image_tag=None,
+                image_tag_prefix="feature",
+            ),
+        ],
+        flux_repository_branch="flux-branch",
+    )
+    mock_get_configmap.return_value = None
+
+    result = clone_env(
+        source_env_name="source_env",
+        target_env_name="target_env",
+        owner_email="test@owner.com",
+    )
+
+    assert result == mock_create_apps.return_value
+    mock_validate_apps.assert_called_once_with(
+        "target_env", {"foo": "main", "bar": "feature"}
+    )
+    mock_create_env.assert_called_once_with(
+        env_name="target_env",
+        owner_email="test@owner.com",
+        flux_repo_branch="flux-branch",
+        lease_exclusion_window=None,
+    )
+    mock_create_apps.assert_called_once_with(
+        env_name="target_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": "main", "bar": "feature"},
+        image_tags={"foo": "main-abc123", "bar": None},
+        max_workers=BUNDLE_INSTALL_CONCURRENCY,
+        rollback=True,
+    )
+
+
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.create_env")
+def test_clone_env_refuses_existing_target(
+    mock_create_env, mock_get_configmap, mock_get_env
+):
+    mock_get_env.return_value = KollieEnvironment(
+        name="source_env",
+        owner_email="source@owner.com",
+        apps=[],
+        flux_repository_branch=None,
+    )
+    mock_get_configmap.return_value = Mock()
+
+    with pytest.raises(KollieConfigError):
+        clone_env(
+            source_env_name="source_env",
+            target_env_name="target_env",
             owner_email="test@owner.com",
         )
 
+    mock_create_env.assert_not_called()
 
-@freeze_time('2024-12-06')
-@patch("kollie.service.envs.update_app")
-def test_extend_lease_calls_update_app_with_expected_args(
-    mock_update_app,
-    mock_get_app,
-    mock_get_env,
+
+def test_clone_env_refuses_missing_source(mock_get_env):
+    mock_get_env.return_value = None
+
+    with pytest.raises(KollieConfigError):
+        clone_env(
+            source_env_name="source_env",
+            target_env_name="target_env",
+            owner_email="test@owner.com",
+        )
+
+
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.get_git_repository")
+@patch("kollie.service.envs.get_kustomizations")
+def test_export_env(
+    mock_get_kustomizations, mock_get_git_repository, mock_get_configmap
 ):
-    app_name = Mock(name="foo")
-    mock_get_env.return_value = KollieEnvironment(
+    mock_get_configmap.return_value = build_configmaps(
+        environments=[
+            {
+                "name": "test_env",
+                "owner_email": "test@owner.com",
+                "lease_exclusion_window": "Mon-Fri 07:00-19:00 Europe/London",
+            }
+        ]
+    )[0]
+    mock_get_git_repository.return_value = {"spec": {"ref": {"branch": "flux-branch"}}}
+    foo = build_kustomization(env_name="test_env", app_name="foo")
+    foo["metadata"]["annotations"]["tails.com/tracking-image-tag-prefix"] = "main"
+    foo["spec"]["postBuild"]["substitute"]["image_tag"] = "main-abc123"
+    mock_get_kustomizations.return_value = [
+        foo,
+        build_kustomization(env_name="test_env", app_name="bar"),
+    ]
+
+    snapshot = export_env("test_env")
+
+    assert snapshot == EnvironmentSnapshot(
         name="test_env",
         owner_email="test@owner.com",
-        apps=[app_name],
-        flux_repository_branch=None
+        flux_repository_branch="flux-branch",
+        lease_exclusion_window="Mon-Fri 07:00-19:00 Europe/London",
+        apps=[
+            AppSnapshot(name="bar"),
+            AppSnapshot(name="foo", image_tag_prefix="main", image_tag="main-abc123"),
+        ],
+    )
+    mock_get_kustomizations.assert_called_once_with(env_name="test_env")
+
+
+@patch("kollie.service.envs.get_configmap")
+def test_export_env_not_found(mock_get_configmap):
+    mock_get_configmap.return_value = None
+
+    with pytest.raises(KollieConfigError):
+        export_env("test_env")
+
+
+@patch("kollie.service.envs.validate_apps")
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.create_env")
+@patch("kollie.service.envs.create_apps")
+def test_import_env_recreates_env_in_one_batch(
+    mock_create_apps, mock_create_env, mock_get_configmap, mock_validate_apps
+):
+    mock_get_configmap.return_value = None
+    snapshot = EnvironmentSnapshot(
+        name="test_env",
+        owner_email="old@owner.com",
+        flux_repository_branch="flux-branch",
+        lease_exclusion_window="Mon-Fri 07:00-19:00 Europe/London",
+        apps=[
+            AppSnapshot(name="foo", image_tag_prefix="main", image_tag="main-abc123"),
+            AppSnapshot(name="bar"),
+        ],
     )
-    mock_get_app.return_value = Mock()
-    expected_arg = {
-        'app_name': app_name.name,
-        'env_name': 'test_env',
-        'attributes': {
-            'uptime_window': '2024-12-06T00:00:00+00:00-2024-12-08T10:00:00+00:00'
+
+    result = import_env(snapshot, owner_email="test@owner.com", env_name="new_env")
+
+    assert result == mock_create_apps.return_value
+    mock_get_configmap.assert_called_once_with(name="new_env")
+    mock_validate_apps.assert_called_once_with("new_env", {"foo": "main", "bar": None})
+    mock_create_env.assert_called_once_with(
+        env_name="new_env",
+        owner_email="test@owner.com",
+        flux_repo_branch="flux-branch",
+        lease_exclusion_window="Mon-Fri 07:00-19:00 Europe/London",
+    )
+    mock_create_apps.assert_called_once_with(
+        env_name="new_env",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": "main", "bar": None},
+        image_tags={"foo": "main-abc123", "bar": None},
+        max_workers=BUNDLE_INSTALL_CONCURRENCY,
+        rollback=True,
+    )
+
+
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.create_env")
+def test_import_env_refuses_unknown_apps_before_creating_the_env(
+    mock_create_env, mock_get_configmap
+):
+    mock_get_configmap.return_value = None
+    snapshot = EnvironmentSnapshot(
+        name="test_env",
+        owner_email="old@owner.com",
+        apps=[AppSnapshot(name="foo"), AppSnapshot(name="removed")],
+    )
+
+    with patch(
+        "kollie.service.applications.get_app_template_store",
+        return_value=AppTemplateStore(source=MagicAppTemplateSource(app_names=["foo"])),
+    ):
+        with pytest.raises(KollieConfigError, match="removed"):
+            import_env(snapshot, owner_email="test@owner.com")
+
+    mock_create_env.assert_not_called()
+
+
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.create_env")
+def test_import_env_refuses_existing_env(mock_create_env, mock_get_configmap):
+    mock_get_configmap.return_value = Mock()
+
+    with pytest.raises(KollieConfigError):
+        import_env(EnvironmentSnapshot(name="test_env", owner_email=None), "test@owner.com")
+
+    mock_create_env.assert_not_called()
+
+
+@freeze_time('2024-12-06')
+@patch("kollie.service.envs.get_configmap")
+@patch("kollie.service.envs.patch_kustomization")
+@patch("kollie.service.envs.get_kustomizations")
+def test_extend_lease_patches_every_kustomization_once(
+    mock_get_kustomizations,
+    mock_patch_kustomization,
+    mock_get_configmap,
+    mock_refresh_env_summary,
+):
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="test_env", app_name="foo"),
+        build_kustomization(env_name="test_env", app_name="bar"),
+    ]
+    mock_patch_kustomization.side_effect = lambda request: {
+        "patched": request.app_name
+    }
+
+    results = extend_lease(env_name="test_env", hour=10, days=2)
+
+    assert results == {"foo": None, "bar": None}
+    mock_get_kustomizations.assert_called_once_with(env_name="test_env")
+    mock_get_configmap.assert_not_called()
+
+    patched = {
+        call.args[0].app_name: call.args[0].body
+        for call in mock_patch_kustomization.call_args_list
+    }
+    expected_body = {
+        "spec": {
+            "postBuild": {
+                "substitute": {
+                    "downscaler_uptime": "2024-12-06T00:00:00+00:00-2024-12-08T10:00:00+00:00"
+                }
+            }
         }
     }
+    assert patched == {"foo": expected_body, "bar": expected_body}
+
+    # the summary is built from the patched kustomizations
+    mock_refresh_env_summary.assert_called_once_with(
+        "test_env", [{"patched": "foo"}, {"patched": "bar"}]
+    )
+
+
+@patch("kollie.service.envs.patch_kustomization")
+@patch("kollie.service.envs.get_kustomizations")
+def test_extend_lease_reports_failures_per_app(
+    mock_get_kustomizations, mock_patch_kustomization
+):
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="test_env", app_name="foo"),
+        build_kustomization(env_name="test_env", app_name="bar"),
+    ]
+
+    def patch_kustomization(request):
+        if request.app_name == "foo":
+            raise KollieKustomizationException("patch", "foo", "test_env")
+        return {}
+
+    mock_patch_kustomization.side_effect = patch_kustomization
+
+    results = extend_lease(env_name="test_env", hour=10)
+
+    assert results == {
+        "foo": "Failed to patch Kustomization for foo in test_env",
+        "bar": None,
+    }
+
+
+@patch("kollie.service.envs.get_configmap", return_value=None)
+@patch("kollie.service.envs.get_kustomizations", return_value=[])
+def test_extend_lease_unknown_env(mock_get_kustomizations, mock_get_configmap):
+    with pytest.raises(ValueError):
+        extend_lease(env_name="nope", hour=10)
+
+
+@patch("kollie.service.envs.get_configmaps", autospec=True)
+def test_list_envs_selects_owner_by_label(mock_get_configmaps):
+    labelled = build_configmaps(
+        [
+            {"name": "b_env", "owner_email": "test@owner.com"},
+            {"name": "a_env", "owner_email": "test@owner.com"},
+        ]
+    )
+    # envs not backfilled yet are matched on their owner annotation
+    unlabelled = build_configmaps(
+        [
+            {"name": "old_env", "owner_email": "test@owner.com"},
+            {"name": "other_env", "owner_email": "other@owner.com"},
+        ]
+    )
+    mock_get_configmaps.side_effect = [labelled, unlabelled]
+
+    envs = list_envs(owner_email="test@owner.com")
+
+    assert [env.name for env in envs] == ["a_env", "b_env", "old_env"]
+    mock_get_configmaps.assert_has_calls(
+        [
+            call(
+                label_filters={
+                    "kollie.tails.com/managed-by": "kollie",
+                    "kollie.tails.com/owner-hash": owner_label_value("test@owner.com"),
+                }
+            ),
+            call(
+                label_filters={
+                    "kollie.tails.com/managed-by": "kollie",
+                    "kollie.tails.com/owner-hash": None,
+                }
+            ),
+        ]
+    )
+
+
+@patch("kollie.service.envs.OWNER_LABEL_FALLBACK", new=False)
+@patch("kollie.service.envs.get_configmaps", autospec=True)
+def test_list_envs_without_owner_label_fallback(mock_get_configmaps):
+    mock_get_configmaps.return_value = build_configmaps(
+        [{"name": "a_env", "owner_email": "test@owner.com"}]
+    )
+
+    assert [env.name for env in list_envs(owner_email="test@owner.com")] == ["a_env"]
+    mock_get_configmaps.assert_called_once_with(
+        label_filters={
+            "kollie.tails.com/managed-by": "kollie",
+            "kollie.tails.com/owner-hash": owner_label_value("test@owner.com"),
+        }
+    )
+
+
+@patch("kollie.service.envs.get_configmaps", autospec=True)
+def test_list_envs_without_owner_lists_every_env(mock_get_configmaps):
+    mock_get_configmaps.return_value = build_configmaps(
+        [{"name": "a_env", "owner_email": "test@owner.com"}]
+    )
+
+    assert [env.name for env in list_envs()] == ["a_env"]
+    mock_get_configmaps.assert_called_once_with(
+        label_filters={"kollie.tails.com/managed-by": "kollie"}
+    )
+
+
+@patch("kollie.service.envs.set_configmap_labels", autospec=True)
+@patch("kollie.service.envs.get_configmaps", autospec=True)
+def test_backfill_owner_labels_labels_unlabelled_envs(
+    mock_get_configmaps, mock_set_configmap_labels
+):
+    configmaps = build_configmaps(
+        [
+            {"name": "old_env", "owner_email": "test@owner.com"},
+            {"name": "new_env", "owner_email": "test@owner.com"},
+        ]
+    )
+    configmaps[1].metadata.labels["kollie.tails.com/owner-hash"] = "hash"
+    mock_get_configmaps.return_value = configmaps
+
+    assert backfill_owner_labels() == ["old_env"]
+    mock_get_configmaps.assert_called_once_with(
+        {"kollie.tails.com/managed-by": "kollie", "kollie.tails.com/owner-hash": None}
+    )
+    mock_set_configmap_labels.assert_called_once_with(
+        "old_env",
+        {"kollie.tails.com/owner-hash": owner_label_value("test@owner.com")},
+    )
+
+
+@patch("kollie.service.envs.set_configmap_labels", autospec=True)
+@patch("kollie.service.envs.get_configmaps", autospec=True)
+def test_backfill_owner_labels_skips_envs_that_fail(
+    mock_get_configmaps, mock_set_configmap_labels
+):
+    mock_get_configmaps.return_value = build_configmaps(
+        [
+            {"name": "a_env", "owner_email": "test@owner.com"},
+            {"name": "b_env", "owner_email": "test@owner.com"},
+        ]
+    )
+    mock_set_configmap_labels.side_effect = [ApiException(status=409), Mock()]
+
+    assert backfill_owner_labels() == ["b_env"]
+    assert mock_set_configmap_labels.call_count == 2
+
+
+@patch("kollie.service.envs.update_env_configmap_data", autospec=True)
+@patch("kollie.service.envs.set_configmap_labels", autospec=True)
+@patch("kollie.service.envs.get_kustomizations", autospec=True)
+@patch("kollie.service.envs.iter_configmap_pages", autospec=True)
+def test_rebuild_configs_patches_only_out_of_date_configmaps(
+    mock_iter_configmap_pages,
+    mock_get_kustomizations,
+    mock_set_configmap_labels,
+    mock_update_env_configmap_data,
+):
+    up_to_date, unlabelled, broken = build_configmaps(
+        [
+            {"name": "up_to_date", "owner_email": "test@owner.com"},
+            {"name": "unlabelled", "owner_email": "test@owner.com"},
+            {"name": "broken", "owner_email": "test@owner.com"},
+        ]
+    )
+    for configmap in (up_to_date, unlabelled):
+        body = json.loads(configmap.data["json"])
+        body.update(EnvironmentSummary(apps=["foo"]).to_dict())
+        body["summary_updated_at"] = "2024-12-01T00:00:00+00:00"
+        configmap.data = {"json": json.dumps(body)}
+    up_to_date.metadata.labels["kollie.tails.com/owner-hash"] = owner_label_value(
+        "test@owner.com"
+    )
+    mock_iter_configmap_pages.return_value = iter([[up_to_date, unlabelled], [broken]])
+
+    def get_kustomizations(env_name):
+        if env_name == "broken":
+            raise Exception("boom")
+        return [build_kustomization(env_name=env_name, app_name="foo")]
+
+    mock_get_kustomizations.side_effect = get_kustomizations
+
+    rebuild = rebuild_configs(max_workers=2, page_size=2)
+
+    assert rebuild.scanned == 3
+    assert rebuild.updated == ["unlabelled"]
+    assert list(rebuild.failed) == ["broken"]
+    mock_iter_configmap_pages.assert_called_once_with(
+        {"kollie.tails.com/managed-by": "kollie"}, page_size=2
+    )
+    mock_set_configmap_labels.assert_called_once_with(
+        "unlabelled",
+        {"kollie.tails.com/owner-hash": owner_label_value("test@owner.com")},
+    )
+    mock_update_env_configmap_data.assert_not_called()
+
+
+@patch("kollie.service.envs.update_env_configmap_data", autospec=True)
+@patch("kollie.service.envs.set_configmap_labels", autospec=True)
+@patch("kollie.service.envs.get_kustomizations", autospec=True)
+@patch("kollie.service.envs.iter_configmap_pages", autospec=True)
+def test_rebuild_configs_stores_missing_summaries(
+    mock_iter_configmap_pages,
+    mock_get_kustomizations,
+    mock_set_configmap_labels,
+    mock_update_env_configmap_data,
+):
+    mock_iter_configmap_pages.return_value = iter(
+        [build_configmaps([{"name": "old_env", "owner_email": "test@owner.com"}])]
+    )
+    mock_get_kustomizations.return_value = [
+        build_kustomization(env_name="old_env", app_name="foo")
+    ]
+
+    rebuild = rebuild_configs()
+
+    assert rebuild.updated == ["old_env"]
+    env_name, data = mock_update_env_configmap_data.call_args.args
+    assert env_name == "old_env"
+    assert data["apps"] == ["foo"]
+
+
+def _env_metadata(name, created_at, lease_window=None, owner="test@owner.com"):
+    return EnvironmentMetadata(
+        name=name,
+        owner_email=owner,
+        created_at=created_at,
+        lease_exclusion_window=None,
+        summary=EnvironmentSummary(apps=["foo"], lease_window=lease_window),
+    )
+
+
+@freeze_time("2024-12-06T12:00:00")
+@patch("kollie.service.envs.list_envs", autospec=True)
+def test_select_envs_matches_every_criterion(mock_list_envs):
+    expired = "2024-12-05T00:00:00+00:00-2024-12-05T19:00:00+00:00"
+    active = "2024-12-06T00:00:00+00:00-2024-12-06T19:00:00+00:00"
+    mock_list_envs.return_value = [
+        _env_metadata("release-1", datetime(2024, 12, 1), lease_window=expired),
+        _env_metadata("release-2", datetime(2024, 12, 1), lease_window=active),
+        _env_metadata("release-3", datetime(2024, 12, 6), lease_window=expired),
+        _env_metadata("feature-1", datetime(2024, 12, 1), lease_window=expired),
+    ]
+
+    selected = select_envs(
+        EnvSelector(
+            owner_email="test@owner.com",
+            name_prefix="release-",
+            created_before=datetime(2024, 12, 5, tzinfo=timezone.utc),
+            lease_expired=True,
+        )
+    )
+
+    assert selected == ["release-1"]
+    mock_list_envs.assert_called_once_with(owner_email="test@owner.com")
+
+
+@patch("kollie.service.envs.list_envs", autospec=True)
+def test_select_envs_by_name(mock_list_envs):
+    mock_list_envs.return_value = [
+        _env_metadata("a", datetime(2024, 12, 1)),
+        _env_metadata("b", datetime(2024, 12, 1)),
+    ]
+
+    assert select_envs(EnvSelector(names=["b", "missing"])) == ["b"]
+
+
+def test_select_envs_refuses_empty_selector():
+    with pytest.raises(ValueError):
+        select_envs(EnvSelector())
+
+
+@pytest.mark.parametrize(
+    "selector",
+    [
+        EnvSelector(name_prefix=""),
+        EnvSelector(owner_email=""),
+        EnvSelector(names=[]),
+        EnvSelector(names=[], owner_email="", name_prefix=""),
+    ],
+)
+def test_select_envs_refuses_blank_criteria(selector):
+    with pytest.raises(ValueError):
+        select_envs(selector)
+
+
+@patch("kollie.service.envs.delete_env", autospec=True)
+def test_delete_envs_reports_per_env(mock_delete_env):
+    def delete_env(env_name):
+        if env_name == "b":
+            raise Exception("boom")
+
+    mock_delete_env.side_effect = delete_env
+
+    assert delete_envs(["a", "b"], max_workers=2) == {"a": None, "b": "boom"}
+
+
+@patch("kollie.service.envs.extend_lease", autospec=True)
+def test_extend_leases_reports_failed_apps_per_env(mock_extend_lease):
+    mock_extend_lease.side_effect = lambda env_name, hour, days: (
+        {"foo": None} if env_name == "a" else {"foo": None, "bar": "boom"}
+    )
 
-    extend_lease(env_name="test_env", hour=10, days=2)
+    results = extend_leases(["a", "b"], hour=19, days=1, max_workers=2)
 
-    mock_update_app.assert_called_once_with(**expected_arg)
+    assert results == {"a": None, "b": "Failed to extend the lease of bar"}
+    mock_extend_lease.assert_any_call("a", 19, 1)
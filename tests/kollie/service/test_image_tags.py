@@ -0,0 +1,156 @@
+from unittest.mock import patch
+
+import pytest
+
+from kollie.exceptions import KollieConfigError
+from kollie.persistence import AppTemplate, ImageRepositoryRef
+from kollie.service import image_tags
+from kollie.service.image_tags import (
+    ImageTagIndex,
+    build_image_tag_index,
+    get_image_tag_index,
+    is_known_image_tag_prefix,
+    load_image_tag_index,
+    suggest_image_tag_prefixes,
+)
+
+
+@pytest.fixture()
+def app_template():
+    yield AppTemplate(
+        app_name="test_app",
+        label="test_label",
+        git_repository_name="test-flux-repo",
+        git_repository_path="bob/builder",
+        image_repository_ref=ImageRepositoryRef(
+            name="test_repo", namespace="test_namespace"
+        ),
+        default_image_tag_prefix="main",
+    )
+
+
+@pytest.fixture()
+def mock_cluster():
+    with (
+        patch("kollie.service.image_tags.get_image_repository") as get_image_repository,
+        patch("kollie.service.image_tags.get_image_policies") as get_image_policies,
+    ):
+        get_image_repository.return_value = {
+            "status": {
+                "lastScanResult": {
+                    "latestTags": [
+                        "main-abc123-1700000000",
+                        "feature-login-def456-1700000100",
+                        "latest",
+                    ]
+                }
+            }
+        }
+        get_image_policies.return_value = [
+            {
+                "metadata": {"namespace": "kollie"},
+                "spec": {
+                    "imageRepositoryRef": {
+                        "name": "test_repo",
+                        "namespace": "test_namespace",
+                    }
+                },
+                "status": {"latestRef": {"tag": "feature-old-abc123-1600000000"}},
+            },
+            {
+                "metadata": {"namespace": "kollie"},
+                "spec": {"imageRepositoryRef": {"name": "other_repo"}},
+                "status": {"latestRef": {"tag": "other-abc123-1600000000"}},
+            },
+        ]
+        yield
+
+
+@pytest.fixture()
+def cached_index(app_template, mock_cluster):
+    with patch.object(
+        image_tags, "_index", build_image_tag_index([app_template.image_repository_ref])
+    ):
+        yield
+
+
+def test_build_image_tag_index(app_template, mock_cluster):
+    index = build_image_tag_index([app_template.image_repository_ref])
+
+    assert index.get(app_template.image_repository_ref).starts_with("") == [
+        "feature-login",
+        "feature-old",
+        "main",
+    ]
+    assert index.get(ImageRepositoryRef(name="other_repo", namespace="kollie")).starts_with(
+        ""
+    ) == ["other"]
+
+
+@patch("kollie.service.image_tags.get_app_template_store")
+def test_suggest_image_tag_prefixes(
+    mock_get_app_template_store, app_template, cached_index
+):
+    mock_get_app_template_store.return_value.get_by_name.return_value = app_template
+
+    assert suggest_image_tag_prefixes("test_app", query="feature") == [
+        "feature-login",
+        "feature-old",
+    ]
+    assert suggest_image_tag_prefixes("test_app", query="feature/lo") == [
+        "feature-login"
+    ]
+
+
+@patch("kollie.service.image_tags.get_app_template_store")
+def test_suggest_image_tag_prefixes_unknown_app(mock_get_app_template_store):
+    mock_get_app_template_store.return_value.get_by_name.return_value = None
+
+    with pytest.raises(KollieConfigError):
+        suggest_image_tag_prefixes("unknown")
+
+
+@patch("kollie.service.image_tags.VALIDATE_IMAGE_TAG_PREFIXES", new=True)
+def test_is_known_image_tag_prefix(app_template, cached_index):
+    assert is_known_image_tag_prefix(app_template, "feature-login")
+    assert is_known_image_tag_prefix(app_template, "feature/login")
+    assert is_known_image_tag_prefix(app_template, "main")
+    assert not is_known_image_tag_prefix(app_template, "feature-typo")
+
+
+def test_is_known_image_tag_prefix_when_validation_disabled(app_template):
+    assert is_known_image_tag_prefix(app_template, "anything")
+
+
+@patch("kollie.service.image_tags._start_refresh_thread")
+@patch("kollie.service.image_tags._build_index_for_app_templates")
+def test_get_image_tag_index_does_not_wait_for_first_build(
+    mock_build_index, mock_start_refresh_thread
+):
+    with patch.object(image_tags, "_index", None):
+        assert get_image_tag_index().prefixes == {}
+
+    mock_build_index.assert_not_called()
+    mock_start_refresh_thread.assert_called_once_with()
+
+
+@patch("kollie.service.image_tags.VALIDATE_IMAGE_TAG_PREFIXES", new=True)
+@patch("kollie.service.image_tags._start_refresh_thread")
+def test_is_known_image_tag_prefix_before_first_build(
+    mock_start_refresh_thread, app_template
+):
+    with patch.object(image_tags, "_index", None):
+        assert is_known_image_tag_prefix(app_template, "feature-typo")
+
+
+@patch("kollie.service.image_tags._start_refresh_thread")
+@patch("kollie.service.image_tags._build_index_for_app_templates")
+def test_load_image_tag_index(mock_build_index, mock_start_refresh_thread):
+    mock_build_index.return_value = ImageTagIndex()
+
+    with patch.object(image_tags, "_index", None):
+        load_image_tag_index()
+
+        assert image_tags._index is mock_build_index.return_value
+
+    mock_start_refresh_thread.assert_called_once_with()
@@ -0,0 +1,271 @@
+import json
+from datetime import datetime, timedelta, timezone
+from unittest.mock import ANY, Mock, call, patch
+
+import pytest
+from kubernetes.client import ApiException
+
+from kollie.cluster.configmap import owner_label_value
+from kollie.exceptions import KollieConfigError
+from kollie.persistence.app_bundle import AppBundle
+from kollie.service.pool import claim_env, top_up_pools
+from tests.kollie.helpers import build_configmaps, build_kustomization
+
+
+def _pool_configmap(env_name: str, created_at: str, ready: bool) -> Mock:
+    configmap = build_configmaps(
+        environments=[{"name": env_name, "owner_email": "warm-pool@kollie.local"}]
+    )[0]
+    body = json.loads(configmap.data["json"])
+    body.update(
+        {
+            "created_at": created_at,
+            "apps": ["foo", "bar"],
+            "not_ready_apps": [] if ready else ["foo"],
+            "summary_updated_at": "2024-12-06T00:00:00+00:00",
+        }
+    )
+    configmap.data = {"json": json.dumps(body)}
+    return configmap
+
+
+@pytest.fixture
+def pool_mocks():
+    with (
+        patch("kollie.service.pool.get_app_bundle_store", autospec=True) as get_bundle_store,
+        patch("kollie.service.pool.get_configmaps", autospec=True) as get_configmaps,
+        patch("kollie.service.pool.set_configmap_owner", autospec=True) as set_configmap_owner,
+        patch("kollie.service.pool.get_kustomizations", autospec=True) as get_kustomizations,
+        patch("kollie.service.pool.patch_kustomization", autospec=True) as patch_kustomization,
+        patch("kollie.service.pool.refresh_env_summary", autospec=True) as refresh_env_summary,
+        patch("kollie.service.pool.get_app_template_store", autospec=True),
+        patch("kollie.service.pool.resolve_latest_image_tag", autospec=True) as resolve,
+        patch("kollie.service.pool.applications", autospec=True) as applications,
+    ):
+        get_bundle_store.return_value.get_bundle.return_value = AppBundle(
+            name="backend", description="", apps=["foo", "bar"]
+        )
+        get_configmaps.return_value = [
+            _pool_configmap("pool-backend-old", "2024-12-01T09:00:00", ready=False),
+            _pool_configmap("pool-backend-ready", "2024-12-02T09:00:00", ready=True),
+        ]
+
+        kustomizations = []
+        for app_name in ["foo", "bar"]:
+            kustomization = build_kustomization(env_name="pool-backend-ready", app_name=app_name)
+            kustomization["metadata"]["annotations"]["tails.com/tracking-image-tag-prefix"] = "main"
+            kustomizations.append(kustomization)
+
+        get_kustomizations.return_value = kustomizations
+        patch_kustomization.side_effect = lambda request: {"patched": request.app_name}
+        resolve.return_value = "feature-abc123-1"
+
+        yield Mock(
+            get_configmaps=get_configmaps,
+            set_configmap_owner=set_configmap_owner,
+            patch_kustomization=patch_kustomization,
+            refresh_env_summary=refresh_env_summary,
+            applications=applications,
+        )
+
+
+def test_claim_env_prefers_ready_envs(pool_mocks):
+    claimed = claim_env(
+        bundle_name="backend",
+        owner_email="test@owner.com",
+        image_tag_prefixes={"foo": "main", "bar": "feature"},
+    )
+
+    assert claimed is not None
+    assert claimed.env_name == "pool-backend-ready"
+    assert claimed.updated_apps == ["bar"]
+    assert claimed.failed == {}
+
+    claimed_configmap = pool_mocks.set_configmap_owner.call_args.args[0]
+    assert claimed_configmap.metadata.name == "pool-backend-ready"
+    pool_mocks.set_configmap_owner.assert_called_once_with(
+        claimed_configmap,
+        owner_email="test@owner.com",
+        labels={"kollie.tails.com/warm-pool": None},
+    )
+
+    patched = {
+        request.app_name: request.body
+        for ((request,), _) in pool_mocks.patch_kustomization.call_args_list
+    }
+    assert set(patched) == {"foo", "bar"}
+    assert patched["foo"]["metadata"]["annotations"] == {
+        "tails.com/owner": "test@owner.com"
+    }
+    assert "downscaler_uptime" in patched["foo"]["spec"]["postBuild"]["substitute"]
+
+    # only the app whose prefix differs is updated
+    pool_mocks.applications.update_app.assert_called_once_with(
+        env_name="pool-backend-ready",
+        app_name="bar",
+        attributes={"image_tag_prefix": "feature", "image_tag": "feature-abc123-1"},
+    )
+    pool_mocks.refresh_env_summary.assert_called_once_with(
+        "pool-backend-ready", [{"patched": "foo"}, {"patched": "bar"}]
+    )
+
+
+def test_claim_env_skips_envs_claimed_meanwhile(pool_mocks):
+    pool_mocks.set_configmap_owner.side_effect = [ApiException(status=409), Mock()]
+
+    claimed = claim_env(bundle_name="backend", owner_email="test@owner.com")
+
+    assert claimed is not None
+    assert claimed.env_name == "pool-backend-old"
+    assert pool_mocks.set_configmap_owner.call_count == 2
+
+
+def test_claim_env_from_empty_pool(pool_mocks):
+    pool_mocks.get_configmaps.return_value = []
+
+    assert claim_env(bundle_name="backend", owner_email="test@owner.com") is None
+    pool_mocks.set_configmap_owner.assert_not_called()
+
+
+def test_claim_env_rejects_apps_outside_the_bundle(pool_mocks):
+    with pytest.raises(KollieConfigError):
+        claim_env(
+            bundle_name="backend",
+            owner_email="test@owner.com",
+            image_tag_prefixes={"baz": "feature"},
+        )
+
+    pool_mocks.set_configmap_owner.assert_not_called()
+
+
+def _owned_configmap(
+    env_name: str,
+    bundle_name: str | None = None,
+    lease_window: str | None = None,
+    age: timedelta = timedelta(0),
+) -> Mock:
+    configmap = build_configmaps(
+        environments=[{"name": env_name, "owner_email": "warm-pool@kollie.local"}]
+    )[0]
+    body = json.loads(configmap.data["json"])
+    body.update(
+        {
+            "apps": ["foo", "bar"],
+            "not_ready_apps": [],
+            "lease_window": lease_window,
+            "summary_updated_at": "2024-12-06T00:00:00+00:00",
+        }
+    )
+    configmap.data = {"json": json.dumps(body)}
+    configmap.metadata.creation_timestamp = datetime.now(timezone.utc) - age
+
+    if bundle_name:
+        configmap.metadata.labels["kollie.tails.com/warm-pool"] = bundle_name
+
+    return configmap
+
+
+def _lease_window(hours_left: int) -> str:
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    return f"{now.isoformat()}-{(now + timedelta(hours=hours_left)).isoformat()}"
+
+
+@patch("kollie.service.pool.WARM_POOL_SIZES", {"backend": 3})
+@patch("kollie.service.pool.secrets.token_hex", side_effect=["aaa", "bbb"])
+@patch("kollie.service.pool.set_configmap_labels", autospec=True)
+@patch("kollie.service.pool.get_configmaps", autospec=True)
+@patch("kollie.service.pool.envs", autospec=True)
+def test_top_up_pools_adds_missing_envs(
+    mock_envs, mock_get_configmaps, mock_set_configmap_labels, mock_token_hex
+):
+    mock_get_configmaps.return_value = [
+        _owned_configmap("pool-backend-old", "backend", _lease_window(20)),
+        _owned_configmap("pool-frontend-old", "frontend", _lease_window(20)),
+    ]
+
+    added = top_up_pools()
+
+    assert added == ["pool-backend-aaa", "pool-backend-bbb"]
+    mock_get_configmaps.assert_called_once_with(
+        {"kollie.tails.com/owner-hash": owner_label_value("warm-pool@kollie.local")}
+    )
+    mock_envs.install_bundle.assert_has_calls(
+        [
+            call(
+                env_name="pool-backend-aaa",
+                bundle_name="backend",
+                owner_email="warm-pool@kollie.local",
+            ),
+            call(
+                env_name="pool-backend-bbb",
+                bundle_name="backend",
+                owner_email="warm-pool@kollie.local",
+            ),
+        ]
+    )
+    # new envs are leased until tomorrow, whatever the time they are created
+    assert [
+        kwargs["env_name"] for _, kwargs in mock_envs.extend_lease.call_args_list
+    ] == ["pool-backend-aaa", "pool-backend-bbb"]
+    assert all(
+        kwargs["days"] == 1 for _, kwargs in mock_envs.extend_lease.call_args_list
+    )
+    mock_set_configmap_labels.assert_has_calls(
+        [
+            call("pool-backend-aaa", {"kollie.tails.com/warm-pool": "backend"}),
+            call("pool-backend-bbb", {"kollie.tails.com/warm-pool": "backend"}),
+        ]
+    )
+    mock_envs.delete_env.assert_not_called()
+
+
+@patch("kollie.service.pool.WARM_POOL_SIZES", {"backend": 2})
+@patch("kollie.service.pool.secrets.token_hex", return_value="aaa")
+@patch("kollie.service.pool.set_configmap_labels", autospec=True)
+@patch("kollie.service.pool.get_configmaps", autospec=True)
+@patch("kollie.service.pool.envs", autospec=True)
+def test_top_up_pools_deletes_envs_whose_bundle_failed(
+    mock_envs, mock_get_configmaps, mock_set_configmap_labels, mock_token_hex
+):
+    mock_get_configmaps.return_value = []
+    mock_envs.install_bundle.side_effect = Exception("boom")
+
+    assert top_up_pools() == []
+
+    mock_envs.create_env.assert_called_once()
+    mock_envs.delete_env.assert_called_once_with("pool-backend-aaa")
+    mock_set_configmap_labels.assert_not_called()
+
+
+@patch("kollie.service.pool.WARM_POOL_SIZES", {"backend": 2})
+@patch("kollie.service.pool.get_configmaps", autospec=True)
+@patch("kollie.service.pool.envs", autospec=True)
+def test_top_up_pools_renews_leases_about_to_end(mock_envs, mock_get_configmaps):
+    mock_get_configmaps.return_value = [
+        _owned_configmap("pool-backend-fresh", "backend", _lease_window(20)),
+        _owned_configmap("pool-backend-ending", "backend", _lease_window(2)),
+    ]
+
+    assert top_up_pools() == []
+
+    mock_envs.extend_lease.assert_called_once_with(
+        env_name="pool-backend-ending", hour=ANY, days=1
+    )
+
+
+@patch("kollie.service.pool.WARM_POOL_SIZES", {"backend": 1})
+@patch("kollie.service.pool.get_configmaps", autospec=True)
+@patch("kollie.service.pool.envs", autospec=True)
+def test_top_up_pools_deletes_envs_that_never_joined_a_pool(
+    mock_envs, mock_get_configmaps
+):
+    mock_get_configmaps.return_value = [
+        _owned_configmap("pool-backend-ready", "backend", _lease_window(20)),
+        _owned_configmap("pool-backend-orphan", age=timedelta(hours=1)),
+        _owned_configmap("pool-backend-provisioning", age=timedelta(minutes=1)),
+        _owned_configmap("someone-elses", age=timedelta(hours=1)),
+    ]
+
+    assert top_up_pools() == []
+
+    mock_envs.delete_env.assert_called_once_with("pool-backend-orphan")
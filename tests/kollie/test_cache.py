@@ -0,0 +1,45 @@
+from unittest.mock import Mock, patch
+
+from kollie.cache import TTLCache
+
+
+def test_get_returns_cached_value():
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("key", 1)
+
+    assert cache.get("key") == 1
+    assert cache.get("other") is None
+
+
+@patch("kollie.cache.time.monotonic")
+def test_entries_expire(mock_monotonic):
+    mock_monotonic.return_value = 100.0
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("key", 1)
+
+    mock_monotonic.return_value = 111.0
+
+    assert cache.get("key") is None
+
+
+def test_get_or_load_only_loads_once():
+    cache = TTLCache(ttl_seconds=10)
+    loader = Mock(return_value=None)
+
+    assert cache.get_or_load("key", loader) is None
+    assert cache.get_or_load("key", loader) is None
+
+    loader.assert_called_once()
+
+
+def test_invalidate_and_clear():
+    cache = TTLCache(ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+    cache.clear()
+    assert cache.get("b") is None
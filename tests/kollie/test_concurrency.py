@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+from kollie.concurrency import map_concurrently
+
+
+def test_map_concurrently_returns_outcomes_in_order():
+    outcomes = map_concurrently(lambda item: item * 2, [1, 2, 3], max_workers=3)
+
+    assert [outcome.item for outcome in outcomes] == [1, 2, 3]
+    assert [outcome.result for outcome in outcomes] == [2, 4, 6]
+    assert all(outcome.ok for outcome in outcomes)
+
+
+def test_map_concurrently_captures_errors():
+    def func(item):
+        if item == 2:
+            raise ValueError("bad item")
+        return item
+
+    outcomes = map_concurrently(func, [1, 2, 3], max_workers=2)
+
+    assert [outcome.ok for outcome in outcomes] == [True, False, True]
+    assert isinstance(outcomes[1].error, ValueError)
+    assert outcomes[2].result == 3
+
+
+@pytest.mark.parametrize("max_workers", [2, 4])
+def test_map_concurrently_bounds_concurrency(max_workers):
+    lock = threading.Lock()
+    running = 0
+    peak = 0
+    barrier = threading.Barrier(max_workers, timeout=5)
+
+    def func(item):
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        # every worker is busy at the same time at least once
+        barrier.wait()
+        with lock:
+            running -= 1
+
+    map_concurrently(func, range(max_workers * 3), max_workers=max_workers)
+
+    assert peak == max_workers
+
+
+def test_map_concurrently_runs_serially_with_one_worker():
+    threads = set()
+
+    map_concurrently(
+        lambda item: threads.add(threading.get_ident()), range(3), max_workers=1
+    )
+
+    assert threads == {threading.get_ident()}
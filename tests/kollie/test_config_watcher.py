@@ -0,0 +1,41 @@
+from unittest.mock import Mock, patch
+
+from kollie import config_watcher
+from kollie.config_watcher import refresh_config, start_config_watcher
+
+
+def test_refresh_config_refreshes_every_config():
+    configs = {"a": Mock(), "b": Mock()}
+
+    with patch.dict(config_watcher.CONFIGS, configs, clear=True):
+        refresh_config()
+
+    configs["a"].assert_called_once()
+    configs["b"].assert_called_once()
+
+
+def test_refresh_config_carries_on_after_failure():
+    configs = {"a": Mock(side_effect=ValueError("broken")), "b": Mock()}
+
+    with patch.dict(config_watcher.CONFIGS, configs, clear=True):
+        refresh_config()
+
+    configs["b"].assert_called_once()
+
+
+@patch("kollie.config_watcher.threading.Thread")
+def test_start_config_watcher_only_starts_once(mock_thread):
+    with patch.object(config_watcher, "_watcher", None):
+        start_config_watcher()
+        start_config_watcher()
+
+    mock_thread.return_value.start.assert_called_once()
+
+
+@patch("kollie.config_watcher.WATCH_INTERVAL", new=0)
+@patch("kollie.config_watcher.threading.Thread")
+def test_start_config_watcher_disabled(mock_thread):
+    with patch.object(config_watcher, "_watcher", None):
+        start_config_watcher()
+
+    mock_thread.assert_not_called()
@@ -0,0 +1,59 @@
+import pytest
+
+from kollie.concurrency import map_concurrently
+from kollie.jobs import FAILED, SUCCEEDED, JobRunner, report_step
+from kollie.service.applications import AppsCreation
+
+
+@pytest.fixture
+def runner():
+    return JobRunner(max_workers=2, max_finished_jobs=2)
+
+
+def test_job_runs_in_the_background(runner):
+    def operation(env_name, app_names):
+        for outcome in map_concurrently(
+            lambda app_name: report_step(app_name, "created"), app_names, max_workers=2
+        ):
+            assert outcome.ok
+
+        return AppsCreation(env_name=env_name, created=list(app_names))
+
+    job = runner.submit("install_bundle", operation, "test_env", app_names=["a", "b"])
+
+    assert job.wait(timeout=5)
+    assert job.status == SUCCEEDED
+    # steps are reported from the worker threads of the operation too
+    assert sorted(step.name for step in job.steps) == ["a", "b"]
+    assert job.result["created"] == ["a", "b"]
+    assert job.started_at is not None and job.finished_at is not None
+    assert runner.get(job.id) is job
+
+
+def test_failed_job_keeps_error(runner):
+    def operation():
+        report_step("configmap", "created")
+        raise ValueError("boom")
+
+    job = runner.submit("create_env", operation)
+
+    assert job.wait(timeout=5)
+    assert job.status == FAILED
+    assert job.error == "boom"
+    assert job.to_dict()["steps"][0]["name"] == "configmap"
+
+
+def test_finished_jobs_are_forgotten_oldest_first(runner):
+    jobs = [runner.submit("noop", lambda: None) for _ in range(3)]
+
+    for job in jobs:
+        job.wait(timeout=5)
+
+    # the last job to finish trims the oldest
+    remaining = [job for job in jobs if runner.get(job.id) is not None]
+    assert len(remaining) == 2
+    assert runner.get("unknown") is None
+
+
+def test_report_step_outside_of_a_job_does_nothing():
+    report_step("foo", "created")
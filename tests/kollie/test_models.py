@@ -1,5 +1,17 @@
+import datetime
+import json
+from unittest.mock import Mock
+
 import pytest
-from kollie.models import KollieAppEvent, KollieApp, KollieEnvironment
+from kollie.models import (
+    AppSnapshot,
+    EnvironmentMetadata,
+    EnvironmentSnapshot,
+    EnvironmentSummary,
+    KollieAppEvent,
+    KollieApp,
+    KollieEnvironment,
+)
 from kubernetes.client.models.v1_ingress import V1Ingress
 
 
@@ -127,3 +139,136 @@ def test_kollie_app_status_returns_last_event():
     app.events.extend([e1, e2, e3])
 
     assert app.status == e3
+
+
+def _summary_kustomization(app_name: str, ready: bool, uptime: str | None = None):
+    substitute = {"downscaler_uptime": uptime} if uptime else {}
+    return {
+        "metadata": {
+            "annotations": {},
+            "labels": {"tails-app-name": app_name, "tails-app-environment": "env"},
+        },
+        "spec": {"postBuild": {"substitute": substitute}},
+        "status": {
+            "conditions": [
+                {
+                    "status": "True" if ready else "False",
+                    "type": "Ready",
+                    "reason": "Reason",
+                    "message": "Message",
+                }
+            ]
+        },
+    }
+
+
+def test_environment_summary_from_kustomizations():
+    updated_at = datetime.datetime(2024, 12, 6, tzinfo=datetime.timezone.utc)
+    early = "2024-12-06T00:00:00+00:00-2024-12-06T19:00:00+00:00"
+    late = "2024-12-06T00:00:00+00:00-2024-12-08T19:00:00+00:00"
+
+    summary = EnvironmentSummary.from_kustomizations(
+        [
+            _summary_kustomization("web", ready=False, uptime=late),
+            _summary_kustomization("api", ready=True, uptime=early),
+            _summary_kustomization("worker", ready=True),
+        ],
+        updated_at=updated_at,
+    )
+
+    assert summary.apps == ["api", "web", "worker"]
+    assert summary.not_ready_apps == ["web"]
+    assert summary.ready is False
+    assert summary.ready_app_count == 2
+    assert summary.lease_window == early
+    assert summary.lease_until == datetime.datetime(
+        2024, 12, 6, 19, tzinfo=datetime.timezone.utc
+    )
+
+
+def test_environment_summary_round_trips_through_configmap_json():
+    summary = EnvironmentSummary(
+        apps=["api"],
+        not_ready_apps=[],
+        lease_window="2024-12-06T00:00:00+00:00-2024-12-06T19:00:00+00:00",
+        updated_at=datetime.datetime(2024, 12, 6, tzinfo=datetime.timezone.utc),
+    )
+
+    configmap = Mock()
+    configmap.metadata.name = "env"
+    configmap.metadata.annotations = {"tails.com/owner": "owner@tails.com"}
+    configmap.data = {
+        "json": json.dumps(
+            {"env_name": "env", "created_at": "2024-12-01T00:00:00", **summary.to_dict()}
+        )
+    }
+
+    metadata = EnvironmentMetadata.from_configmap(configmap)
+
+    assert metadata.summary == summary
+    assert metadata.summary.ready is True
+
+
+def test_environment_metadata_without_summary():
+    configmap = Mock()
+    configmap.metadata.name = "env"
+    configmap.metadata.annotations = {"tails.com/owner": "owner@tails.com"}
+    configmap.data = {
+        "json": json.dumps(
+            {"env_name": "env", "created_at": "2024-12-01T00:00:00", "apps": []}
+        )
+    }
+
+    assert EnvironmentMetadata.from_configmap(configmap).summary is None
+
+
+def test_environment_summary_without_apps_is_not_ready():
+    summary = EnvironmentSummary.from_kustomizations(
+        [], updated_at=datetime.datetime.now(datetime.timezone.utc)
+    )
+
+    assert summary.apps == []
+    assert summary.ready is False
+    assert summary.lease_info is None
+
+
+def test_environment_snapshot_round_trip():
+    snapshot = EnvironmentSnapshot(
+        name="test_env",
+        owner_email="test@owner.com",
+        flux_repository_branch="flux-branch",
+        apps=[
+            AppSnapshot(name="foo", image_tag_prefix="main", image_tag="main-abc123"),
+            AppSnapshot(name="bar", image_tag_prefix="feature"),
+        ],
+    )
+
+    data = snapshot.to_dict()
+
+    assert data == {
+        "version": 1,
+        "name": "test_env",
+        "owner_email": "test@owner.com",
+        "flux_repository_branch": "flux-branch",
+        "apps": [
+            {"name": "foo", "image_tag_prefix": "main", "image_tag": "main-abc123"},
+            {"name": "bar", "image_tag_prefix": "feature"},
+        ],
+    }
+    assert EnvironmentSnapshot.from_dict(json.loads(json.dumps(data))) == snapshot
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        pytest.param({"name": "test_env"}, id="no version"),
+        pytest.param({"version": 2, "name": "test_env"}, id="unknown version"),
+        pytest.param({"version": 1}, id="no name"),
+        pytest.param({"version": 1, "name": "test_env", "apps": [{}]}, id="app without name"),
+        pytest.param({"version": 1, "name": "test_env", "apps": ["foo"]}, id="app not an object"),
+        pytest.param([], id="not an object"),
+    ],
+)
+def test_environment_snapshot_rejects_malformed_data(data):
+    with pytest.raises(ValueError):
+        EnvironmentSnapshot.from_dict(data)
@@ -0,0 +1,24 @@
+from kollie.prefix_trie import PrefixTrie
+
+
+def test_starts_with_returns_sorted_matches():
+    trie = PrefixTrie(["main", "feature-b", "feature-a", "fix-c"])
+
+    assert trie.starts_with("fe") == ["feature-a", "feature-b"]
+    assert trie.starts_with("") == ["feature-a", "feature-b", "fix-c", "main"]
+    assert trie.starts_with("nope") == []
+
+
+def test_starts_with_includes_exact_match_and_respects_limit():
+    trie = PrefixTrie(["main", "main-2", "main-3"])
+
+    assert trie.starts_with("main", limit=2) == ["main", "main-2"]
+
+
+def test_contains_and_len():
+    trie = PrefixTrie(["main", "main"])
+    trie.insert("mai")
+
+    assert "main" in trie
+    assert "ma" not in trie
+    assert len(trie) == 2
@@ -1,4 +1,5 @@
 from kollie.exceptions import (
+    KollieAppsCreationError,
     KollieConfigError,
     KollieImagePolicyException,
     KollieKustomizationException,
@@ -26,3 +27,11 @@ def test_kollie_kustomization_exception():
     exception = KollieKustomizationException(action, app_name, env_name)
     expected_message = f"Failed to {action} Kustomization for {app_name} in {env_name}"
     assert str(exception) == expected_message
+
+
+def test_kollie_apps_creation_error():
+    exception = KollieAppsCreationError(
+        env_name="env", failed={"foo": "boom"}, rolled_back=["bar", "baz"]
+    )
+    expected_message = "Failed to create apps in env (foo: boom), removed bar, baz again"
+    assert str(exception) == expected_message